@@ -1,28 +1,29 @@
 import streamlit as st
 from ui.filters import render_global_filters
-from data.base_queries import fetch_market_data
-from domains.market.compute import compute_daily_market_metrics, compute_period_averages
+from config.settings import SERVER_AGGREGATES
+from data.base_queries import MARKET_COLUMNS, fetch_market_data, fetch_symbol_dimension
+from data.constituents import fetch_constituent_history, index_constituents
+from data.membership import universe_key
 from domains.market.visuals import render_market_period_cards,render_market_daily_timeline
-from domains.sector.compute import compute_daily_sector_category_metrics, \
-compute_period_averages_grouped
+from domains.sector.compute import slice_grouping_set
+from domains.sector.incremental import IncrementalDailyMetrics
+from domains.sector.queries import fetch_daily_grouping_sets
 from domains.sector.visuals import render_grouped_period_cards, render_grouped_timeline
 from domains.stock.compute import calculate_stock_daily_timeline, calculate_period_comparison
-from domains.stock.visuals import render_stock_daily_charts, render_comparison_cards
-from domains.stock.compare import render_relative_verdict
-# Standardized DS30 List
-DS30_SYMBOLS = [
-    'BATBC', 'BEACONPHAR', 'BRACBANK', 'BSC', 'BSCPLC',
-    'BXPHARMA', 'CITYBANK', 'DELTALIFE', 'EBL', 'GP',
-    'GPHISPAT', 'HEIDELBCEM', 'IDLC', 'JAMUNAOIL', 'KBPPWBIL',
-    'KOHINOOR', 'LANKABAFIN', 'LHB', 'LINDEBD', 'LOVELLO',
-    'MJLBD', 'OLYMPIC', 'PADMAOIL', 'PRIMEBANK', 'PUBALIBANK',
-    'RENATA', 'ROBI', 'SQURPHARMA', 'UNIQUEHRL', 'WALTONHIL'
-]
+from domains.stock.visuals import render_stock_daily_charts, render_comparison_cards, render_relative_verdict
+from domains.stock.queries import fetch_stock_panel
+from ui.debug import render_timing_panel
+from utils.errors import set_error_reporter
+from utils.instrument import begin_run
 
 
 def main():
     st.set_page_config(page_title="dsex | Market Insights", layout="wide")
     st.title("📊 dsex Market Insights")
+    # Tags this rerun's timing records for the debug panel
+    begin_run()
+    # The data layer reports connection problems without importing Streamlit itself
+    set_error_reporter(st.error)
 
     # 1. Global Date Filters
     filters = render_global_filters()
@@ -35,10 +36,32 @@ def main():
     #     help="Filter metrics for the entire market or the blue-chip DS30 list."
     # )
 
-    # 3. Data Fetching
-    raw_data = fetch_market_data(filters['start_date'], filters['end_date'])
-
-    tab_market, tab_sector, tab_stock = st.tabs(["Market Overview", "Sector & Category Performance", "Stock Analysis"])
+    # 3. Data Fetching is lazy: only the open tab loads (projected) data.
+    # One aggregation pass serves the market and sector tabs for both universes.
+    # The per-session store only folds in trading days it hasn't seen yet.
+    # Every DS30 filter reads the same constituent history (table, or the registry as fallback),
+    # so DS30 rows are flagged with the constituents in effect on their own date
+    constituents = fetch_constituent_history()
+    ds30 = index_constituents(constituents, "DS30")
+    if st.session_state.get("daily_store_universe") != universe_key(ds30):
+        # A changed history invalidates every day already folded in
+        st.session_state["daily_store"] = IncrementalDailyMetrics({"DSEX": None, "DS30": ds30})
+        st.session_state["daily_store_universe"] = universe_key(ds30)
+    daily_store = st.session_state["daily_store"]
+
+    def load_daily_sets():
+        server_daily = None
+        if SERVER_AGGREGATES:
+            # Postgres reduces each day to ~25 rows; falls back to local compute on failure
+            server_daily = fetch_daily_grouping_sets(filters['start_date'], filters['end_date'], daily_store.universes)
+        if server_daily is not None:
+            return daily_store.sync_daily(server_daily)
+        return daily_store.sync(fetch_market_data(filters['start_date'], filters['end_date'], columns=MARKET_COLUMNS))
+
+    # on_change="rerun" tracks the selected tab, so closed tabs skip their work
+    tab_market, tab_sector, tab_structure, tab_stock = st.tabs(
+        ["Market Overview", "Sector & Category Performance", "Market Structure", "Stock Analysis"],
+        key="main_tab", on_change="rerun")
     with tab_market:
         # 1. Local Market Filters
         m_col1, m_col2 = st.columns(2)
@@ -48,7 +71,10 @@ def main():
             # Unique key to prevent conflict with Stock tab
             calc_type = st.radio("Calculation Type", ["Period Average", "Daily"], horizontal=True, key="mkt_calc_type")
 
-        if raw_data.empty:
+        daily_sets = load_daily_sets() if tab_market.open else None
+        if daily_sets is None:
+            pass
+        elif daily_sets.empty:
             st.warning("No data available.")
         else:
             from domains.market.visuals import (
@@ -59,17 +85,17 @@ def main():
 
             # Execution Logic
             if market_choice == "DSEX":
-                daily = compute_daily_market_metrics(raw_data, None)
+                daily = slice_grouping_set(daily_sets, "DSEX")
                 if calc_type == "Period Average":
-                    avg = compute_period_averages(daily)
+                    avg = daily_store.period_view("DSEX")
                     render_market_period_cards(avg, "DSEX Overall")
                 else:
                     render_market_daily_timeline(daily, "DSEX Overall")
 
             elif market_choice == "DS30":
-                daily = compute_daily_market_metrics(raw_data, DS30_SYMBOLS)
+                daily = slice_grouping_set(daily_sets, "DS30")
                 if calc_type == "Period Average":
-                    avg = compute_period_averages(daily)
+                    avg = daily_store.period_view("DS30")
                     render_market_period_cards(avg, "DS30 Index")
                 else:
                     render_market_daily_timeline(daily, "DS30 Index")
@@ -78,9 +104,9 @@ def main():
 
             elif market_choice == "DSEX vs DS30":
 
-                daily_dsex = compute_daily_market_metrics(raw_data, None)
+                daily_dsex = slice_grouping_set(daily_sets, "DSEX")
 
-                daily_ds30 = compute_daily_market_metrics(raw_data, DS30_SYMBOLS)
+                daily_ds30 = slice_grouping_set(daily_sets, "DS30")
 
                 if calc_type == "Daily":
 
@@ -98,9 +124,9 @@ def main():
 
                     # This ensures the numbers like "৳3,450.21M" have room to breathe
 
-                    avg_dsex = compute_period_averages(daily_dsex)
+                    avg_dsex = daily_store.period_view("DSEX")
 
-                    avg_ds30 = compute_period_averages(daily_ds30)
+                    avg_ds30 = daily_store.period_view("DS30")
 
                     # Render DSEX
 
@@ -111,9 +137,33 @@ def main():
                     # Render DS30
 
                     render_market_period_cards(avg_ds30, "DS30 Index")
+
+            # Index levels need the constituents' own prices, which the (possibly server-side)
+            # grouping sets don't carry, so the raw window is only loaded once they're asked for
+            show_levels = calc_type == "Daily" and st.toggle(
+                "Show reconstructed index levels", key="mkt_index_levels",
+                help="Loads the window's prices for every stock to rebuild the index from its constituents.")
+            if show_levels:
+                from domains.index.compute import reconstruct_index
+                from domains.index.visuals import render_index_levels
+
+                st.divider()
+                weighting = st.radio("Index Weighting", ["Equal", "Value"], horizontal=True,
+                                     key="mkt_index_weighting",
+                                     help="Value weights each constituent by its average traded value "
+                                          "over the previous 20 trading days.")
+                prices = fetch_stock_panel(filters['start_date'], filters['end_date'], with_ohlc=False)
+                if not prices.empty:
+                    names = ["DSEX", "DS30"] if market_choice == "DSEX vs DS30" else [market_choice]
+                    levels = {name: reconstruct_index(prices, constituents, name, weighting.lower())
+                              for name in names}
+                    render_index_levels(levels, weighting, key_suffix=market_choice)
     # Inside tab_sector
     with tab_sector:
-        if raw_data.empty:
+        daily_sets = load_daily_sets() if tab_sector.open else None
+        if daily_sets is None:
+            pass
+        elif daily_sets.empty:
             st.warning("No data found.")
         else:
             # 1. Local Sector/Category Filters
@@ -126,11 +176,11 @@ def main():
             sub_tab_sec, sub_tab_cat = st.tabs(["Sector Analytics", "Category Analytics"])
 
             # Define processing helper
-            def process_sector_category(df, group_type, key):
-                daily = compute_daily_sector_category_metrics(df, group_col=group_type)
+            def process_sector_category(universe, group_type, key):
+                daily = slice_grouping_set(daily_sets, universe, group_col=group_type)
 
                 if calc_type == "Period Average":
-                    avg = compute_period_averages_grouped(daily, group_col=group_type)
+                    avg = daily_store.period_view(universe, group_col=group_type)
                     render_grouped_period_cards(avg, group_col=group_type)
                 else:
                     render_grouped_timeline(daily, group_col=group_type, key_suffix=key)
@@ -138,35 +188,60 @@ def main():
             # --- SECTOR TAB ---
             with sub_tab_sec:
                 if market_choice == "DSEX":
-                    process_sector_category(raw_data, 'sector', 'dsex_sec')
+                    process_sector_category("DSEX", 'sector', 'dsex_sec')
                 elif market_choice == "DS30":
-                    ds30_data = raw_data[raw_data['trading_code'].isin(DS30_SYMBOLS)]
-                    process_sector_category(ds30_data, 'sector', 'ds30_sec')
+                    process_sector_category("DS30", 'sector', 'ds30_sec')
                 else:  # Comparison
-                    ds30_data = raw_data[raw_data['trading_code'].isin(DS30_SYMBOLS)]
                     st.subheader("DSEX (Full Market)")
-                    process_sector_category(raw_data, 'sector', 'vs_dsex_sec')
+                    process_sector_category("DSEX", 'sector', 'vs_dsex_sec')
                     st.divider()
                     st.subheader("DS30 (Blue-Chips)")
-                    process_sector_category(ds30_data, 'sector', 'vs_ds30_sec')
+                    process_sector_category("DS30", 'sector', 'vs_ds30_sec')
 
             # --- CATEGORY TAB ---
             with sub_tab_cat:
                 if market_choice == "DSEX":
-                    process_sector_category(raw_data, 'category', 'dsex_cat')
+                    process_sector_category("DSEX", 'category', 'dsex_cat')
                 elif market_choice == "DS30":
-                    ds30_data = raw_data[raw_data['trading_code'].isin(DS30_SYMBOLS)]
-                    process_sector_category(ds30_data, 'category', 'ds30_cat')
+                    process_sector_category("DS30", 'category', 'ds30_cat')
                 else:  # Comparison
-                    ds30_data = raw_data[raw_data['trading_code'].isin(DS30_SYMBOLS)]
                     st.subheader("DSEX Categories")
-                    process_sector_category(raw_data, 'category', 'vs_dsex_cat')
+                    process_sector_category("DSEX", 'category', 'vs_dsex_cat')
                     st.divider()
                     st.subheader("DS30 Categories")
-                    process_sector_category(ds30_data, 'category', 'vs_ds30_cat')
+                    process_sector_category("DS30", 'category', 'vs_ds30_cat')
+
+    with tab_structure:
+        t_col1, t_col2 = st.columns(2)
+        with t_col1:
+            structure_choice = st.selectbox("Choose Market", ["DSEX", "DS30"], key="struct_mkt")
+        with t_col2:
+            n_clusters = st.slider("Number of Clusters", 2, 20, 8, key="struct_clusters")
+
+        prices = fetch_stock_panel(filters['start_date'], filters['end_date'], with_ohlc=False) \
+            if tab_structure.open else None
+        if prices is None:
+            pass
+        elif prices.empty:
+            st.warning("No data found.")
+        else:
+            from domains.structure.compute import compute_return_correlation, cluster_correlation_matrix
+            from domains.structure.visuals import render_market_structure
+
+            # Both steps are memoized per date range (panel) and universe
+            corr = compute_return_correlation(prices, ds30 if structure_choice == "DS30" else None)
+            if len(corr) < 2:
+                st.warning("Not enough overlapping trading days to correlate stocks in this range.")
+            else:
+                ordered, clusters = cluster_correlation_matrix(corr, n_clusters)
+                render_market_structure(ordered, clusters, key_suffix=structure_choice)
 
     with tab_stock:
-        if raw_data.empty:
+        # Filters and benchmark choices come from the symbol dimension, not the prices
+        symbol_dim = fetch_symbol_dimension() if tab_stock.open else None
+        if symbol_dim is None:
+            pass
+        elif symbol_dim.empty:
             st.warning("No data found.")
         else:
             # --- 1. CONFIGURATION SECTION ---
@@ -174,18 +249,18 @@ def main():
 
             f1, f2, f3 = st.columns(3)
             with f1:
-                sel_sec = st.multiselect("Filter by Sector", sorted(raw_data['sector'].unique()))
+                sel_sec = st.multiselect("Filter by Sector", sorted(symbol_dim['sector'].dropna().unique()))
             with f2:
-                sel_cat = st.multiselect("Filter by Category", sorted(raw_data['category'].unique()))
+                sel_cat = st.multiselect("Filter by Category", sorted(symbol_dim['category'].dropna().unique()))
             with f3:
                 from domains.stock.queries import get_filtered_stock_list
-                stock_list = get_filtered_stock_list(raw_data, sel_sec, sel_cat)
+                stock_list = get_filtered_stock_list(symbol_dim, sel_sec, sel_cat)
                 target_stock = st.selectbox("Select Target Stock", stock_list)
 
             # --- 2. DYNAMIC BENCHMARK SELECTION ---
             c1, c2 = st.columns([2, 1])
             with c1:
-                t_rows = raw_data[raw_data['trading_code'] == target_stock]
+                t_rows = symbol_dim[symbol_dim['trading_code'] == target_stock]
                 t_info = t_rows.iloc[0] if not t_rows.empty else None
 
                 # Build the list of potential benchmarks
@@ -198,7 +273,7 @@ def main():
                     bench_opts.append(f"Category: {t_info['category']}")
 
                 # 3. Individual Stocks (Peer Comparison)
-                all_tickers = sorted(raw_data['trading_code'].unique())
+                all_tickers = sorted(symbol_dim['trading_code'].unique())
                 # Remove target_stock from the peer list to avoid comparing a stock to itself
                 if target_stock in all_tickers:
                     all_tickers.remove(target_stock)
@@ -220,10 +295,18 @@ def main():
             st.divider()
 
             # --- 3. PARSING & EXECUTION ---
-            from domains.stock.compute import calculate_stock_daily_timeline, calculate_period_comparison
-            from domains.stock.visuals import render_stock_daily_charts, render_comparison_cards
-            from domains.stock.compare import render_relative_verdict
-
+            from domains.stock.compute import (
+                calculate_stock_daily_timeline,
+                calculate_period_comparison,
+                calculate_rolling_analytics
+            )
+            from domains.stock.visuals import (
+                render_stock_daily_charts,
+                render_comparison_cards,
+                render_relative_verdict,
+                render_rolling_analytics
+            )
+            
             # Parsing logic for all 4 types: Index, Sector, Category, and Peer Stock
             if ":" in selected_bench:
                 parts = selected_bench.split(": ")
@@ -233,15 +316,33 @@ def main():
                 b_type = "index"
                 b_name = selected_bench  # 'DSEX' or 'DS30'
 
+            # Only the daily charts need OHLC, and only the target's
+            stock_data = fetch_stock_panel(filters['start_date'], filters['end_date'], target_stock,
+                                           with_ohlc=calc_type == "Daily")
+
             # Inside tab_stock execution block
-            if calc_type == "Daily":
-                timeline_df = calculate_stock_daily_timeline(raw_data, target_stock, b_name, b_type)
+            if stock_data.empty:
+                st.warning("No data found.")
+            elif calc_type == "Daily":
+                timeline_df = calculate_stock_daily_timeline(stock_data, target_stock, b_name, b_type,
+                                                             constituents)
                 # Now passing b_name to show labels in the chart
                 render_stock_daily_charts(timeline_df, target_stock, b_name)
+
+                # Rolling stats are computed for every stock at once and memoized per window
+                st.divider()
+                window = st.select_slider("Rolling Window (trading days)", [5, 10, 20, 60, 120], value=20,
+                                          key="stock_rolling_window")
+                rolling = calculate_rolling_analytics(stock_data, window, constituents=constituents)
+                render_rolling_analytics(rolling[rolling['trading_code'] == target_stock], target_stock, window)
             else:
-                target_stats = calculate_period_comparison(raw_data, target_stock, "stock")
-                bench_stats = calculate_period_comparison(raw_data, b_name, b_type)
+                target_stats = calculate_period_comparison(stock_data, target_stock, "stock", constituents)
+                bench_stats = calculate_period_comparison(stock_data, b_name, b_type, constituents)
                 render_relative_verdict(target_stats, bench_stats)
                 render_comparison_cards(target_stats, bench_stats)
+
+    render_timing_panel()
+
+
 if __name__ == "__main__":
     main()
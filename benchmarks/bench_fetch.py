@@ -0,0 +1,70 @@
+"""
+Offline throughput comparison: legacy serial OFFSET paging vs ChunkedFetcher.
+
+    python -m benchmarks.bench_fetch --symbols 400 --days 120 --latency 0.02 --offset-cost 0.000002
+"""
+import argparse
+import time
+
+import httpx
+
+from benchmarks.stub_postgrest import StubPostgrest
+from benchmarks.synthetic import trading_days
+from data.base_queries import PRICE_SELECT
+from data.fetcher import ChunkedFetcher
+
+# The pre-normalisation projection, which embedded dsex_mapper in every row
+LEGACY_SELECT = ("date,openp,high,low,ltp,closep,ycp,value_mn,volume,trade,"
+                 "dsex_mapper(trading_code,category,sector)")
+
+
+def legacy_offset_fetch(base_url, start_date, end_date, page_size=1000):
+    """The pre-chunking loop: one OFFSET page at a time with a 50 ms pause."""
+    all_rows = []
+    start_index = 0
+    with httpx.Client(timeout=30) as client:
+        while True:
+            response = client.get(f"{base_url}/rest/v1/dsex_prices", params={
+                "select": LEGACY_SELECT,
+                "and": f"(date.gte.{start_date},date.lte.{end_date})",
+                "order": "date.asc",
+                "offset": start_index,
+                "limit": page_size,
+            })
+            response.raise_for_status()
+            data = response.json()
+            all_rows.extend(data)
+            if len(data) < page_size:
+                break
+            start_index += page_size
+            time.sleep(0.05)
+    return all_rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--offset-cost", type=float, default=0.000002)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    days = trading_days(args.days)
+    start_date, end_date = days[0].isoformat(), days[-1].isoformat()
+
+    with StubPostgrest(args.symbols, args.days, args.latency, args.offset_cost) as stub:
+        runs = {
+            "legacy_offset": lambda: legacy_offset_fetch(stub.url, start_date, end_date),
+            "chunked_keyset": lambda: ChunkedFetcher(stub.url, "anon", max_workers=args.workers)
+            .fetch(start_date, end_date, PRICE_SELECT),
+        }
+        for name, run in runs.items():
+            started = time.perf_counter()
+            rows = run()
+            elapsed = time.perf_counter() - started
+            print(f"{name:>15}: {len(rows):>8} rows in {elapsed:6.2f}s ({len(rows) / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
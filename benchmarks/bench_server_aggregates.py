@@ -0,0 +1,75 @@
+"""
+Transfer volume and time of the market/sector tabs: downloading every price row
+and aggregating locally vs asking the database for the daily sums
+(sql/daily_aggregates.sql, served here by the SQLite stand-in). Also checks
+that both paths return the same frames.
+
+    python -m benchmarks.bench_server_aggregates --symbols 400 --days 250 --latency 0.02
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.stub_postgrest import StubPostgrest
+from benchmarks.synthetic import generate_market_frame, trading_days
+from config.metrics import DS30_SYMBOLS
+from data.base_queries import PRICE_SELECT
+from data.fetcher import ChunkedFetcher
+from domains.market.compute import compute_daily_market_metrics
+from domains.market.queries import fetch_daily_market_metrics
+from domains.sector.compute import compute_daily_grouping_sets
+from domains.sector.queries import fetch_daily_grouping_sets
+
+
+def measure(stub, fn):
+    bytes_before = stub.db.bytes_sent
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started, stub.db.bytes_sent - bytes_before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    days = trading_days(args.days)
+    start_date, end_date = days[0].isoformat(), days[-1].isoformat()
+    universes = {"DSEX": None, "DS30": DS30_SYMBOLS}
+    # Identical to the stub's tables (same generator, seed and dates)
+    df = generate_market_frame(args.symbols, args.days)
+
+    with StubPostgrest(args.symbols, args.days, args.latency) as stub:
+        fetcher = ChunkedFetcher(stub.url, "anon")
+
+        # The raw path: every price row crosses the wire, then one local pass
+        _, raw_s, raw_bytes = measure(stub, lambda: fetcher.fetch(start_date, end_date, PRICE_SELECT))
+        started = time.perf_counter()
+        expected = compute_daily_grouping_sets.uncached(df, universes)
+        raw_s += time.perf_counter() - started
+
+        cube, cube_s, cube_bytes = measure(
+            stub, lambda: fetch_daily_grouping_sets(start_date, end_date, universes, fetcher=fetcher))
+        market, market_s, market_bytes = measure(
+            stub, lambda: fetch_daily_market_metrics(start_date, end_date, fetcher=fetcher))
+
+    # The local frame stores prices as float32 while Postgres/SQLite compute the
+    # returns in double precision, so the two agree to float32 rounding only
+    pd.testing.assert_frame_equal(cube, expected, check_dtype=False, check_categorical=False,
+                                  rtol=1e-4, atol=1e-5)
+    pd.testing.assert_frame_equal(market, compute_daily_market_metrics.uncached(df), check_dtype=False,
+                                  rtol=1e-4, atol=1e-5)
+
+    print(f"{len(df):,} price rows ({args.symbols} symbols x {args.days} days)")
+    print(f"{'raw rows + local':>24}: {raw_bytes / 1e6:8.2f} MB in {raw_s:6.2f}s")
+    for label, seconds, sent in [("server grouping sets", cube_s, cube_bytes),
+                                 ("server market only", market_s, market_bytes)]:
+        print(f"{label:>24}: {sent / 1e6:8.2f} MB in {seconds:6.2f}s "
+              f"| {raw_bytes / sent:6.0f}x less data")
+
+
+if __name__ == "__main__":
+    main()
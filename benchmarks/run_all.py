@@ -0,0 +1,278 @@
+"""
+Offline benchmark suite for the app's hot paths: fetching (cold and warm
+cache, against the stub PostgREST server), every domain compute function and
+the Plotly figure builders plus their JSON serialisation.
+
+    python -m benchmarks.run_all --symbols 400 --days 250 --output bench.json
+    python -m benchmarks.run_all --output new.json --compare bench.json
+
+Results are written as JSON (one entry per benchmark with best/mean seconds
+and rows in/out) so two runs can be diffed with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _rows(value):
+    if value is None:
+        return None
+    if hasattr(value, "shape"):
+        return int(value.shape[0])
+    if isinstance(value, (list, tuple, dict, str)):
+        return len(value)
+    return None
+
+
+def measure(name, fn, rows_in, repeat, setup=None):
+    """Runs `fn` `repeat` times (after `setup`, untimed) and returns its result entry."""
+    timings, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    entry = {
+        "name": name,
+        "best_s": min(timings),
+        "mean_s": sum(timings) / len(timings),
+        "repeat": repeat,
+        "rows_in": rows_in,
+        "rows_out": _rows(result),
+    }
+    print(f"{name:<55} {entry['best_s'] * 1000:10.2f} ms  (mean {entry['mean_s'] * 1000:9.2f} ms)")
+    return entry
+
+
+def run_fetch(args, repeat):
+    from benchmarks.stub_postgrest import StubPostgrest
+    from benchmarks.synthetic import trading_days
+
+    days = trading_days(args.days)
+    start_date, end_date = days[0].isoformat(), days[-1].isoformat()
+    results = []
+
+    with StubPostgrest(args.symbols, args.days, args.latency, seed=args.seed) as stub:
+        from data.base_queries import fetch_market_data
+        from data.cache import SYMBOLS_PATH, clear_price_cache
+        from data.client import configure
+        from data.fetcher import ChunkedFetcher
+
+        # Point the whole data layer at the stub server
+        fetcher = ChunkedFetcher(stub.url, "anon")
+        configure(stub.url, "anon", fetcher=fetcher)
+        rows_in = args.symbols * args.days
+
+        def cold_cache():
+            clear_price_cache()
+            if os.path.exists(SYMBOLS_PATH):
+                os.remove(SYMBOLS_PATH)
+
+        results.append(measure("fetch.fetch_market_data[cold]",
+                               lambda: fetch_market_data(start_date, end_date, fetcher=fetcher),
+                               rows_in, repeat, setup=cold_cache))
+        results.append(measure("fetch.fetch_market_data[warm]",
+                               lambda: fetch_market_data(start_date, end_date, fetcher=fetcher),
+                               rows_in, repeat))
+    return results
+
+
+def run_compute(df, repeat):
+    from config.metrics import DS30_SYMBOLS
+    from data.constituents import registry_constituents
+    from domains.market.compute import compute_daily_market_metrics, compute_period_averages
+    from domains.sector.compute import (
+        compute_daily_grouping_sets,
+        compute_daily_sector_category_metrics,
+        compute_period_averages_grouped,
+    )
+    from domains.index.compute import reconstruct_index
+    from domains.sector.incremental import IncrementalDailyMetrics
+    from domains.stock.compute import calculate_period_comparison, calculate_stock_daily_timeline
+    from domains.stock.panel import build_stock_panel
+    from domains.stock.screener import screen_stocks
+
+    universes = {"DSEX": None, "DS30": DS30_SYMBOLS}
+    target = str(df['trading_code'].iloc[0])
+    sector = str(df['sector'].iloc[0])
+    market_daily = compute_daily_market_metrics.uncached(df)
+    sector_daily = compute_daily_sector_category_metrics.uncached(df, 'sector')
+    history = registry_constituents()
+    rows = len(df)
+
+    cases = [
+        ("market.compute_daily_market_metrics[DSEX]",
+         lambda: compute_daily_market_metrics.uncached(df), rows),
+        ("market.compute_daily_market_metrics[DS30]",
+         lambda: compute_daily_market_metrics.uncached(df, DS30_SYMBOLS), rows),
+        ("market.compute_period_averages",
+         lambda: compute_period_averages.uncached(market_daily), len(market_daily)),
+        ("sector.compute_daily_grouping_sets",
+         lambda: compute_daily_grouping_sets.uncached(df, universes), rows),
+        ("sector.compute_daily_sector_category_metrics[sector]",
+         lambda: compute_daily_sector_category_metrics.uncached(df, 'sector'), rows),
+        ("sector.compute_daily_sector_category_metrics[category]",
+         lambda: compute_daily_sector_category_metrics.uncached(df, 'category'), rows),
+        ("sector.compute_period_averages_grouped",
+         lambda: compute_period_averages_grouped.uncached(sector_daily, 'sector'), len(sector_daily)),
+        ("sector.IncrementalDailyMetrics.sync[cold]",
+         lambda: IncrementalDailyMetrics(universes).sync(df), rows),
+        ("stock.build_stock_panel",
+         lambda: build_stock_panel.uncached(df), rows),
+        ("stock.calculate_stock_daily_timeline[DSEX]",
+         lambda: calculate_stock_daily_timeline.uncached(df, target, "DSEX", "index"), rows),
+        ("stock.calculate_stock_daily_timeline[sector]",
+         lambda: calculate_stock_daily_timeline.uncached(df, target, sector, "sector"), rows),
+        ("stock.calculate_period_comparison[stock]",
+         lambda: calculate_period_comparison.uncached(df, target, "stock"), rows),
+        ("stock.calculate_period_comparison[DS30]",
+         lambda: calculate_period_comparison.uncached(df, "DS30", "index"), rows),
+        ("stock.screen_stocks",
+         lambda: screen_stocks.uncached(df), rows),
+        ("index.reconstruct_index[DS30 equal]",
+         lambda: reconstruct_index.uncached(df, history, "DS30", "equal"), rows),
+        ("index.reconstruct_index[DSEX value]",
+         lambda: reconstruct_index.uncached(df, history, "DSEX", "value"), rows),
+    ]
+
+    # The incremental steady state: one new trading day folded into a warm store
+    last_day = df['date'].max()
+    warm_store = IncrementalDailyMetrics(universes)
+    warm_store.sync(df[df['date'] < last_day])
+    cases.append(("sector.IncrementalDailyMetrics.append[1 day]",
+                  lambda: warm_store.append(df[df['date'] == last_day]) or warm_store.daily,
+                  int((df['date'] == last_day).sum())))
+
+    return [measure(name, fn, rows_in, repeat) for name, fn, rows_in in cases]
+
+
+def run_figures(df, repeat):
+    from domains.market.compute import compute_daily_market_metrics
+    from domains.market.visuals import build_market_comparison_figure, build_market_daily_figure
+    from domains.sector.compute import compute_daily_sector_category_metrics
+    from domains.sector.visuals import build_grouped_timeline_figure
+    from domains.stock.compute import calculate_stock_daily_timeline
+    from domains.stock import visuals as stock_visuals
+    from config.metrics import DS30_SYMBOLS
+
+    target = str(df['trading_code'].iloc[0])
+    market_daily = compute_daily_market_metrics(df)
+    ds30_daily = compute_daily_market_metrics(df, DS30_SYMBOLS)
+    sector_daily = compute_daily_sector_category_metrics(df, 'sector')
+    timeline = calculate_stock_daily_timeline(df, target, "DSEX", "index")
+
+    # Uncached, so every repeat measures a real build rather than a figure-cache hit
+    builders = [
+        ("market.daily", lambda: build_market_daily_figure.uncached(market_daily), len(market_daily)),
+        ("market.comparison", lambda: build_market_comparison_figure.uncached([
+            (market_daily, "DSEX", "#636EFA", "solid"),
+            (ds30_daily, "DS30", "#EF553B", "dash"),
+        ]), len(market_daily) + len(ds30_daily)),
+        ("sector.grouped_timeline",
+         lambda: build_grouped_timeline_figure.uncached(sector_daily, 'avg_return', 'sector'), len(sector_daily)),
+        ("stock.candlestick",
+         lambda: stock_visuals.build_candlestick_figure.uncached(timeline, target, "DSEX"), len(timeline)),
+        ("stock.return_comparison",
+         lambda: stock_visuals.build_return_comparison_figure.uncached(timeline, target, "DSEX"), len(timeline)),
+        ("stock.participation",
+         lambda: stock_visuals.build_participation_figure.uncached(timeline, target, "DSEX"), len(timeline)),
+        ("stock.traded_value",
+         lambda: stock_visuals.build_traded_value_figure.uncached(timeline, target), len(timeline)),
+        ("stock.liquidity_share",
+         lambda: stock_visuals.build_liquidity_share_figure.uncached(timeline), len(timeline)),
+        ("stock.excess_return",
+         lambda: stock_visuals.build_excess_return_figure.uncached(timeline, target, "DSEX"), len(timeline)),
+    ]
+
+    results = []
+    for name, build, rows_in in builders:
+        results.append(measure(f"figure.{name}[build]", build, rows_in, repeat))
+        fig = build()
+        # to_json is what Streamlit ships to the browser for every rerun
+        results.append(measure(f"figure.{name}[to_json]", fig.to_json, rows_in, repeat))
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {b["name"]: b for b in json.load(f)["benchmarks"]}
+
+    print(f"\nvs {baseline_path}")
+    for entry in results:
+        before = baseline.get(entry["name"])
+        if before is None:
+            print(f"{entry['name']:<55} {'new':>10}")
+            continue
+        delta = (entry["best_s"] - before["best_s"]) / before["best_s"] * 100 if before["best_s"] else 0.0
+        print(f"{entry['name']:<55} {before['best_s'] * 1000:10.2f} -> {entry['best_s'] * 1000:10.2f} ms "
+              f"({delta:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every stub request")
+    parser.add_argument("--skip-fetch", action="store_true", help="Skip the stub server fetch benchmarks")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Print deltas against a previous --output file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dsex-bench-") as cache_dir:
+        # Must be set before config.settings is imported so the real cache is untouched
+        os.environ["DSEX_CACHE_DIR"] = cache_dir
+
+        import numpy as np
+        import pandas as pd
+        import plotly
+
+        from benchmarks.synthetic import generate_market_frame
+
+        started = time.perf_counter()
+        df = generate_market_frame(args.symbols, args.days, args.seed)
+        print(f"{len(df):,} rows ({args.symbols} symbols x {args.days} days) "
+              f"generated in {time.perf_counter() - started:.1f}s\n")
+
+        results = []
+        if not args.skip_fetch:
+            results += run_fetch(args, args.repeat)
+        results += run_compute(df, args.repeat)
+        results += run_figures(df, args.repeat)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__, "plotly": plotly.__version__},
+        "params": {"symbols": args.symbols, "days": args.days, "seed": args.seed, "repeat": args.repeat,
+                   "latency": args.latency, "rows": len(df)},
+        "benchmarks": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+SQLite stand-in for the Postgres function in sql/daily_aggregates.sql, so the
+server-side aggregation path can be exercised without a database.
+
+SQLite has no GROUPING SETS, so the three groupings are a UNION ALL of three
+GROUP BYs over the same filtered rows; the output columns, filters and
+ordering match dsex_daily_group_sums().
+"""
+import sqlite3
+import threading
+
+GROUP_SUMS_SQL = """
+WITH priced AS (
+    SELECT p.date, m.sector, m.category, m.trading_code, p.value_mn, p.volume,
+           (p.ltp - p.ycp) * 1.0 / p.ycp AS ret
+    FROM dsex_prices p
+    LEFT JOIN dsex_mapper m ON m.id = p.mapper_id
+    WHERE p.date BETWEEN :start_date AND :end_date
+      AND p.ycp > 0
+      AND p.ltp IS NOT NULL
+      AND (:all_members OR EXISTS (
+            SELECT 1 FROM members u
+            WHERE u.value = m.trading_code
+              AND (u.from_date IS NULL OR p.date >= u.from_date)
+              AND (u.to_date IS NULL OR p.date < u.to_date)))
+),
+sums AS (
+    SELECT 'market' AS grouping, date, NULL AS sector, NULL AS category, {aggregates}
+    FROM priced GROUP BY date
+    UNION ALL
+    SELECT 'sector', date, sector, NULL, {aggregates}
+    FROM priced WHERE sector IS NOT NULL GROUP BY date, sector
+    UNION ALL
+    SELECT 'category', date, NULL, category, {aggregates}
+    FROM priced WHERE category IS NOT NULL GROUP BY date, category
+)
+SELECT * FROM sums
+WHERE :all_groupings OR grouping IN (SELECT value FROM groupings)
+ORDER BY date, grouping, sector, category
+""".format(aggregates=(
+    "SUM(value_mn) AS total_value, SUM(volume) * 1.0 AS total_volume, COUNT(*) AS n, "
+    "SUM(ret) AS ret_sum, SUM(ret * ret) AS ret_sq_sum, SUM(ret > 0) AS advancers, "
+    "COUNT(DISTINCT trading_code) AS stock_count"
+))
+
+COLUMNS = ['grouping', 'date', 'sector', 'category', 'total_value', 'total_volume', 'n',
+           'ret_sum', 'ret_sq_sum', 'advancers', 'stock_count']
+
+
+class SqliteAggregates:
+    """In-memory copy of dsex_prices / dsex_mapper answering dsex_daily_group_sums()."""
+
+    def __init__(self, mapper_rows, price_rows):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE dsex_mapper (id INTEGER PRIMARY KEY, trading_code TEXT, sector TEXT, category TEXT);
+            CREATE TABLE dsex_prices (date TEXT, mapper_id INTEGER, ltp REAL, ycp REAL, value_mn REAL, volume INTEGER);
+            CREATE INDEX dsex_prices_date ON dsex_prices (date);
+            CREATE TEMP TABLE members (value TEXT, from_date TEXT, to_date TEXT);
+            CREATE TEMP TABLE groupings (value TEXT);
+        """)
+        self.conn.executemany("INSERT INTO dsex_mapper VALUES (:id, :trading_code, :sector, :category)", mapper_rows)
+        self.conn.executemany(
+            "INSERT INTO dsex_prices VALUES (:date, :mapper_id, :ltp, :ycp, :value_mn, :volume)", price_rows)
+
+    def group_sums(self, start_date, end_date, members=None, groupings=None, member_from=None, member_to=None):
+        with self.lock:
+            self.conn.execute("DELETE FROM members")
+            self.conn.execute("DELETE FROM groupings")
+            codes = members or []
+            spells = zip(codes, member_from or [None] * len(codes), member_to or [None] * len(codes))
+            self.conn.executemany("INSERT INTO members VALUES (?, ?, ?)", list(spells))
+            self.conn.executemany("INSERT INTO groupings VALUES (?)", [(g,) for g in groupings or []])
+            cursor = self.conn.execute(GROUP_SUMS_SQL, {
+                "start_date": start_date[:10],
+                "end_date": end_date[:10],
+                "all_members": members is None,
+                "all_groupings": groupings is None,
+            })
+            return [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]
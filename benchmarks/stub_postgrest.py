@@ -0,0 +1,256 @@
+"""
+A tiny in-process stand-in for Supabase's PostgREST endpoint.
+
+It serves synthetic `dsex_prices` / `dsex_mapper` / `dsex_index_constituents`
+rows and understands the subset of the PostgREST query syntax the app uses:
+`select` (with one level of embedded resources), `eq/gt/gte/lt/lte/in` filters, `and=(...)`, `order`,
+`limit` and `offset`. POST /rpc/dsex_daily_group_sums is answered by the
+SQLite stand-in of sql/daily_aggregates.sql. `latency` adds a fixed delay per request and
+`offset_cost` a delay per skipped row, which mimics how OFFSET paging gets
+slower the deeper it goes on the real table.
+
+    python -m benchmarks.stub_postgrest --symbols 400 --days 250 --port 54321
+"""
+import argparse
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from benchmarks.sqlite_aggregates import SqliteAggregates
+from benchmarks.synthetic import generate_constituent_rows, generate_price_rows
+
+# Embedded resource name -> (foreign key column on the parent, table name)
+EMBEDS = {"dsex_mapper": ("mapper_id", "dsex_mapper")}
+
+
+def _split_top_level(text, sep=","):
+    """Splits on `sep` while ignoring separators nested inside parentheses."""
+    parts, depth, current = [], 0, ""
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _coerce(value, sample):
+    if isinstance(sample, bool):
+        return value == "true"
+    if isinstance(sample, int):
+        return int(value)
+    if isinstance(sample, float):
+        return float(value)
+    return value
+
+
+def _make_predicate(column, expr):
+    op, _, raw = expr.partition(".")
+    if op == "in":
+        values = raw.strip("()").split(",")
+        return lambda row: str(row.get(column)) in values
+
+    compare = {
+        "eq": lambda a, b: a == b,
+        "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b,
+        "lte": lambda a, b: a <= b,
+    }[op]
+
+    def predicate(row):
+        value = row.get(column)
+        return value is not None and compare(value, _coerce(raw, value))
+
+    return predicate
+
+
+class StubDatabase:
+    """Holds the synthetic tables and evaluates PostgREST-style queries on them."""
+
+    def __init__(self, n_symbols=400, n_days=250, seed=7):
+        mapper, prices = generate_price_rows(n_symbols, n_days, seed)
+        self.tables = {"dsex_mapper": mapper, "dsex_prices": prices,
+                       "dsex_index_constituents": generate_constituent_rows(n_symbols, n_days, seed)}
+        self.by_id = {"dsex_mapper": {row["id"]: row for row in mapper}}
+        # Prices are generated in date order, so a date filter can bisect
+        self.price_dates = [row["date"] for row in prices]
+        self.functions = {"dsex_daily_group_sums": SqliteAggregates(mapper, prices).group_sums}
+        # Response body bytes served so far, to compare transfer volume between query paths
+        self.bytes_sent = 0
+        self._bytes_lock = threading.Lock()
+
+    def count_bytes(self, n):
+        with self._bytes_lock:
+            self.bytes_sent += n
+
+    def _date_slice(self, rows, filters):
+        """Narrows dsex_prices to the requested date window before scanning."""
+        lo, hi = 0, len(rows)
+        for column, expr in filters:
+            if column != "date":
+                continue
+            op, _, value = expr.partition(".")
+            if op in ("eq", "gte"):
+                lo = max(lo, bisect.bisect_left(self.price_dates, value))
+            if op in ("eq", "lte"):
+                hi = min(hi, bisect.bisect_right(self.price_dates, value))
+        return rows[lo:hi]
+
+    def _project(self, row, select):
+        out = {}
+        for field in select:
+            if "(" in field:
+                name, _, inner = field.partition("(")
+                fk_column, table = EMBEDS[name]
+                child = self.by_id[table].get(row.get(fk_column))
+                inner_fields = [f.strip() for f in inner.rstrip(")").split(",")]
+                out[name] = {f: child[f] for f in inner_fields} if child else None
+            elif field == "*":
+                out.update(row)
+            else:
+                out[field] = row.get(field)
+        return out
+
+    def query(self, table, params):
+        rows = self.tables[table]
+        select = _split_top_level(params.get("select", "*"))
+        order = params.get("order")
+        limit = int(params["limit"]) if "limit" in params else None
+        offset = int(params.get("offset", 0))
+
+        filters = []
+        for key, value in params.items():
+            if key in ("select", "order", "limit", "offset"):
+                continue
+            if key == "and":
+                for clause in _split_top_level(value.strip("()")):
+                    column, _, expr = clause.partition(".")
+                    filters.append((column, expr))
+            else:
+                filters.append((key, value))
+
+        if table == "dsex_prices":
+            rows = self._date_slice(rows, filters)
+        predicates = [_make_predicate(column, expr) for column, expr in filters]
+        matched = [row for row in rows if all(p(row) for p in predicates)]
+
+        if order:
+            for clause in reversed(order.split(",")):
+                column, _, direction = clause.partition(".")
+                matched.sort(key=lambda r: r.get(column), reverse=direction.startswith("desc"))
+
+        end = offset + limit if limit is not None else None
+        return [self._project(row, select) for row in matched[offset:end]], offset
+
+    def call(self, function, payload, params):
+        rows = self.functions[function](**payload)
+        offset = int(params.get("offset", 0))
+        end = offset + int(params["limit"]) if "limit" in params else None
+        return rows[offset:end]
+
+
+def make_handler(db, latency=0.0, offset_cost=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            prefix = "/rest/v1/"
+            table = url.path[len(prefix):] if url.path.startswith(prefix) else None
+            if table not in db.tables:
+                self.send_error(404, f"Unknown table {table}")
+                return
+
+            params = dict(parse_qsl(url.query, keep_blank_values=True))
+            try:
+                rows, offset = db.query(table, params)
+            except (KeyError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+
+            time.sleep(latency + offset * offset_cost)
+            self._send_json(rows)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            prefix = "/rest/v1/rpc/"
+            function = url.path[len(prefix):] if url.path.startswith(prefix) else None
+            if function not in db.functions:
+                self.send_error(404, f"Unknown function {function}")
+                return
+
+            params = dict(parse_qsl(url.query, keep_blank_values=True))
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                rows = db.call(function, payload, params)
+            except (KeyError, TypeError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+
+            time.sleep(latency)
+            self._send_json(rows)
+
+        def _send_json(self, rows):
+            body = json.dumps(rows).encode()
+            db.count_bytes(len(body))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class StubPostgrest:
+    """
+    Context manager that runs the stub on a background thread:
+
+        with StubPostgrest(n_symbols=50, n_days=20) as stub:
+            ChunkedFetcher(stub.url, "anon").fetch(...)
+    """
+
+    def __init__(self, n_symbols=400, n_days=250, latency=0.0, offset_cost=0.0, port=0, seed=7):
+        self.db = StubDatabase(n_symbols, n_days, seed)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(self.db, latency, offset_cost))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic DSEX data over a PostgREST-like API.")
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--offset-cost", type=float, default=0.0, help="Seconds added per skipped OFFSET row")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = StubPostgrest(args.symbols, args.days, args.latency, args.offset_cost, args.port)
+    print(f"Stub PostgREST listening on {stub.url}/rest/v1/")
+    stub.server.serve_forever()
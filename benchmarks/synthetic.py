@@ -0,0 +1,125 @@
+"""Synthetic DSEX-shaped data for offline benchmarks (no Supabase needed)."""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config.metrics import DS30_SYMBOLS, MARKET_FRAME_SCHEMA
+from data.schema import enforce_schema
+
+SECTORS = [
+    'Bank', 'Cement', 'Ceramics Sector', 'Engineering', 'Financial Institutions',
+    'Food & Allied', 'Fuel & Power', 'General Insurance', 'IT Sector', 'Jute',
+    'Life Insurance', 'Miscellaneous', 'Mutual Funds', 'Paper & Printing',
+    'Pharmaceuticals & Chemicals', 'Services & Real Estate', 'Tannery Industries',
+    'Telecommunication', 'Textile', 'Travel & Leisure',
+]
+CATEGORIES = ['A', 'B', 'N', 'Z']
+CATEGORY_WEIGHTS = [0.55, 0.2, 0.05, 0.2]
+
+
+def trading_days(n_days, end=None):
+    """Last `n_days` DSE trading days (Sunday-Thursday) up to `end`."""
+    day = end or date.today()
+    days = []
+    while len(days) < n_days:
+        # Python weekday(): Friday=4, Saturday=5 are the DSE weekend
+        if day.weekday() not in (4, 5):
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def generate_mapper(n_symbols=400, seed=7):
+    """One row per symbol: id, trading_code, sector, category (DS30 names come first)."""
+    rng = np.random.default_rng(seed)
+    codes = DS30_SYMBOLS[:n_symbols] + [f"SYM{i:04d}" for i in range(max(0, n_symbols - len(DS30_SYMBOLS)))]
+    sectors = rng.choice(SECTORS, size=n_symbols)
+    categories = rng.choice(CATEGORIES, size=n_symbols, p=CATEGORY_WEIGHTS)
+    # Blue chips are A category
+    categories[:min(n_symbols, len(DS30_SYMBOLS))] = 'A'
+    return [
+        {"id": i + 1, "trading_code": code, "sector": str(sector), "category": str(category)}
+        for i, (code, sector, category) in enumerate(zip(codes, sectors, categories))
+    ]
+
+
+def generate_price_rows(n_symbols=400, n_days=250, seed=7, end=None):
+    """
+    Returns (mapper_rows, price_rows) shaped like Supabase's dsex_mapper and
+    dsex_prices tables. Prices follow a random walk per symbol; price ids are
+    unique and increase with date so they can serve as a paging key.
+    """
+    rng = np.random.default_rng(seed)
+    mapper = generate_mapper(n_symbols, seed)
+    days = trading_days(n_days, end)
+
+    base_price = rng.lognormal(mean=3.5, sigma=1.0, size=n_symbols)
+    base_value = rng.lognormal(mean=0.5, sigma=1.5, size=n_symbols)
+    daily_ret = rng.normal(0.0003, 0.02, size=(n_days, n_symbols)).clip(-0.1, 0.1)
+    closes = base_price * np.cumprod(1 + daily_ret, axis=0)
+    prev_closes = np.vstack([base_price, closes[:-1]])
+    # Roughly 3% of symbols don't trade on a given day
+    traded = rng.random((n_days, n_symbols)) > 0.03
+
+    spreads = np.abs(rng.normal(0, 0.01, size=(n_days, n_symbols))) * closes
+    opens = prev_closes * (1 + rng.normal(0, 0.005, size=(n_days, n_symbols)))
+    values = base_value * rng.lognormal(0, 0.5, size=(n_days, n_symbols))
+    volumes = (values * 1e6 / closes).astype(np.int64)
+
+    rows = []
+    row_id = 1
+    for d, day in enumerate(days):
+        iso = day.isoformat()
+        for s in np.flatnonzero(traded[d]):
+            close = float(closes[d, s])
+            ycp = float(prev_closes[d, s])
+            volume = int(volumes[d, s])
+            rows.append({
+                "id": row_id,
+                "date": iso,
+                "mapper_id": mapper[s]["id"],
+                "openp": round(float(opens[d, s]), 2),
+                "high": round(max(close, ycp) + float(spreads[d, s]), 2),
+                "low": round(min(close, ycp) - float(spreads[d, s]), 2),
+                "ltp": round(close, 2),
+                "closep": round(close, 2),
+                "ycp": round(ycp, 2),
+                "value_mn": round(float(values[d, s]), 4),
+                "volume": volume,
+                "trade": max(1, volume // 500),
+            })
+            row_id += 1
+    return mapper, rows
+
+
+def generate_constituent_rows(n_symbols=400, n_days=250, seed=7, end=None):
+    """
+    dsex_index_constituents rows for DS30: the latest registry list, with a rebalance
+    halfway through the range that swaps its last five names for the first
+    five non-DS30 symbols, so date-effective membership has something to do.
+    """
+    codes = [row["trading_code"] for row in generate_mapper(n_symbols, seed)]
+    days = trading_days(n_days, end)
+    rebalance = days[len(days) // 2].isoformat()
+    leavers = set(DS30_SYMBOLS[-5:])
+    joiners = [c for c in codes if c not in DS30_SYMBOLS][:5]
+
+    spells = [(code, "2013-01-28", rebalance if code in leavers else None)
+              for code in DS30_SYMBOLS if code in codes]
+    spells += [(code, rebalance, None) for code in joiners]
+    return [
+        {"id": i + 1, "index_name": "DS30", "trading_code": code, "effective_from": start, "effective_to": stop}
+        for i, (code, start, stop) in enumerate(spells)
+    ]
+
+
+def generate_market_frame(n_symbols=400, n_days=250, seed=7, end=None):
+    """The typed frame fetch_market_data would return for the synthetic tables."""
+    mapper, rows = generate_price_rows(n_symbols, n_days, seed, end)
+    symbols = pd.DataFrame(mapper).set_index('id')
+    df = pd.DataFrame(rows).drop(columns=['id']).rename(columns={'mapper_id': 'symbol_id'})
+    for col in ['trading_code', 'sector', 'category']:
+        df[col] = df['symbol_id'].map(symbols[col])
+    df, _ = enforce_schema(df, MARKET_FRAME_SCHEMA)
+    return df
@@ -0,0 +1,72 @@
+# Canonical dtypes of the raw market frame returned by fetch_market_data.
+# Every column the pipeline reads is listed here; ingest coerces to these
+# types so compute code never hashes date strings or carries object columns.
+PRICE_COLUMN_DTYPES = {
+    'date': 'datetime64[ns]',
+    'openp': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'ltp': 'float32',
+    'closep': 'float32',
+    'ycp': 'float32',
+    'value_mn': 'float32',
+    'volume': 'int64',   # Single-day volumes can exceed int32 for penny stocks
+    'trade': 'int32',
+    'symbol_id': 'int32',
+}
+
+# Attached from the symbol dimension after the price rows are loaded
+SYMBOL_COLUMN_DTYPES = {
+    'trading_code': 'category',
+    'sector': 'category',
+    'category': 'category',
+}
+
+MARKET_FRAME_SCHEMA = {**PRICE_COLUMN_DTYPES, **SYMBOL_COLUMN_DTYPES}
+
+# Integer columns can't hold NaN; missing counts are stored as 0 (and reported)
+INTEGER_FILL_VALUE = 0
+
+# Index universes. Each version applies from its effective date until the next
+# version of the same index; when DSE rebalances an index, add a version instead
+# of editing the current list, so earlier periods keep their own constituents.
+UNIVERSE_REGISTRY = {
+    "DS30": [
+        {
+            "version": 1,
+            # The list the dashboard has always used, applied back to the index launch
+            "effective_from": "2013-01-28",
+            "symbols": [
+                'BATBC', 'BEACONPHAR', 'BRACBANK', 'BSC', 'BSCPLC',
+                'BXPHARMA', 'CITYBANK', 'DELTALIFE', 'EBL', 'GP',
+                'GPHISPAT', 'HEIDELBCEM', 'IDLC', 'JAMUNAOIL', 'KBPPWBIL',
+                'KOHINOOR', 'LANKABAFIN', 'LHB', 'LINDEBD', 'LOVELLO',
+                'MJLBD', 'OLYMPIC', 'PADMAOIL', 'PRIMEBANK', 'PUBALIBANK',
+                'RENATA', 'ROBI', 'SQURPHARMA', 'UNIQUEHRL', 'WALTONHIL'
+            ],
+        },
+    ],
+}
+
+
+def universe_periods(name):
+    """[(effective_from, effective_to or None, symbols), ...] of a universe in date order."""
+    versions = sorted(UNIVERSE_REGISTRY[name], key=lambda v: v["effective_from"])
+    ends = [v["effective_from"] for v in versions[1:]] + [None]
+    return [(v["effective_from"], end, list(v["symbols"])) for v, end in zip(versions, ends)]
+
+
+def universe_members(name, as_of=None):
+    """Constituents in effect on `as_of` (an ISO date; default: the latest version)."""
+    periods = universe_periods(name)
+    if as_of is None:
+        return periods[-1][2]
+    as_of = str(as_of)[:10]
+    for start, end, symbols in periods:
+        if start <= as_of and (end is None or as_of < end):
+            return symbols
+    return []
+
+
+# Latest DS30 version (seeds the synthetic benchmark data; filters read the date-effective data.constituents)
+DS30_SYMBOLS = universe_members("DS30")
@@ -6,4 +6,48 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-DEFAULT_CACHE_TTL = 3600  # 1 hour
\ No newline at end of file
+DEFAULT_CACHE_TTL = 3600  # 1 hour
+# A trading day's prices are final once this Dhaka time (UTC+6, no DST) has passed;
+# the DSE session closes at 14:30 and late trade corrections land shortly after
+MARKET_SETTLED_AT = os.getenv("DSEX_MARKET_SETTLED_AT", "15:30")
+MARKET_UTC_OFFSET_HOURS = 6
+
+# Local Parquet price cache (one file per trading date)
+CACHE_DIR = os.getenv("DSEX_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache"))
+
+# Chunked Supabase fetcher
+FETCH_PAGE_SIZE = 1000
+FETCH_MAX_WORKERS = 8
+# Rows stream_market_data() buffers (as typed columns) before yielding a batch
+STREAM_BATCH_ROWS = int(os.getenv("DSEX_STREAM_BATCH_ROWS", "200000"))
+# Unique, indexed column of dsex_prices used for keyset paging within a date chunk
+PRICE_KEY_COLUMN = os.getenv("DSEX_PRICE_KEY_COLUMN", "id")
+# Foreign key from dsex_prices to dsex_mapper.id (the compact symbol id)
+SYMBOL_KEY_COLUMN = os.getenv("DSEX_SYMBOL_KEY_COLUMN", "mapper_id")
+# Market/sector tabs read daily aggregates computed by Postgres (sql/daily_aggregates.sql)
+SERVER_AGGREGATES = os.getenv("DSEX_SERVER_AGGREGATES", "0") == "1"
+
+# In-process memo cache for domain compute results (LRU, evicted by size)
+MEMO_MAX_BYTES = int(os.getenv("DSEX_MEMO_MAX_MB", "256")) * 1024 * 1024
+# Built Plotly figures, keyed by view parameters and data fingerprint (utils/charts.py)
+FIGURE_CACHE_MAX_BYTES = int(os.getenv("DSEX_FIGURE_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+# Hot-path instrumentation (utils/instrument.py)
+TIMING_HISTORY = int(os.getenv("DSEX_TIMING_HISTORY", "500"))
+# Append every timing record as one JSON line to this file (unset = log only)
+TIMING_LOG_PATH = os.getenv("DSEX_TIMING_LOG")
+# Peak memory per call via tracemalloc; it slows allocation-heavy code down noticeably
+TRACK_PEAK_MEMORY = os.getenv("DSEX_TRACK_PEAK_MEMORY", "0") == "1"
+
+# Multi-year history store (data/history.py), filled by `python -m data.history sync`
+HISTORY_DIR = os.getenv("DSEX_HISTORY_DIR", os.path.join(CACHE_DIR, "history"))
+HISTORY_START = os.getenv("DSEX_HISTORY_START", "2013-01-01")  # DSEX was launched in January 2013
+# Trailing days re-fetched on every sync, in case they were still updating
+HISTORY_RESYNC_DAYS = 5
+
+# Precomputed dashboard views written by `python -m reports.batch`
+REPORT_DIR = os.getenv("DSEX_REPORT_DIR", os.path.join(CACHE_DIR, "reports"))
+REPORT_WORKERS = int(os.getenv("DSEX_REPORT_WORKERS", str(os.cpu_count() or 2)))
+
+# Timeline charts: traces longer than this are LTTB-downsampled and drawn with WebGL (0 = off)
+CHART_POINT_BUDGET = int(os.getenv("DSEX_CHART_POINT_BUDGET", "1500"))
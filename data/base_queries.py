@@ -1,68 +1,291 @@
+import numpy as np
 import pandas as pd
-import time
-from data.client import supabase_client
-import streamlit as st
+from config.metrics import PRICE_COLUMN_DTYPES
+from config.settings import STREAM_BATCH_ROWS, SYMBOL_KEY_COLUMN
+from data.client import get_fetcher
+from data.cache import ensure_price_range, load_symbol_dimension, memoize, read_partitions
+from data.fetcher import FetchError
+from data.history import HistoryStore
+from data.schema import enforce_schema
+from utils.errors import report_error
+from utils.instrument import instrument
 
-def fetch_market_data(start_date: str, end_date: str):
+# Prices travel with the compact symbol id only; names come from the symbol dimension
+PRICE_SELECT = f"date,openp,high,low,ltp,closep,ycp,value_mn,volume,trade,{SYMBOL_KEY_COLUMN}"
+SYMBOL_SELECT = "id,trading_code,category,sector"
+
+# Price columns the market/sector aggregates and the stock benchmarks read;
+# OHLC is only loaded for the symbols a stock view charts
+MARKET_COLUMNS = ['date', 'symbol_id', 'ltp', 'ycp', 'value_mn', 'volume']
+OHLC_COLUMNS = ['date', 'symbol_id', 'openp', 'high', 'low', 'closep']
+
+
+@instrument
+def fetch_market_data(start_date: str, end_date: str, columns=None, symbols=None, fetcher=None):
+    """
+    Returns prices for the date range, reading already-cached trading dates from
+    the local Parquet cache and fetching only the missing ranges from Supabase.
+    trading_code, sector and category are attached from the symbol dimension.
+
+    `columns` (price columns, e.g. MARKET_COLUMNS) and `symbols` (trading codes)
+    project the result so each view loads only what it shows. Missing dates are
+    always fetched and cached whole, so every projection is served from the
+    same partitions; assembled frames are memoized per projection until a
+    partition in the range is rewritten. Once `python -m data.history sync`
+    has run, settled days are sliced from the memory-mapped history store
+    instead, which keeps multi-year ranges cheap (code that works on grids
+    skips the long frame altogether, see fetch_market_window).
+
+    The frame follows config.metrics.MARKET_FRAME_SCHEMA; the validation report
+    of the final schema pass is kept in `df.attrs['schema_report']`.
+    `fetcher` overrides the default ChunkedFetcher (e.g. one pointed at a stub).
+    """
+    # Days the synced history store covers are sliced from it; only the rest
+    # goes through the per-date Parquet cache
+    history_end, history_generation = _history_span(start_date, end_date)
+    cache_start = start_date if history_end is None else _next_day(history_end)
+    version = 0.0
+    if cache_start <= end_date:
+        version = ensure_price_range(cache_start, end_date,
+                                     lambda start, end: _fetch_market_data_remote(start, end, fetcher))
+    if columns is not None:
+        columns = tuple(dict.fromkeys(['date', 'symbol_id', *columns]))
+    if symbols is not None:
+        symbols = tuple(sorted(symbols))
+
+    dimension = fetch_symbol_dimension(fetcher=fetcher)
+    df = _assemble_market_frame(start_date, end_date, columns, symbols, dimension, version,
+                                history_end, history_generation)
+    if df.attrs.get('unknown_symbols'):
+        # A new listing appeared since the dimension was cached
+        dimension = fetch_symbol_dimension(refresh=True, fetcher=fetcher)
+        df = _assemble_market_frame(start_date, end_date, columns, symbols, dimension, version,
+                                    history_end, history_generation)
+    return df
+
+
+@instrument
+def fetch_market_window(start_date: str, end_date: str, columns=None, symbols=None, fetcher=None):
+    """
+    fetch_market_data() for code that works on (date x symbol) grids rather
+    than a long frame (see domains.stock.panel.build_window_panel). Returns
+    (window, tail, dimension):
+
+        window     data.history.HistoryWindow of the days the synced history
+                   store serves, whose grids are views of its memory-mapped
+                   files; None when the store doesn't cover start_date
+        tail       fetch_market_data() for the remaining days (the whole
+                   range without a store)
+        dimension  the symbol dimension naming the window's symbol ids
+    """
+    history_end, _ = _history_span(start_date, end_date)
+    tail_start = start_date if history_end is None else _next_day(history_end)
+    # The tail goes first: it refreshes the cached dimension if a new listing appeared
+    tail = fetch_market_data(tail_start, end_date, columns, symbols, fetcher) \
+        if tail_start <= end_date else pd.DataFrame()
+    dimension = fetch_symbol_dimension(fetcher=fetcher)
+    if dimension is None:
+        dimension = pd.DataFrame(columns=SYMBOL_SELECT.split(","))
+    if history_end is None:
+        return None, tail, dimension
+
+    symbol_ids = None
+    if symbols is not None:
+        symbol_ids = dimension.loc[dimension['trading_code'].isin(symbols), 'id'].tolist()
+    store_columns = [c for c in columns if c not in ('date', 'symbol_id')] if columns is not None else None
+    window = HistoryStore.open().window(start_date, history_end, store_columns, symbol_ids)
+    if not np.isin(window.symbol_ids[window.has_row.any(axis=0)], dimension['id']).all():
+        refreshed = fetch_symbol_dimension(refresh=True, fetcher=fetcher)
+        dimension = dimension if refreshed is None else refreshed
+    return window, tail, dimension
+
+
+def _history_span(start_date, end_date):
+    """
+    (last day of [start_date, end_date] to read from the history store, its
+    generation), or (None, None) if the store doesn't cover start_date. Days
+    that had not settled when the store was synced are never taken from it,
+    since their rows may be a partial session.
+    """
+    history = HistoryStore.open()
+    if history is None or not history.covers(start_date):
+        return None, None
+    history_end = min(history.last_settled_date, pd.Timestamp(end_date))
+    if history_end < pd.Timestamp(start_date):
+        return None, None
+    return history_end.strftime('%Y-%m-%d'), history.generation
+
+
+def _next_day(day):
+    return (pd.Timestamp(day) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+@memoize
+def _assemble_market_frame(start_date, end_date, columns, symbols, dimension, version,
+                           history_end=None, history_generation=None):
+    """
+    The cached partitions (and the history store slice up to `history_end`) of
+    one projection joined to the symbol dimension. `version` and
+    `history_generation` only key the memo.
+    """
+    symbol_ids = None
+    if symbols is not None:
+        symbol_ids = dimension.loc[dimension['trading_code'].isin(symbols), 'id'].tolist() \
+            if not dimension.empty else []
+
+    parts = []
+    cache_start = start_date
+    if history_end is not None:
+        store_columns = [c for c in columns if c not in ('date', 'symbol_id')] if columns is not None else None
+        parts.append(HistoryStore.open().read_frame(start_date, history_end, store_columns, symbol_ids))
+        cache_start = _next_day(history_end)
+    if cache_start <= end_date:
+        parts.append(read_partitions(cache_start, end_date, columns, symbol_ids))
+
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame()
+    prices = pd.concat(parts, ignore_index=True)
+    prices = prices.sort_values('date', kind='stable').reset_index(drop=True)
+
+    known_ids = prices.loc[prices['symbol_id'] >= 0, 'symbol_id']
+    df, report = enforce_schema(attach_symbols(prices, dimension))
+    df.attrs['schema_report'] = report
+    df.attrs['unknown_symbols'] = not known_ids.isin(dimension.get('id', [])).all()
+    return df
+
+
+def fetch_symbol_dimension(refresh=False, fetcher=None):
+    """The dsex_mapper table (~400 rows), cached locally for DEFAULT_CACHE_TTL."""
+    return load_symbol_dimension(lambda: _fetch_symbols_remote(fetcher), refresh=refresh)
+
+
+def attach_symbols(prices, symbols):
+    """
+    Adds trading_code, sector and category to a price frame keyed by symbol_id.
+    They are built as Categoricals straight from the dimension's codes, so no
+    per-row string is ever materialised.
+    """
+    df = prices.copy()
+    if symbols.empty:
+        for col in ['trading_code', 'sector', 'category']:
+            df[col] = pd.Categorical([None] * len(df))
+        return df
+
+    symbol_pos = pd.Index(symbols['id']).get_indexer(df['symbol_id'])
+    unknown = symbol_pos < 0
+
+    for col in ['trading_code', 'sector', 'category']:
+        dim_col = pd.Categorical(symbols[col])
+        codes = np.where(unknown, -1, dim_col.codes[symbol_pos])
+        df[col] = pd.Categorical.from_codes(codes, categories=dim_col.categories)
+    return df
+
+
+def _fetch_symbols_remote(fetcher=None):
+    fetcher = fetcher or get_fetcher()
+    try:
+        rows = fetcher.fetch_table("dsex_mapper", SYMBOL_SELECT)
+    except FetchError as e:
+        report_error(f"Database Connection Error: {e}")
+        return None
+
+    symbols = pd.DataFrame(rows, columns=SYMBOL_SELECT.split(","))
+    symbols['id'] = symbols['id'].astype('int32')
+    return symbols
+
+
+def _fetch_market_data_remote(start_date: str, end_date: str, fetcher=None):
     """
     Fetches data from the partitioned dsex_prices table.
-    Postgres automatically prunes partitions based on the .gte() and .lte() date filters.
-    """
-    all_rows = []
-    page_size = 1000
-    start_index = 0
-    max_retries = 3
-
-    while True:
-        success = False
-        for attempt in range(max_retries):
-            try:
-                # IMPORTANT: Keep the table name as 'dsex_prices' if you renamed the
-                # partitioned table to 'dsex_prices' in the SQL swap step.
-                response = (
-                    supabase_client.table("dsex_prices")
-                    .select("date, openp, high,low,ltp, closep, ycp, value_mn, volume, value_mn, trade,  dsex_mapper(trading_code, category, sector)")
-                    .gte("date", start_date)  # These two lines trigger 'Partition Pruning'
-                    .lte("date", end_date)
-                    .order("date", desc=False)
-                    .range(start_index, start_index + page_size - 1)
-                    .execute()
-                )
-                data = response.data
-                success = True
-                break
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                else:
-                    st.error(f"Database Connection Error: {e}")
-                    return pd.DataFrame()
-
-        if not data:
-            break
-
-        all_rows.extend(data)
-        if len(data) < page_size:
-            break
-
-        start_index += page_size
-        time.sleep(0.05)  # Reduced sleep since partitioning is faster
-
-    df = pd.DataFrame(all_rows)
+    The range is split into per-day chunks (each one hits a single partition)
+    that are fetched concurrently and paged by key instead of OFFSET; each
+    chunk is unpacked into column arrays as it arrives, so the range is never
+    held as one list of dicts. Returns None if the database could not be reached.
+    """
+    fetcher = fetcher or get_fetcher()
+    try:
+        batches = list(_columnar_batches(fetcher, start_date, end_date, PRICE_SELECT.split(",")))
+    except FetchError as e:
+        report_error(f"Database Connection Error: {e}")
+        return None
+
+    return _typed_price_frame(batches[0] if batches else [], fetcher.key_column)
+
+
+def _columnar_batches(fetcher, start_date, end_date, fields, batch_rows=None):
+    """
+    The range's price rows as {field: array} batches of about `batch_rows` rows
+    (None = one batch), always whole trading days. Each fetched date chunk is
+    unpacked into per-column NumPy buffers straight away and its list of dicts
+    dropped: dates stay strings (parsed once per batch), numbers become float64
+    with None -> NaN. Raises FetchError if a chunk cannot be fetched.
+    """
+    buffers = {field: [] for field in fields}
+    buffered = 0
+
+    def flush():
+        batch = {field: np.concatenate(parts) for field, parts in buffers.items()}
+        for parts in buffers.values():
+            parts.clear()
+        return batch
+
+    for _, rows in fetcher.iter_chunks(start_date, end_date, ",".join(fields)):
+        if not rows:
+            continue
+        for field in fields:
+            dtype = object if field == 'date' else 'float64'
+            buffers[field].append(np.array([row.get(field) for row in rows], dtype=dtype))
+        buffered += len(rows)
+        del rows
+
+        if batch_rows is not None and buffered >= batch_rows:
+            yield flush()
+            buffered = 0
+
+    if buffered:
+        yield flush()
+
+
+def _typed_price_frame(rows, key_column):
+    """
+    PostgREST price rows (a list of dicts, or a dict of column arrays) as a
+    typed frame keyed by symbol_id.
+    """
+    df = pd.DataFrame(rows)
 
     if not df.empty:
-        # Flattening nested join data
-        if not df.empty:
-            df['trading_code'] = df['dsex_mapper'].apply(
-                lambda x: x.get('trading_code') if isinstance(x, dict) else None)
-            df['sector'] = df['dsex_mapper'].apply(lambda x: x.get('sector') if isinstance(x, dict) else None)
-            # ADD THIS LINE:
-            df['category'] = df['dsex_mapper'].apply(lambda x: x.get('category') if isinstance(x, dict) else None)
-
-            df.drop(columns=['dsex_mapper'], inplace=True)
-        numeric_cols = ['ltp', 'closep', 'ycp', 'value_mn']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
-
-    return df
\ No newline at end of file
+        df = df.rename(columns={SYMBOL_KEY_COLUMN: 'symbol_id'})
+        df['symbol_id'] = pd.to_numeric(df['symbol_id'], errors='coerce').fillna(-1).astype('int32')
+
+        # The paging key is an implementation detail of the fetcher
+        df.drop(columns=[key_column], inplace=True, errors='ignore')
+        # Typed before it reaches the Parquet cache, so partitions are compact too
+        df, _ = enforce_schema(df, PRICE_COLUMN_DTYPES)
+
+    return df
+
+
+def stream_market_data(start_date: str, end_date: str, columns=None, fetcher=None, batch_rows=STREAM_BATCH_ROWS):
+    """
+    Streaming counterpart of fetch_market_data() for ranges too long to hold as
+    one frame, straight from Supabase (the local caches are bypassed).
+
+    Only the projected `columns` are requested. Each fetched date chunk is
+    unpacked into per-column NumPy buffers as soon as it arrives and its list
+    of dicts is dropped; once about `batch_rows` rows are buffered they are
+    yielded as one typed frame with trading_code, sector and category
+    attached. Batches always hold whole trading days, so peak memory is one
+    batch plus the fetcher's read-ahead whatever the range.
+    Raises FetchError if a chunk cannot be fetched.
+    """
+    fetcher = fetcher or get_fetcher()
+    dimension = fetch_symbol_dimension(fetcher=fetcher)
+    if dimension is None:
+        dimension = pd.DataFrame(columns=SYMBOL_SELECT.split(","))
+
+    fields = [c for c in PRICE_SELECT.split(",")
+              if columns is None or c in columns or c in ('date', SYMBOL_KEY_COLUMN)]
+    for batch in _columnar_batches(fetcher, start_date, end_date, fields, batch_rows):
+        chunk, _ = enforce_schema(attach_symbols(_typed_price_frame(batch, fetcher.key_column), dimension))
+        yield chunk
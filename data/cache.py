@@ -0,0 +1,400 @@
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as pa_ds
+
+from config.settings import (CACHE_DIR, DEFAULT_CACHE_TTL, MARKET_SETTLED_AT, MARKET_UTC_OFFSET_HOURS,
+                             MEMO_MAX_BYTES)
+
+# On-disk layout (one Parquet file per trading date):
+#   CACHE_DIR/prices/v3/2024-01-02.parquet
+#   CACHE_DIR/prices/v3/_manifest.json   -> {"2024-01-02": <fetched_at epoch>, ...}
+#   CACHE_DIR/symbols.parquet            -> the dsex_mapper symbol dimension
+#   CACHE_DIR/constituents.parquet       -> index constituent history (data/constituents.py)
+# The manifest records every date we have asked Supabase for, including
+# weekends and holidays that came back empty, so they are never re-fetched.
+# Bump PRICE_CACHE_VERSION whenever the partition columns or dtypes change.
+PRICE_CACHE_VERSION = 3
+PRICE_DIR = os.path.join(CACHE_DIR, "prices", f"v{PRICE_CACHE_VERSION}")
+MANIFEST_PATH = os.path.join(PRICE_DIR, "_manifest.json")
+SYMBOLS_PATH = os.path.join(CACHE_DIR, "symbols.parquet")
+CONSTITUENTS_PATH = os.path.join(CACHE_DIR, "constituents.parquet")
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _partition_path(day):
+    return os.path.join(PRICE_DIR, f"{day.isoformat()}.parquet")
+
+
+def _atomic_write(path, write_fn):
+    """Writes to a temp file first so concurrent sessions never read half a file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt manifest only costs us a re-fetch
+        return {}
+
+
+def _save_manifest(manifest):
+    os.makedirs(PRICE_DIR, exist_ok=True)
+
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(manifest, f, sort_keys=True)
+
+    _atomic_write(MANIFEST_PATH, write)
+
+
+MARKET_TZ = timezone(timedelta(hours=MARKET_UTC_OFFSET_HOURS))
+
+
+def settled_at(day):
+    """Epoch seconds after which `day`'s prices are final (MARKET_SETTLED_AT, Dhaka time)."""
+    hour, minute = (int(part) for part in MARKET_SETTLED_AT.split(":"))
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=MARKET_TZ).timestamp()
+
+
+def last_settled_day(as_of):
+    """The last date whose prices were already final at epoch `as_of`."""
+    day = datetime.fromtimestamp(as_of, MARKET_TZ).date()
+    return day if settled_at(day) <= as_of else day - timedelta(days=1)
+
+
+def is_fresh(day, fetched_at, now=None, ttl=DEFAULT_CACHE_TTL):
+    """
+    A date fetched after it settled never changes again, so it is cached forever.
+    One fetched earlier (e.g. mid-session) is re-fetched once it has settled,
+    and until then it is still moving, so it expires after the TTL.
+    """
+    now = now or time.time()
+    settled = settled_at(day)
+    if fetched_at >= settled:
+        return True
+    if now >= settled:
+        return False
+    return (now - fetched_at) < ttl
+
+
+def missing_date_ranges(start_date, end_date, manifest=None):
+    """Returns [(start, end), ...] ISO date pairs that are not cached (or stale)."""
+    manifest = load_manifest() if manifest is None else manifest
+    start, end = _to_date(start_date), _to_date(end_date)
+
+    ranges = []
+    run_start = None
+    day = start
+    while day <= end:
+        fetched_at = manifest.get(day.isoformat())
+        cached = fetched_at is not None and is_fresh(day, fetched_at)
+        if not cached and run_start is None:
+            run_start = day
+        elif cached and run_start is not None:
+            ranges.append((run_start.isoformat(), (day - timedelta(days=1)).isoformat()))
+            run_start = None
+        day += timedelta(days=1)
+
+    if run_start is not None:
+        ranges.append((run_start.isoformat(), end.isoformat()))
+    return ranges
+
+
+def write_partitions(df, start_date, end_date):
+    """
+    Stores a freshly fetched range: one Parquet file per trading date, and marks
+    every calendar day in [start_date, end_date] as covered in the manifest.
+    """
+    os.makedirs(PRICE_DIR, exist_ok=True)
+    start, end = _to_date(start_date), _to_date(end_date)
+
+    if not df.empty:
+        for day, day_df in df.groupby('date', sort=False):
+            _atomic_write(
+                _partition_path(_to_date(day)),
+                lambda path, part=day_df: part.reset_index(drop=True).to_parquet(path, index=False)
+            )
+
+    manifest = load_manifest()
+    fetched_at = time.time()
+    day = start
+    while day <= end:
+        manifest[day.isoformat()] = fetched_at
+        day += timedelta(days=1)
+    _save_manifest(manifest)
+
+
+def read_partitions(start_date, end_date, columns=None, symbol_ids=None):
+    """
+    Reads all cached trading dates in the range into a single DataFrame.
+    `columns` and `symbol_ids` are pushed down into the Parquet scan, so a view
+    that needs a few columns or symbols never materialises the rest.
+    """
+    start, end = _to_date(start_date), _to_date(end_date)
+    paths = []
+    day = start
+    while day <= end:
+        path = _partition_path(day)
+        if os.path.exists(path):
+            paths.append(path)
+        day += timedelta(days=1)
+
+    if not paths:
+        return pd.DataFrame(columns=list(columns) if columns else None)
+
+    # One dataset scan is much faster than concatenating hundreds of small frames
+    dataset = pa_ds.dataset(paths, format="parquet")
+    row_filter = pa_ds.field('symbol_id').isin(list(symbol_ids)) if symbol_ids is not None else None
+    return dataset.to_table(columns=list(columns) if columns else None, filter=row_filter).to_pandas()
+
+
+def ensure_price_range(start_date, end_date, fetch_range):
+    """
+    Fetches the date ranges missing from disk through `fetch_range(start, end)`;
+    it must return a DataFrame, or None on failure (failed ranges are not
+    marked as covered so the next run retries them).
+
+    Returns the range's cache version (latest fetch time of any day in it), which
+    changes whenever a partition in the range is rewritten.
+    """
+    for range_start, range_end in missing_date_ranges(start_date, end_date):
+        fetched = fetch_range(range_start, range_end)
+        if fetched is None:
+            continue
+        write_partitions(fetched, range_start, range_end)
+
+    manifest = load_manifest()
+    start, end = _to_date(start_date), _to_date(end_date)
+    version = 0.0
+    day = start
+    while day <= end:
+        version = max(version, manifest.get(day.isoformat(), 0.0))
+        day += timedelta(days=1)
+    return version
+
+
+def load_price_range(start_date, end_date, fetch_range, columns=None, symbol_ids=None):
+    """Cache-first loader: ensure_price_range() followed by read_partitions()."""
+    ensure_price_range(start_date, end_date, fetch_range)
+    df = read_partitions(start_date, end_date, columns, symbol_ids)
+    if not df.empty:
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    return df
+
+
+def clear_price_cache():
+    """Drops every cached partition and the manifest."""
+    if not os.path.isdir(PRICE_DIR):
+        return
+    for name in os.listdir(PRICE_DIR):
+        os.remove(os.path.join(PRICE_DIR, name))
+
+
+def load_cached_table(path, fetch, refresh=False, ttl=DEFAULT_CACHE_TTL):
+    """
+    Returns a small table cached as one Parquet file at `path`. It is re-fetched
+    through `fetch()` once the file is older than the TTL or when `refresh` is
+    set; if that fetch fails (returns None) the stale copy is still used.
+    """
+    if os.path.exists(path) and not refresh:
+        if (time.time() - os.path.getmtime(path)) < ttl:
+            return pd.read_parquet(path)
+
+    fetched = fetch()
+    if fetched is None:
+        return pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic_write(path, lambda tmp_path: fetched.to_parquet(tmp_path, index=False))
+    return fetched
+
+
+def load_symbol_dimension(fetch_symbols, refresh=False, ttl=DEFAULT_CACHE_TTL):
+    """Returns the cached symbol dimension (id, trading_code, category, sector)."""
+    return load_cached_table(SYMBOLS_PATH, fetch_symbols, refresh, ttl)
+
+
+# --- In-process memoization of domain compute functions ---
+
+def frame_fingerprint(df):
+    """
+    An identity for a DataFrame's full contents: shape, column names and
+    dtypes, and a digest of every value. Numeric and datetime columns are
+    hashed straight from their buffers, categoricals as codes plus
+    categories, anything else through pandas' row hashing. Two fetches of the
+    same range produce the same fingerprint; any changed cell changes it.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode())
+    for _, column in df.items():
+        _hash_column(digest, column)
+    return digest.hexdigest()
+
+
+def _hash_column(digest, column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        digest.update(np.ascontiguousarray(column.cat.codes.to_numpy()).view(np.uint8))
+        column = pd.Series(column.cat.categories)
+    elif isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+        digest.update(np.ascontiguousarray(column.to_numpy()).view(np.uint8))
+        return
+    digest.update(np.ascontiguousarray(pd.util.hash_pandas_object(column, index=False).to_numpy()).view(np.uint8))
+
+
+def _freeze(value):
+    """Turns call arguments into a hashable cache-key component."""
+    if isinstance(value, pd.DataFrame):
+        return ('frame', frame_fingerprint(value))
+    if isinstance(value, pd.Series):
+        return ('series', frame_fingerprint(value.to_frame()))
+    # Immutable containers such as StockPanel name themselves
+    memo_key = getattr(value, 'memo_key', None)
+    if memo_key is not None:
+        return memo_key
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=str) if isinstance(value, (set, frozenset)) else value
+        return ('seq', tuple(_freeze(v) for v in items))
+    return value
+
+
+def _estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    if hasattr(value, 'nbytes'):
+        # NumPy arrays and array containers such as StockPanel
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class MemoCache:
+    """Thread-safe LRU keyed by call signature, bounded by estimated result bytes."""
+
+    def __init__(self, max_bytes=MEMO_MAX_BYTES, sizer=None):
+        self.max_bytes = max_bytes
+        self.sizer = sizer or _estimate_size
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {}  # function name -> {"hits", "misses", "evictions"}
+
+    def _fn_stats(self, name):
+        return self.stats.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0})
+
+    def get(self, name, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._fn_stats(name)["hits"] += 1
+                return True, self._entries[key][0]
+            self._fn_stats(name)["misses"] += 1
+            return False, None
+
+    def put(self, key, value):
+        size = self.sizer(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                # Keys built by memoize() start with the function name
+                self._fn_stats(evicted_key[0])["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.stats.clear()
+
+    def summary(self):
+        with self._lock:
+            hits = sum(s["hits"] for s in self.stats.values())
+            misses = sum(s["misses"] for s in self.stats.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if (hits + misses) else 0.0,
+                "functions": {name: dict(s) for name, s in self.stats.items()},
+            }
+
+
+_memo_cache = MemoCache()
+
+
+def memoize(fn=None, *, cache=None):
+    """
+    Caches `fn` results keyed by its name, a fingerprint of every DataFrame
+    argument and the remaining arguments. Results are shared between callers,
+    so treat them as read-only. `cache` selects another MemoCache than the
+    shared one (e.g. the figure cache in utils/charts.py).
+    """
+    if fn is None:
+        return lambda f: memoize(f, cache=cache)
+    cache = cache or _memo_cache
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            key = (name, _freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            # Unhashable argument we don't know how to fingerprint: just run it
+            return fn(*args, **kwargs)
+
+        found, value = cache.get(name, key)
+        if found:
+            return value
+        value = fn(*args, **kwargs)
+        cache.put(key, value)
+        return value
+
+    wrapper.uncached = fn
+    return wrapper
+
+
+def memo_stats():
+    """Hit/miss/eviction counts per memoized function plus cache occupancy."""
+    return _memo_cache.summary()
+
+
+def clear_memo():
+    _memo_cache.clear()
@@ -1,36 +1,67 @@
-# from supabase import create_client, Client
-# from supabase.lib.client_options import ClientOptions # Add this import
-# from config.settings import SUPABASE_URL, SUPABASE_KEY
-#
-# # Wrap your settings in the ClientOptions object
-# # This prevents the 'dict' object has no attribute error
-# opts = ClientOptions(
-#     postgrest_client_timeout=45,
-#     storage_client_timeout=45,
-#     schema="public"
-# )
-#
-# # Initialize the client using the options object
-# supabase_client: Client = create_client(
-#     SUPABASE_URL,
-#     SUPABASE_KEY,
-#     options=opts
-# )
-
-
-import streamlit as st
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions
-
-# Get secrets from Streamlit
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-
-# Explicitly define options to avoid the 'storage' AttributeError
-opts = ClientOptions(
-    postgrest_client_timeout=10,
-    headers={"x-application-name": "dhaka-stocks"}
-)
-
-# Initialize client
-supabase_client: Client = create_client(SUPABASE_URL, SUPABASE_KEY, options=opts)
\ No newline at end of file
+"""
+Supabase connection settings for the data layer, resolved lazily.
+
+Nothing is read at import time: the first call to get_credentials() or
+get_fetcher() looks, in order, at configure(), the SUPABASE_URL /
+SUPABASE_KEY environment variables (.env included) and finally Streamlit
+secrets. CLIs, worker processes, tests and benchmarks can call configure()
+(or pass their own fetcher) and never touch Streamlit.
+"""
+from config.settings import SUPABASE_KEY as ENV_SUPABASE_KEY, SUPABASE_URL as ENV_SUPABASE_URL
+
+_configured = {"url": None, "key": None, "fetcher": None}
+_resolved = {}
+
+
+def configure(url=None, key=None, fetcher=None):
+    """Overrides the credentials and/or the default fetcher for this process."""
+    _configured.update(url=url, key=key, fetcher=fetcher)
+    _resolved.clear()
+
+
+def get_credentials():
+    """(url, key) for the Supabase project; raises RuntimeError if none is set up."""
+    if "credentials" not in _resolved:
+        url = _configured["url"] or ENV_SUPABASE_URL
+        key = _configured["key"] or ENV_SUPABASE_KEY
+        if not (url and key):
+            url, key = _streamlit_secrets()
+        if not (url and key):
+            raise RuntimeError("Supabase credentials not found: set SUPABASE_URL and SUPABASE_KEY "
+                               "(environment or .env) or add them to .streamlit/secrets.toml")
+        _resolved["credentials"] = (url, key)
+    return _resolved["credentials"]
+
+
+def _streamlit_secrets():
+    # Streamlit is only imported when nothing else provided credentials
+    try:
+        import streamlit as st
+        return st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"]
+    except (ImportError, FileNotFoundError, KeyError):
+        return None, None
+
+
+def get_fetcher():
+    """The process-wide ChunkedFetcher (or the one passed to configure())."""
+    if _configured["fetcher"] is not None:
+        return _configured["fetcher"]
+    if "fetcher" not in _resolved:
+        from data.fetcher import ChunkedFetcher
+        _resolved["fetcher"] = ChunkedFetcher(*get_credentials())
+    return _resolved["fetcher"]
+
+
+def get_supabase_client():
+    """The supabase-py client, created on first use."""
+    if "supabase" not in _resolved:
+        from supabase import create_client
+        from supabase.lib.client_options import ClientOptions
+
+        # Explicitly define options to avoid the 'storage' AttributeError
+        opts = ClientOptions(
+            postgrest_client_timeout=10,
+            headers={"x-application-name": "dhaka-stocks"}
+        )
+        _resolved["supabase"] = create_client(*get_credentials(), options=opts)
+    return _resolved["supabase"]
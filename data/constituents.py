@@ -0,0 +1,74 @@
+"""
+Index constituent history: one row per membership spell (index_name,
+trading_code, effective_from inclusive, effective_to exclusive; NaT = open).
+Every DS30 filter reads its members from these rows, so a past date always
+resolves to the constituents of that day (see data.membership).
+
+fetch_constituent_history() is the one loader: the database table, with
+the built-in UNIVERSE_REGISTRY versions for any index it has no rows for.
+"""
+import logging
+
+import pandas as pd
+
+from config.metrics import UNIVERSE_REGISTRY, universe_periods
+from data.cache import CONSTITUENTS_PATH, load_cached_table
+from data.client import get_fetcher
+from data.fetcher import FetchError
+
+logger = logging.getLogger(__name__)
+
+# Table defined in sql/index_constituents.sql
+CONSTITUENTS_TABLE = "dsex_index_constituents"
+CONSTITUENT_COLUMNS = ['index_name', 'trading_code', 'effective_from', 'effective_to']
+
+
+def fetch_constituent_history(refresh=False, fetcher=None):
+    """
+    Constituent history (index_name, trading_code, effective_from, effective_to),
+    cached locally for DEFAULT_CACHE_TTL. Indexes the database table has no rows
+    for keep their UNIVERSE_REGISTRY versions.
+    """
+    return load_cached_table(CONSTITUENTS_PATH, lambda: _fetch_constituents_remote(fetcher), refresh=refresh)
+
+
+def _fetch_constituents_remote(fetcher=None):
+    registry = registry_constituents()
+    fetcher = fetcher or get_fetcher()
+    try:
+        rows = fetcher.fetch_table(CONSTITUENTS_TABLE, ",".join(['id', *CONSTITUENT_COLUMNS]))
+    except FetchError as e:
+        # The registry is cached in its place, so a missing table isn't retried every rerun
+        logger.warning("Index constituent table unavailable, using the built-in registry: %s", e)
+        return registry
+
+    remote = _typed_constituents(pd.DataFrame(rows, columns=['id', *CONSTITUENT_COLUMNS]).drop(columns='id'))
+    fallback = registry[~registry['index_name'].isin(remote['index_name'])]
+    return pd.concat([remote, fallback], ignore_index=True)
+
+
+def registry_constituents():
+    """The versions of UNIVERSE_REGISTRY as constituent history rows."""
+    rows = [
+        {"index_name": name, "trading_code": code, "effective_from": start, "effective_to": end}
+        for name in UNIVERSE_REGISTRY
+        for start, end, symbols in universe_periods(name)
+        for code in symbols
+    ]
+    return _typed_constituents(pd.DataFrame(rows, columns=CONSTITUENT_COLUMNS))
+
+
+def index_constituents(constituents, index_name):
+    """
+    The spells of one index from fetch_constituent_history() rows
+    (`constituents` None = the built-in registry, for offline callers).
+    """
+    constituents = registry_constituents() if constituents is None else constituents
+    return constituents[constituents['index_name'] == index_name].reset_index(drop=True)
+
+
+def _typed_constituents(df):
+    df = df.astype({'index_name': str, 'trading_code': str})
+    for col in ['effective_from', 'effective_to']:
+        df[col] = pd.to_datetime(df[col])
+    return df.sort_values(['index_name', 'effective_from', 'trading_code'], ignore_index=True)
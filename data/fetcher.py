@@ -0,0 +1,191 @@
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import httpx
+
+from config.settings import FETCH_MAX_WORKERS, FETCH_PAGE_SIZE, PRICE_KEY_COLUMN
+
+
+class FetchError(Exception):
+    """Raised when a chunk still fails after all retries."""
+
+
+def split_date_chunks(start_date, end_date, chunk_days=1):
+    """Splits [start_date, end_date] into consecutive (start, end) ISO date chunks."""
+    start = datetime.strptime(start_date[:10], "%Y-%m-%d").date()
+    end = datetime.strptime(end_date[:10], "%Y-%m-%d").date()
+
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+class ChunkedFetcher:
+    """
+    Fetches a PostgREST table by date chunks in parallel.
+
+    Each chunk is paged by key (`key > last_key ORDER BY key LIMIT n`) rather than
+    OFFSET, so page cost stays flat no matter how deep we are into the chunk.
+    Chunks run concurrently on a bounded thread pool that shares one pooled
+    httpx client, and each chunk retries with exponential backoff on its own.
+    """
+
+    def __init__(self, base_url, api_key, table="dsex_prices", key_column=PRICE_KEY_COLUMN,
+                 page_size=FETCH_PAGE_SIZE, max_workers=FETCH_MAX_WORKERS,
+                 max_retries=3, backoff=0.25, timeout=10, chunk_days=1):
+        self.rest_root = f"{base_url.rstrip('/')}/rest/v1"
+        self.table = table
+        self.headers = {
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+            "x-application-name": "dhaka-stocks",
+        }
+        self.key_column = key_column
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_days = chunk_days
+
+    def _client(self):
+        limits = httpx.Limits(max_connections=self.max_workers, max_keepalive_connections=self.max_workers)
+        return httpx.Client(headers=self.headers, timeout=self.timeout, limits=limits)
+
+    def _request(self, client, method, path, label, params=None, payload=None):
+        for attempt in range(self.max_retries):
+            try:
+                response = client.request(method, f"{self.rest_root}/{path}", params=params, json=payload)
+                response.raise_for_status()
+                return response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                if attempt == self.max_retries - 1:
+                    raise FetchError(f"{label}: {e}") from e
+                # Exponential backoff with jitter so retrying chunks don't stampede
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    def _get_page(self, client, params, table=None):
+        return self._request(client, "GET", table or self.table, params.get('date') or params.get('and'), params)
+
+    def _fetch_chunk(self, client, select, chunk):
+        chunk_start, chunk_end = chunk
+        rows = []
+        last_key = None
+
+        while True:
+            params = {
+                "select": select,
+                "order": f"{self.key_column}.asc",
+                "limit": self.page_size,
+            }
+            if chunk_start == chunk_end:
+                params["date"] = f"eq.{chunk_start}"
+            else:
+                params["and"] = f"(date.gte.{chunk_start},date.lte.{chunk_end})"
+            if last_key is not None:
+                params[self.key_column] = f"gt.{last_key}"
+
+            page = self._get_page(client, params)
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            last_key = page[-1][self.key_column]
+
+        return rows
+
+    def fetch(self, start_date, end_date, select):
+        """
+        Returns all rows in [start_date, end_date] as a list of dicts, in chunk
+        (date) order. The key column is always selected because paging depends on it.
+        This holds the whole range at once; the price loaders read through
+        iter_chunks() instead.
+        """
+        all_rows = []
+        for _, rows in self.iter_chunks(start_date, end_date, select):
+            all_rows.extend(rows)
+        return all_rows
+
+    def iter_chunks(self, start_date, end_date, select):
+        """
+        Yields ((chunk_start, chunk_end), rows) per date chunk, in date order.
+
+        Chunks are still fetched concurrently, but at most two per worker are in
+        flight or waiting to be consumed, so a long range never holds more than
+        a few chunks of rows at once.
+        """
+        if self.key_column not in [c.strip() for c in select.split(",")]:
+            select = f"{self.key_column},{select}"
+
+        chunks = iter(split_date_chunks(start_date, end_date, self.chunk_days))
+        ahead = self.max_workers * 2
+
+        with self._client() as client:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                pending = deque()
+
+                def submit_next():
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        pending.append((chunk, pool.submit(self._fetch_chunk, client, select, chunk)))
+
+                for _ in range(ahead):
+                    submit_next()
+                try:
+                    while pending:
+                        chunk, future = pending.popleft()
+                        rows = future.result()
+                        submit_next()
+                        yield chunk, rows
+                finally:
+                    # Abandoned early (or failed): don't start the chunks that are still queued
+                    for _, future in pending:
+                        future.cancel()
+
+    def fetch_table(self, table, select, key_column="id"):
+        """Reads a whole (small) table such as dsex_mapper, paged by key."""
+        rows = []
+        last_key = None
+        with self._client() as client:
+            while True:
+                params = {"select": select, "order": f"{key_column}.asc", "limit": self.page_size}
+                if last_key is not None:
+                    params[key_column] = f"gt.{last_key}"
+                page = self._get_page(client, params, table)
+                rows.extend(page)
+                if len(page) < self.page_size:
+                    break
+                last_key = page[-1][key_column]
+        return rows
+
+    def rpc(self, function, start_date, end_date, args=None, chunk_days=20):
+        """
+        Calls a set-returning Postgres function that takes start_date/end_date
+        (plus `args`) once per date chunk, concurrently, and returns the rows in
+        chunk order. Chunks are sized so one response normally fits under the
+        PostgREST row cap; bigger ones are paged with limit/offset.
+        """
+        chunks = split_date_chunks(start_date, end_date, chunk_days)
+
+        def call_chunk(client, chunk):
+            payload = {"start_date": chunk[0], "end_date": chunk[1], **(args or {})}
+            rows, offset = [], 0
+            while True:
+                page = self._request(client, "POST", f"rpc/{function}", f"{function}{chunk}",
+                                     params={"limit": self.page_size, "offset": offset}, payload=payload)
+                rows.extend(page)
+                if len(page) < self.page_size:
+                    return rows
+                offset += self.page_size
+
+        with self._client() as client:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                all_rows = []
+                for rows in pool.map(lambda chunk: call_chunk(client, chunk), chunks):
+                    all_rows.extend(rows)
+        return all_rows
@@ -0,0 +1,300 @@
+"""
+Local multi-year OHLCV history, stored as one memory-mapped .npy grid per column.
+
+Every column is a dense (trading date x symbol) array, so a date range is a
+contiguous block of rows and slicing it (HistoryStore.window) never copies or
+reads the rest of the file. The stock panel (domains.stock.panel) is built
+from those windows directly; code that needs a long frame gathers it with
+read_frame(), which does copy. Layout:
+
+    HISTORY_DIR/CURRENT              -> name of the live generation
+    HISTORY_DIR/g<epoch>/dates.npy   -> datetime64[D], sorted trading dates
+    HISTORY_DIR/g<epoch>/symbol_ids.npy
+    HISTORY_DIR/g<epoch>/has_row.npy -> bool, the date/symbol had a price row
+    HISTORY_DIR/g<epoch>/<column>.npy
+
+A sync writes a complete new generation and then flips CURRENT, so readers
+never see a half-written store.
+
+    python -m data.history sync [--start 2013-01-01] [--end 2024-12-31]
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config.metrics import INTEGER_FILL_VALUE, PRICE_COLUMN_DTYPES
+from config.settings import HISTORY_DIR, HISTORY_RESYNC_DAYS, HISTORY_START
+from data.cache import last_settled_day
+
+CURRENT_PATH = os.path.join(HISTORY_DIR, "CURRENT")
+# Every price column except the two grid axes
+GRID_COLUMNS = [c for c in PRICE_COLUMN_DTYPES if c not in ('date', 'symbol_id')]
+
+# The open generation, so the memory maps are set up once per sync rather than per read
+_open_stores = {}
+
+
+def _empty_value(dtype):
+    return INTEGER_FILL_VALUE if np.dtype(dtype).kind in 'iu' else np.nan
+
+
+class HistoryWindow:
+    """
+    A date range of one generation: `dates`, `symbol_ids`, `has_row` and
+    `grids` ({column: (dates x symbols) array}). `memo_key` names the
+    generation and the slice, so results memoized on a window are recomputed
+    once a sync publishes a new generation.
+    """
+
+    def __init__(self, dates, symbol_ids, has_row, grids, memo_key):
+        self.dates = dates
+        self.symbol_ids = symbol_ids
+        self.has_row = has_row
+        self.grids = grids
+        self.memo_key = memo_key
+
+
+class HistoryStore:
+    """Read-only view of one history generation; every grid is memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy"))).astype('datetime64[ns]')
+        self.symbol_ids = np.load(os.path.join(path, "symbol_ids.npy"))
+        self.has_row = np.load(os.path.join(path, "has_row.npy"), mmap_mode='r')
+        self.grids = {col: np.load(os.path.join(path, f"{col}.npy"), mmap_mode='r') for col in GRID_COLUMNS}
+
+    @classmethod
+    def open(cls):
+        """The live generation, or None if nothing has been synced yet."""
+        try:
+            with open(CURRENT_PATH) as f:
+                name = f.read().strip()
+            if name not in _open_stores:
+                _open_stores.clear()
+                _open_stores[name] = cls(os.path.join(HISTORY_DIR, name))
+            return _open_stores[name]
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def generation(self):
+        return os.path.basename(self.path)
+
+    @property
+    def first_date(self):
+        return self.dates[0] if len(self.dates) else None
+
+    @property
+    def last_date(self):
+        """Last calendar day the sync covered (not necessarily a trading day)."""
+        return pd.Timestamp(self.meta["end"])
+
+    @property
+    def last_settled_date(self):
+        """
+        Last day whose rows were final when the sync ran. Later days (up to
+        last_date) may hold a partial session and are left to the live path.
+        """
+        settled = pd.Timestamp(last_settled_day(self.meta.get("synced_at", 0)))
+        return min(self.last_date, settled)
+
+    def covers(self, day):
+        return pd.Timestamp(self.meta["start"]) <= pd.Timestamp(day) <= self.last_date
+
+    def date_slice(self, start_date, end_date):
+        lo = self.dates.searchsorted(pd.Timestamp(start_date), side='left')
+        hi = self.dates.searchsorted(pd.Timestamp(end_date), side='right')
+        return slice(lo, hi)
+
+    def symbol_positions(self, symbol_ids):
+        pos = pd.Index(self.symbol_ids).get_indexer(list(symbol_ids))
+        return np.sort(pos[pos >= 0])
+
+    def window(self, start_date, end_date, columns=None, symbol_ids=None):
+        """
+        The HistoryWindow of a date range. Without a symbol subset the grids are
+        views straight into the memory-mapped files (nothing is read until they
+        are touched); a subset copies those columns only.
+        """
+        rows = self.date_slice(start_date, end_date)
+        cols = slice(None) if symbol_ids is None else self.symbol_positions(symbol_ids)
+        columns = [c for c in (columns or GRID_COLUMNS) if c in self.grids]
+        subset = None if symbol_ids is None else tuple(self.symbol_ids[cols].tolist())
+        return HistoryWindow(
+            self.dates[rows],
+            self.symbol_ids[cols],
+            self.has_row[rows][:, cols],
+            {col: self.grids[col][rows][:, cols] for col in columns},
+            ('history_window', self.generation, rows.start, rows.stop, tuple(columns), subset),
+        )
+
+    def read_frame(self, start_date, end_date, columns=None, symbol_ids=None):
+        """
+        The window as a long price frame (date, symbol_id, columns) in date order.
+
+        Unlike window(), this copies: every present cell of the requested
+        columns is gathered into RAM, so a multi-year read through
+        fetch_market_data costs as much memory as the long frame itself. Only
+        the date/symbol slicing is free; code that can work on the grids
+        should call window() instead (see data.base_queries.fetch_market_window).
+        """
+        window = self.window(start_date, end_date, columns, symbol_ids)
+        d_idx, s_idx = np.nonzero(window.has_row)
+        frame = {'date': window.dates.values[d_idx], 'symbol_id': window.symbol_ids[s_idx]}
+        for col, grid in window.grids.items():
+            frame[col] = grid[d_idx, s_idx]
+        return pd.DataFrame(frame)
+
+
+def _write_generation(dates, symbol_ids, fill):
+    """
+    Creates a new generation directory with empty grids of the right shape and
+    lets `fill(arrays)` populate the (writable, memory-mapped) arrays.
+    """
+    name = f"g{time.time_ns()}"
+    path = os.path.join(HISTORY_DIR, name)
+    os.makedirs(path)
+
+    np.save(os.path.join(path, "dates.npy"), np.asarray(dates, dtype='datetime64[D]'))
+    np.save(os.path.join(path, "symbol_ids.npy"), np.asarray(symbol_ids, dtype='int32'))
+    shape = (len(dates), len(symbol_ids))
+
+    arrays = {"has_row": np.lib.format.open_memmap(os.path.join(path, "has_row.npy"), 'w+', bool, shape)}
+    for col in GRID_COLUMNS:
+        dtype = PRICE_COLUMN_DTYPES[col]
+        arrays[col] = np.lib.format.open_memmap(os.path.join(path, f"{col}.npy"), 'w+', dtype, shape)
+        arrays[col][:] = _empty_value(dtype)
+    fill(arrays)
+    for array in arrays.values():
+        array.flush()
+    return name, path
+
+
+def _publish(name, path, meta):
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    tmp_path = f"{CURRENT_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(name)
+    os.replace(tmp_path, CURRENT_PATH)
+
+    # Keep the previous generation for readers that still have it mapped
+    generations = sorted(g for g in os.listdir(HISTORY_DIR) if g.startswith("g"))
+    for old in generations[:-2]:
+        shutil.rmtree(os.path.join(HISTORY_DIR, old), ignore_errors=True)
+
+
+def _year_ranges(start, end):
+    ranges = []
+    while start <= end:
+        year_end = min(date(start.year, 12, 31), end)
+        ranges.append((start.isoformat(), year_end.isoformat()))
+        start = year_end + timedelta(days=1)
+    return ranges
+
+
+def sync_history(fetch_range, start_date=None, end_date=None, resync_days=HISTORY_RESYNC_DAYS, log=print):
+    """
+    Brings the store up to `end_date` (default today). Only the days after the
+    last sync (minus `resync_days`, which may still have been updating) are
+    fetched, through `fetch_range(start, end)` returning a typed price frame
+    or None; the older rows are copied over from the current generation.
+    An `end_date` before the store's last day is rejected, since the rebuilt
+    generation would silently lose the days after it.
+    """
+    store = HistoryStore.open()
+    end = pd.Timestamp(end_date or date.today()).date()
+    if store is not None and pd.Timestamp(end) < store.last_date:
+        raise ValueError(f"End date {end} is before the store's last day {store.last_date.date()}; "
+                         f"syncing to it would drop the days after it")
+    if store is not None and start_date is None:
+        fetch_start = (store.last_date - pd.Timedelta(days=resync_days)).date()
+    else:
+        fetch_start = pd.Timestamp(start_date or HISTORY_START).date()
+
+    # 1. Fetch the missing span a year per call, so progress shows and a failure stops early
+    parts = []
+    for range_start, range_end in _year_ranges(fetch_start, end):
+        started = time.perf_counter()
+        part = fetch_range(range_start, range_end)
+        if part is None:
+            raise RuntimeError(f"Could not fetch {range_start}..{range_end}; the store was left unchanged")
+        log(f"{range_start}..{range_end}: {len(part):,} rows in {time.perf_counter() - started:.1f}s")
+        if not part.empty:
+            parts.append(part)
+    fresh = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['date', 'symbol_id'])
+    fresh['date'] = pd.to_datetime(fresh['date'])
+
+    # 2. Axes of the new generation: kept history before fetch_start + fresh rows
+    kept = slice(0, 0)
+    if store is not None and len(store.dates):
+        kept = store.date_slice(store.first_date, pd.Timestamp(fetch_start) - pd.Timedelta(days=1))
+    old_dates = store.dates[kept] if store is not None else pd.DatetimeIndex([])
+    dates = old_dates.append(pd.DatetimeIndex(fresh['date'].unique()).sort_values())
+    old_ids = store.symbol_ids if store is not None else np.array([], dtype='int32')
+    symbol_ids = np.union1d(old_ids, fresh['symbol_id'].to_numpy(dtype='int32'))
+
+    def fill(arrays):
+        if store is not None and len(old_dates):
+            old_pos = np.searchsorted(symbol_ids, store.symbol_ids)
+            n_old = len(old_dates)
+            arrays['has_row'][:n_old, old_pos] = store.has_row[kept]
+            for col in GRID_COLUMNS:
+                arrays[col][:n_old, old_pos] = store.grids[col][kept]
+
+        d_idx = len(old_dates) + pd.DatetimeIndex(dates[len(old_dates):]).get_indexer(fresh['date'])
+        s_idx = np.searchsorted(symbol_ids, fresh['symbol_id'].to_numpy(dtype='int32'))
+        arrays['has_row'][d_idx, s_idx] = True
+        for col in GRID_COLUMNS:
+            if col in fresh.columns:
+                values = fresh[col].to_numpy()
+                if np.dtype(PRICE_COLUMN_DTYPES[col]).kind in 'iu':
+                    values = np.nan_to_num(values.astype('float64'), nan=INTEGER_FILL_VALUE)
+                arrays[col][d_idx, s_idx] = values
+
+    # The store answers for every day from where its first sync started
+    first = store.meta["start"] if store is not None and len(old_dates) else fetch_start.isoformat()
+    name, path = _write_generation(dates, symbol_ids, fill)
+    _publish(name, path, {
+        "start": first,
+        "end": end.isoformat(),
+        "synced_at": time.time(),
+        "trading_days": len(dates),
+        "symbols": len(symbol_ids),
+    })
+    log(f"History {first}..{end.isoformat()}: {len(dates):,} trading days x {len(symbol_ids)} symbols ({name})")
+    return HistoryStore.open()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local multi-year DSEX history store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="Fetch new trading days from Supabase into the store")
+    sync.add_argument("--start", help=f"Rebuild from this date (default: incremental, or {HISTORY_START})")
+    sync.add_argument("--end", help="Last date to sync (default: today)")
+    sub.add_parser("info", help="Describe the current store")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        # Same credentials and typed frames as the app's fetch path
+        from data.base_queries import _fetch_market_data_remote
+        try:
+            sync_history(_fetch_market_data_remote, args.start, args.end)
+        except ValueError as err:
+            raise SystemExit(str(err))
+    else:
+        store = HistoryStore.open()
+        print(json.dumps(store.meta, indent=2) if store else "No history synced yet.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from data.cache import frame_fingerprint, memoize
+
+# Live frame id -> (weakref to the frame, its MembershipIndex)
+_indexes_by_frame = {}
+SPELL_COLUMNS = ['trading_code', 'effective_from', 'effective_to']
+
+
+def universe_spells(members):
+    """
+    (trading_code, effective_from, effective_to) membership spells of a
+    universe: constituent-history rows (data.constituents) are members from
+    effective_from up to, not including, effective_to (NaT = open ended); a
+    plain symbol list is a member on every date.
+    """
+    if isinstance(members, pd.DataFrame):
+        return members[SPELL_COLUMNS]
+    return pd.DataFrame({'trading_code': list(members), 'effective_from': pd.NaT, 'effective_to': pd.NaT},
+                        columns=SPELL_COLUMNS)
+
+
+def universe_key(members):
+    """A hashable identity for a universe, for caches keyed by it."""
+    if members is None:
+        return None
+    if isinstance(members, pd.DataFrame):
+        return ('spells', frame_fingerprint(universe_spells(members)))
+    return tuple(members)
+
+
+def constituent_mask(members, dates, symbols):
+    """
+    (dates x symbols) boolean grid: symbols[s] was in the universe on dates[d].
+
+    Each spell adds +1 at its first date and -1 after its last one; a
+    cumulative sum down the date axis then fills every spell at once.
+    """
+    spells = universe_spells(members)
+    cols = pd.Index(symbols).get_indexer(spells['trading_code'])
+    known = cols >= 0
+    dates = pd.DatetimeIndex(dates)
+
+    starts = dates.searchsorted(pd.DatetimeIndex(spells['effective_from']).fillna(pd.Timestamp.min), side='left')
+    ends = dates.searchsorted(pd.DatetimeIndex(spells['effective_to']).fillna(pd.Timestamp.max), side='left')
+
+    edges = np.zeros((len(dates) + 1, len(symbols)), dtype=np.int32)
+    np.add.at(edges, (starts[known], cols[known]), 1)
+    np.add.at(edges, (ends[known], cols[known]), -1)
+    return np.cumsum(edges[:-1], axis=0) > 0
+
+
+class MembershipIndex:
+    """
+    Row positions of a frame grouped by trading_code, sector and category,
+    built once per dataset (see build_membership_index).
+
+    Each group is a slice of one stable argsort of the column's codes, so its
+    positions are already sorted and a filter becomes an O(k) take instead of
+    a fresh boolean mask over the whole frame.
+    """
+
+    COLUMNS = ('trading_code', 'sector', 'category')
+
+    def __init__(self, df):
+        self.dates = df['date'].to_numpy() if 'date' in df.columns else None
+        self.groups = {col: self._group_positions(df[col]) for col in self.COLUMNS if col in df.columns}
+
+    @property
+    def nbytes(self):
+        # Sizes the memoized index in the MemoCache byte budget
+        dates = self.dates.nbytes if self.dates is not None else 0
+        return dates + sum(rows.nbytes for groups in self.groups.values() for rows in groups.values())
+
+    @staticmethod
+    def _group_positions(column):
+        codes, keys = pd.factorize(column)
+        order = np.argsort(codes, kind='stable')
+        # Missing values (code -1) sort first; every key is then one contiguous run
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes + 1, minlength=len(keys) + 1))])
+        return {key: order[bounds[i + 1]:bounds[i + 2]] for i, key in enumerate(keys)}
+
+    def rows(self, column, values):
+        """Sorted positions of the rows whose `column` is one of `values`."""
+        groups = self.groups[column]
+        parts = [groups[v] for v in dict.fromkeys(values) if v in groups]
+        if not parts:
+            return np.array([], dtype=int)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def member_rows(self, members):
+        """
+        Sorted positions of the rows of a universe (see universe_spells), each
+        row checked against the spell of its symbol in effect on its own date.
+        """
+        codes = self.groups['trading_code']
+        parts = []
+        for code, start, end in universe_spells(members).itertuples(index=False):
+            rows = codes.get(code)
+            if rows is None or not len(rows):
+                continue
+            if self.dates is not None and (pd.notna(start) or pd.notna(end)):
+                dates = self.dates[rows]
+                in_effect = np.ones(len(rows), dtype=bool)
+                if pd.notna(start):
+                    in_effect &= dates >= np.datetime64(start)
+                if pd.notna(end):
+                    in_effect &= dates < np.datetime64(end)
+                rows = rows[in_effect]
+            parts.append(rows)
+        return np.unique(np.concatenate(parts)) if parts else np.array([], dtype=int)
+
+
+@memoize
+def _index_for_contents(df):
+    return MembershipIndex(df)
+
+
+def build_membership_index(df):
+    """
+    One MembershipIndex per dataset. The frame object itself is checked first,
+    so repeated lookups on the same (read-only) frame skip even the fingerprint;
+    an equal frame fetched again shares the memoized index.
+    """
+    key = id(df)
+    entry = _indexes_by_frame.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    index = _index_for_contents(df)
+    _indexes_by_frame[key] = (weakref.ref(df, lambda _, key=key: _indexes_by_frame.pop(key, None)), index)
+    return index
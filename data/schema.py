@@ -0,0 +1,71 @@
+import logging
+
+import pandas as pd
+
+from config.metrics import INTEGER_FILL_VALUE, MARKET_FRAME_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+
+def enforce_schema(df, schema=MARKET_FRAME_SCHEMA):
+    """
+    Coerces `df` to the canonical dtypes in `schema` and returns (df, report).
+
+    Only columns present in both are converted, so the same schema serves the
+    cached price partitions (no symbol columns yet) and the final frame.
+    Unparseable dates drop the row; unparseable numbers become NaN, or
+    INTEGER_FILL_VALUE for integer columns. The report counts every such fix:
+
+        {"rows_in", "rows_out", "dropped_bad_date", "missing_columns",
+         "extra_columns", "coerced_nulls": {col: n}, "memory_mb_before",
+         "memory_mb_after"}
+    """
+    report = {
+        "rows_in": len(df),
+        "missing_columns": [c for c in schema if c not in df.columns],
+        "extra_columns": [c for c in df.columns if c not in schema],
+        "dropped_bad_date": 0,
+        "coerced_nulls": {},
+        "memory_mb_before": float(df.memory_usage(deep=True).sum() / 1e6),
+    }
+    df = df.copy()
+
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if str(series.dtype) == dtype:
+            continue
+
+        if dtype.startswith('datetime64'):
+            converted = pd.to_datetime(series, errors='coerce')
+            # Keep only the calendar day; timestamps from Postgres may carry a time part
+            converted = converted.dt.tz_localize(None) if converted.dt.tz else converted
+            df[col] = converted.dt.normalize().astype(dtype)
+        elif dtype == 'category':
+            df[col] = series.astype('category')
+        elif dtype.startswith('int'):
+            converted = pd.to_numeric(series, errors='coerce')
+            nulls = int(converted.isna().sum())
+            if nulls:
+                report["coerced_nulls"][col] = nulls
+            df[col] = converted.fillna(INTEGER_FILL_VALUE).astype(dtype)
+        else:
+            converted = pd.to_numeric(series, errors='coerce')
+            bad = int(converted.isna().sum() - series.isna().sum())
+            if bad:
+                report["coerced_nulls"][col] = bad
+            df[col] = converted.astype(dtype)
+
+    if 'date' in df.columns and schema.get('date', '').startswith('datetime64'):
+        bad_dates = df['date'].isna()
+        report["dropped_bad_date"] = int(bad_dates.sum())
+        if report["dropped_bad_date"]:
+            df = df[~bad_dates].reset_index(drop=True)
+
+    report["rows_out"] = len(df)
+    report["memory_mb_after"] = float(df.memory_usage(deep=True).sum() / 1e6)
+
+    if report["dropped_bad_date"] or report["coerced_nulls"]:
+        logger.warning("Market frame schema fixes: %s", report)
+    return df, report
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from data.cache import memoize
+from data.constituents import index_constituents
+from data.membership import constituent_mask
+from domains.stock.panel import as_stock_panel
+from utils.instrument import instrument
+
+# Indexes that hold every listed stock rather than a constituent list
+BROAD_INDEXES = ("DSEX",)
+WEIGHTINGS = ("equal", "value")
+INDEX_BASE = 1000.0
+INDEX_COLUMNS = ["date", "level", "index_return", "constituents"]
+
+
+def _trailing_mean(grid, present, window):
+    """Mean of `grid` over each cell's previous `window` dates with a row (today excluded)."""
+    values = np.vstack([np.zeros((1, grid.shape[1])), np.cumsum(np.where(present, grid, 0.0), axis=0)])
+    counts = np.vstack([np.zeros((1, grid.shape[1])), np.cumsum(present, axis=0)])
+    lo = np.maximum(np.arange(len(grid)) - window, 0)
+    hi = np.arange(len(grid))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (values[hi] - values[lo]) / (counts[hi] - counts[lo])
+
+
+@instrument
+@memoize
+def reconstruct_index(df, history, index_name="DS30", weighting="equal", weight_window=20, base=INDEX_BASE):
+    """
+    Daily level of a DS30/DSEX-style index rebuilt from its constituents'
+    returns, using the membership that applied on each date (`history` is
+    constituent-history rows, see data.constituents; BROAD_INDEXES take
+    every stock).
+
+    weighting="equal" averages the constituents' daily returns; "value"
+    weights each one by its mean traded value over the previous
+    `weight_window` trading days (the data has no share counts for a
+    market-cap weight), so a day's weights are known before it opens.
+    The level starts at `base` on the first date; days without a priced
+    constituent carry the level forward.
+
+    Returns: date, level, index_return (%), constituents (priced members).
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting {weighting!r}; expected one of {WEIGHTINGS}")
+    panel = as_stock_panel(df)
+    if not len(panel.dates):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+
+    # 1. Priced members on each date
+    if index_name in BROAD_INDEXES:
+        members = panel.valid
+    else:
+        spells = index_constituents(history, index_name)
+        members = panel.valid & constituent_mask(spells, panel.dates, panel.symbols)
+
+    # 2. Weights over the date x symbol panel
+    if weighting == "equal":
+        weights = members.astype('float64')
+    else:
+        trailing = _trailing_mean(panel.fields['value_mn'], panel.has_row, weight_window)
+        weights = np.where(members, np.nan_to_num(trailing), 0.0)
+
+    # 3. Weighted daily return, chained into a level
+    total = weights.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        day_return = np.where(total > 0, (weights * np.where(members, panel.ret, 0.0)).sum(axis=1) / total, 0.0)
+    day_return[0] = 0.0
+
+    return pd.DataFrame({
+        "date": panel.dates,
+        "level": base * np.cumprod(1 + day_return),
+        "index_return": day_return * 100,
+        "constituents": members.sum(axis=1),
+    })
@@ -0,0 +1,44 @@
+import streamlit as st
+from plotly.subplots import make_subplots
+from utils.charts import cached_figure, line_trace
+from utils.instrument import instrument
+
+INDEX_COLORS = {"DSEX": "#636EFA", "DS30": "#EF553B"}
+
+
+@instrument
+def render_index_levels(levels, weighting, key_suffix=""):
+    """
+    Reconstructed index levels plus the number of priced constituents per day.
+    levels: {index name: reconstruct_index() frame}
+    """
+    st.markdown(f"#### 🧮 Reconstructed Index Levels ({weighting.title()}-Weighted)")
+    st.caption("Rebuilt from constituent prices with the membership in effect on each date; "
+               "levels start at 1,000 on the first day of the range.")
+    fig = build_index_level_figure(levels)
+    st.plotly_chart(fig, use_container_width=True, key=f"index_levels_{key_suffix}")
+
+
+@cached_figure
+def build_index_level_figure(levels):
+    fig = make_subplots(
+        rows=2, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.06,
+        row_heights=[0.75, 0.25],
+        subplot_titles=("Index Level", "Priced Constituents")
+    )
+    for name, df in levels.items():
+        color = INDEX_COLORS.get(name)
+        fig.add_trace(line_trace(df['date'], df['level'], name=name, legendgroup=name,
+                                 line=dict(color=color, width=2.5)), row=1, col=1)
+        fig.add_trace(line_trace(df['date'], df['constituents'], name=name, legendgroup=name, showlegend=False,
+                                 line=dict(color=color, width=1.5, shape='hv')), row=2, col=1)
+
+    fig.update_layout(
+        height=600,
+        template="plotly_white",
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
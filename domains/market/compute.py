@@ -2,59 +2,69 @@
 
 import pandas as pd
 import numpy as np
-from scipy.stats import gmean
+from data.cache import memoize
+from data.membership import build_membership_index
+from utils.instrument import instrument
+from utils.math import period_stats
 
+DAILY_MARKET_COLUMNS = [
+    "total_value", "total_volume", "market_return", "breadth_pct", "market_volatility", "stock_count"
+]
+
+@instrument
+@memoize
 def compute_daily_market_metrics(df, stock_list=None):
+    """
+    One row per date: total value/volume, mean return, breadth, cross-sectional
+    volatility and stock count. All six metrics come from a single named
+    groupby-agg pass (no per-date Python closure).
+    """
     if df.empty:
         return pd.DataFrame()
 
-    working_df = df.copy()
     if stock_list:
-        working_df = working_df[working_df['trading_code'].isin(stock_list)]
+        # Only the selected symbols' rows are taken from the membership index
+        df = df.iloc[build_membership_index(df).rows('trading_code', stock_list)]
+    mask = (df['ycp'] > 0) & df['ltp'].notna()
 
     # Clean data
-    working_df = working_df[working_df['ycp'] > 0].dropna(subset=['ltp', 'ycp'])
-    working_df['stock_return'] = (working_df['ltp'] - working_df['ycp']) / working_df['ycp']
-
-    def aggregate_day(group):
-        total_unique_stocks = group['trading_code'].nunique()
-        advancers = (group['stock_return'] > 0).sum()
-
-        return pd.Series({
-            "total_value": group['value_mn'].sum(),
-            "total_volume": group['volume'].sum(),
-            "market_return": group['stock_return'].mean() * 100,
-            "breadth_pct": (advancers / total_unique_stocks * 100) if total_unique_stocks > 0 else 0,
-            # This restores the column the chart is looking for:
-            "market_volatility": group['stock_return'].std() * 100,
-            "stock_count": total_unique_stocks
-        })
-
-    daily_metrics = working_df.groupby('date').apply(aggregate_day).reset_index()
-    return daily_metrics
+    working_df = df.loc[mask, ['date', 'trading_code', 'value_mn', 'volume', 'ltp', 'ycp']]
+    stock_return = (working_df['ltp'] - working_df['ycp']) / working_df['ycp']
+    working_df = working_df.assign(stock_return=stock_return, advancer=stock_return > 0)
+
+    daily_metrics = working_df.groupby('date', sort=True, observed=True).agg(
+        total_value=('value_mn', 'sum'),
+        total_volume=('volume', 'sum'),
+        market_return=('stock_return', 'mean'),
+        advancers=('advancer', 'sum'),
+        market_volatility=('stock_return', 'std'),
+        stock_count=('trading_code', 'nunique'),
+    ).astype('float64')
+    daily_metrics['market_return'] *= 100
+    daily_metrics['market_volatility'] *= 100
+
+    stock_count = daily_metrics['stock_count']
+    daily_metrics['breadth_pct'] = np.where(
+        stock_count > 0, daily_metrics['advancers'] / stock_count.where(stock_count > 0) * 100, 0)
 
+    return daily_metrics[DAILY_MARKET_COLUMNS].reset_index()
+
+@instrument
+@memoize
 def compute_period_averages(daily_df):
     if daily_df.empty:
         return None
 
-    # 1. Period Market Volatility (Standard deviation of the Market's daily returns)
-    # This is the "True" volatility of the market as an index
-    period_vol = daily_df['market_return'].std()
-
-    # 2. Geometric Mean for the period
-    returns_decimal = (daily_df['market_return'] / 100) + 1
-    if (returns_decimal <= 0).any():
-        geo_mean_return = np.nan
-    else:
-        geo_mean_return = (gmean(returns_decimal) - 1) * 100
-
-    # 3. Arithmetic Averages for other metrics
-    other_stats = daily_df[['total_value', 'total_volume', 'breadth_pct']].mean()
+    # 1. Volatility is the std of the market's daily returns (the "true" index volatility),
+    # 2. the return is their geometric mean (undefined if any day lost 100% or more),
+    # 3. the other metrics are arithmetic averages
+    stats = period_stats(daily_df['market_return'], non_positive='nan',
+                         extra={col: daily_df[col] for col in ['total_value', 'total_volume', 'breadth_pct']})
 
     return {
-        "market_return": geo_mean_return,
-        "market_volatility": period_vol, # This satisfies the 'market_period_cards'
-        "total_value": other_stats['total_value'],
-        "total_volume": other_stats['total_volume'],
-        "breadth_pct": other_stats['breadth_pct']
+        "market_return": stats['geo_mean'][0],
+        "market_volatility": stats['std'][0], # This satisfies the 'market_period_cards'
+        "total_value": stats['total_value'][0],
+        "total_volume": stats['total_volume'][0],
+        "breadth_pct": stats['breadth_pct'][0]
     }
\ No newline at end of file
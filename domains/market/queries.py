@@ -0,0 +1,18 @@
+from domains.sector.compute import slice_grouping_set
+from domains.sector.queries import fetch_daily_grouping_sets
+from utils.instrument import instrument
+
+
+@instrument
+def fetch_daily_market_metrics(start_date: str, end_date: str, stock_list=None, fetcher=None):
+    """
+    Server-side counterpart of compute_daily_market_metrics(): one row per day
+    comes over the wire instead of every price row of the day.
+    Returns None if the database could not be reached.
+    """
+    universe = "selection" if stock_list else "DSEX"
+    cube = fetch_daily_grouping_sets(start_date, end_date, {universe: stock_list or None},
+                                     groupings=['market'], fetcher=fetcher)
+    if cube is None:
+        return None
+    return slice_grouping_set(cube, universe)
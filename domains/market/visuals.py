@@ -1,8 +1,10 @@
 import streamlit as st
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from utils.charts import cached_figure, line_trace
+from utils.instrument import instrument
 
 
+@instrument
 def render_market_period_cards(metrics, label):
     """UI for Period Averages with perfect grid alignment."""
     st.markdown(f"#### 📊 {label}")
@@ -21,10 +23,17 @@ def render_market_period_cards(metrics, label):
         col2.metric("Avg Volatility", f"{metrics['market_volatility']:.3f}%")
         # col3 is left empty to maintain the grid
 
+@instrument
 def render_market_daily_timeline(daily_df, label):
     """UI for 'Daily' - Timeline of all 5 metrics"""
     st.markdown(f"#### {label} Daily Timeline")
+    fig = build_market_daily_figure(daily_df)
+    st.plotly_chart(fig, use_container_width=True)
+
 
+@cached_figure
+def build_market_daily_figure(daily_df):
+    """The 5-row daily timeline figure (no Streamlit calls, so it can be benchmarked)."""
     # Create a 5-row subplot
     fig = make_subplots(
         rows=5, cols=1,
@@ -43,25 +52,31 @@ def render_market_daily_timeline(daily_df, label):
 
     for col_name, color, row_idx in metrics:
         fig.add_trace(
-            go.Scatter(x=daily_df['date'], y=daily_df[col_name], name=col_name, line=dict(color=color)),
+            line_trace(daily_df['date'], daily_df[col_name], name=col_name, line=dict(color=color)),
             row=row_idx, col=1
         )
 
     fig.update_layout(height=900, showlegend=False, template="plotly_white")
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
 import streamlit as st
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+@instrument
 def render_market_comparison_timeline(dfs_with_labels):
     """
     Overlays DSEX and DS30 with high visual distinction.
     dfs_with_labels: List of tuples [(df, label, color, dash_style), ...]
     """
     st.markdown("#### ⚖️ Market Comparison: DSEX vs DS30")
+    fig = build_market_comparison_figure(dfs_with_labels)
+    st.plotly_chart(fig, use_container_width=True, key="market_comparison_distinguishable")
 
+
+@cached_figure
+def build_market_comparison_figure(dfs_with_labels):
+    """The overlaid DSEX vs DS30 5-row figure (no Streamlit calls)."""
     # Define the 5 rows for the subplots
     fig = make_subplots(
         rows=5, cols=1,
@@ -87,9 +102,9 @@ def render_market_comparison_timeline(dfs_with_labels):
         for col_name, row_idx in metrics_config:
             # Add trace with distinction
             fig.add_trace(
-                go.Scatter(
-                    x=df['date'],
-                    y=df[col_name],
+                line_trace(
+                    df['date'],
+                    df[col_name],
                     name=label,
                     legendgroup=label,
                     showlegend=(row_idx == 1),
@@ -118,5 +133,4 @@ def render_market_comparison_timeline(dfs_with_labels):
     fig.add_hline(y=0, line_dash="solid", line_color="black", line_width=1, row=3, col=1)
     # Add a 50% line for Breadth to distinguish Bullish vs Bearish sentiment
     fig.add_hline(y=50, line_dash="dot", line_color="gray", line_width=1, row=4, col=1)
-
-    st.plotly_chart(fig, use_container_width=True, key="market_comparison_distinguishable")
\ No newline at end of file
+    return fig
\ No newline at end of file
@@ -1,54 +1,143 @@
+import numpy as np
 import pandas as pd
-from scipy.stats import gmean
 
+from domains.market.compute import DAILY_MARKET_COLUMNS
+from data.cache import memoize
+from data.membership import build_membership_index
+from utils.instrument import instrument
+from utils.math import period_stats
 
-def compute_daily_sector_category_metrics(df, group_col='sector'):
-    """Calculates daily metrics for either sector or category."""
+
+GROUP_STAT_COLUMNS = ["total_value", "total_volume", "avg_return", "breadth_pct", "volatility", "stock_count"]
+# Additive per-day sums every grouping-set stat is derived from (see grouping_stats_from_sums)
+GROUP_SUM_COLUMNS = ['total_value', 'total_volume', 'n', 'ret_sum', 'ret_sq_sum', 'advancers', 'stock_count']
+
+
+def grouping_stats_from_sums(rolled):
+    """
+    Adds avg_return, volatility, breadth_pct, mkt_total and value_share to a
+    frame of GROUP_SUM_COLUMNS keyed by date (plus the group column). Shared by
+    the local roll-up and the server-side aggregates in domains/sector/queries.py.
+    """
+    n = rolled['n']
+    mean = rolled['ret_sum'] / n
+    variance = ((rolled['ret_sq_sum'] - rolled['ret_sum'] * mean) / (n - 1)).clip(lower=0)
+    rolled['avg_return'] = mean * 100
+    rolled['volatility'] = np.sqrt(variance.where(n > 1)) * 100
+    rolled['breadth_pct'] = np.where(
+        rolled['stock_count'] > 0,
+        rolled['advancers'] / rolled['stock_count'].where(rolled['stock_count'] > 0) * 100, 0)
+
+    # Calculate Value Share per day (within this universe and grouping)
+    rolled['mkt_total'] = rolled.groupby('date')['total_value'].transform('sum')
+    rolled['value_share'] = (rolled['total_value'] / rolled['mkt_total']) * 100
+    return rolled
+
+
+@instrument
+@memoize
+def compute_daily_grouping_sets(df, universes=None):
+    """
+    Daily stats for the whole market, every sector and every category, for each
+    universe, from one pass over the raw rows (like SQL GROUPING SETS over
+    (universe, date, sector, category)).
+
+    universes: {"DSEX": None, "DS30": members}; None means every stock, members
+    are constituent-history rows (each row checked against the spell in effect
+    on its date) or a plain symbol list (see data.membership.universe_spells).
+    Returns a long frame with a `universe` and a `grouping` column
+    ('market' / 'sector' / 'category'); sector and category are NaN where they
+    were rolled up. Use slice_grouping_set() to get one view out of it.
+    """
+    universes = universes or {"DSEX": None}
     if df.empty: return pd.DataFrame()
 
-    working_df = df.copy()
-    working_df = working_df[working_df['ycp'] > 0].dropna(subset=['ltp', 'ycp'])
-    working_df['stock_return'] = (working_df['ltp'] - working_df['ycp']) / working_df['ycp']
+    valid = ((df['ycp'] > 0) & df['ltp'].notna()).to_numpy()
+    working_df = df.loc[valid, ['date', 'trading_code', 'sector', 'category', 'value_mn', 'volume', 'ltp', 'ycp']]
+    stock_return = ((working_df['ltp'] - working_df['ycp']) / working_df['ycp']).astype('float64')
 
-    def aggregate_group(group):
-        total_unique = group['trading_code'].nunique()
-        advancers = (group['stock_return'] > 0).sum()
+    # Universe flags are set from the member rows of the membership index
+    index = build_membership_index(df)
+    flags = {}
+    for name, members in universes.items():
+        if members is not None:
+            in_universe = np.zeros(len(df), dtype=bool)
+            in_universe[index.member_rows(members)] = True
+            flags[f"in_{name}"] = in_universe[valid]
+    working_df = working_df.assign(ret=stock_return, ret_sq=stock_return ** 2, advancer=stock_return > 0, **flags)
 
-        return pd.Series({
-            "total_value": group['value_mn'].sum(),
-            "total_volume": group['volume'].sum(),
-            "avg_return": group['stock_return'].mean() * 100,
-            "breadth_pct": (advancers / total_unique * 100) if total_unique > 0 else 0,
-            "volatility": group['stock_return'].std() * 100,
-            "stock_count": total_unique
-        })
+    # 1. The only scan of the raw rows: additive sums at the finest grain.
+    # A symbol sits in exactly one (sector, category, universe) cell per day,
+    # so per-cell unique counts can be summed when rolling up.
+    base = working_df.groupby(['date', 'sector', 'category', *flags], observed=True, dropna=False).agg(
+        total_value=('value_mn', 'sum'),
+        total_volume=('volume', 'sum'),
+        n=('ret', 'size'),
+        ret_sum=('ret', 'sum'),
+        ret_sq_sum=('ret_sq', 'sum'),
+        advancers=('advancer', 'sum'),
+        stock_count=('trading_code', 'nunique'),
+    ).reset_index()
+    base[GROUP_SUM_COLUMNS] = base[GROUP_SUM_COLUMNS].astype('float64')
 
-    # Group by Date AND the dimension (Sector/Category)
-    daily_stats = working_df.groupby(['date', group_col]).apply(aggregate_group).reset_index()
+    # 2. Roll the (small) base table up to every grouping set
+    frames = []
+    for name, members in universes.items():
+        universe_base = base if members is None else base[base[f"in_{name}"]]
+        for grouping in ['market', 'sector', 'category']:
+            by = ['date'] if grouping == 'market' else ['date', grouping]
+            rolled = universe_base.groupby(by, observed=True)[GROUP_SUM_COLUMNS].sum().reset_index()
+            rolled = grouping_stats_from_sums(rolled)
+            rolled['universe'] = name
+            rolled['grouping'] = grouping
+            frames.append(rolled)
 
-    # Calculate Value Share per day
-    daily_stats['mkt_total'] = daily_stats.groupby('date')['total_value'].transform('sum')
-    daily_stats['value_share'] = (daily_stats['total_value'] / daily_stats['mkt_total']) * 100
+    cube = pd.concat(frames, ignore_index=True)
+    return cube[['universe', 'grouping', 'date', 'sector', 'category', *GROUP_STAT_COLUMNS, 'mkt_total', 'value_share']]
 
-    return daily_stats
 
+@instrument
+def slice_grouping_set(cube, universe="DSEX", group_col=None):
+    """
+    One view out of compute_daily_grouping_sets().
 
+    group_col='sector'/'category' gives the compute_daily_sector_category_metrics
+    layout; group_col=None gives the compute_daily_market_metrics layout.
+    """
+    if cube.empty: return pd.DataFrame()
+
+    part = cube[(cube['universe'] == universe) & (cube['grouping'] == (group_col or 'market'))]
+    if group_col is None:
+        part = part.rename(columns={'avg_return': 'market_return', 'volatility': 'market_volatility'})
+        return part[['date', *DAILY_MARKET_COLUMNS]].reset_index(drop=True)
+    return part[['date', group_col, *GROUP_STAT_COLUMNS, 'mkt_total', 'value_share']].reset_index(drop=True)
+
+
+@instrument
+@memoize
+def compute_daily_sector_category_metrics(df, group_col='sector'):
+    """Calculates daily metrics for either sector or category."""
+    return slice_grouping_set(compute_daily_grouping_sets(df), "DSEX", group_col)
+
+
+@instrument
+@memoize
 def compute_period_averages_grouped(daily_df, group_col='sector'):
     """Averages the daily metrics over the period for each group."""
     if daily_df.empty: return pd.DataFrame()
 
-    def summarize(group):
-        # Geometric Mean Return
-        returns_decimal = (group['avg_return'] / 100) + 1
-        geo_mean = (gmean(returns_decimal[returns_decimal > 0]) - 1) * 100 if not group.empty else 0
-
-        return pd.Series({
-            "total_value": group['total_value'].mean(),
-            "total_volume": group['total_volume'].mean(),
-            "avg_return": geo_mean,
-            "breadth_pct": group['breadth_pct'].mean(),
-            "volatility": group['avg_return'].std(),  # Std dev of daily returns
-            "value_share": group['value_share'].mean()
-        })
-
-    return daily_df.groupby(group_col).apply(summarize).reset_index()
\ No newline at end of file
+    # One vectorized pass over every group; the geometric mean skips days at -100% or worse
+    codes, groups = pd.factorize(daily_df[group_col], sort=True)
+    averaged = ['total_value', 'total_volume', 'breadth_pct', 'value_share']
+    stats = period_stats(daily_df['avg_return'], codes, len(groups), non_positive='skip',
+                         extra={col: daily_df[col] for col in averaged})
+
+    return pd.DataFrame({
+        group_col: groups,
+        "total_value": stats['total_value'],
+        "total_volume": stats['total_volume'],
+        "avg_return": stats['geo_mean'],
+        "breadth_pct": stats['breadth_pct'],
+        "volatility": stats['std'],  # Std dev of daily returns
+        "value_share": stats['value_share']
+    })
\ No newline at end of file
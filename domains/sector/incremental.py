@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+
+from domains.sector.compute import compute_daily_grouping_sets, slice_grouping_set
+from utils.instrument import instrument
+
+# Running sums kept per (universe, grouping, group); every period average is a
+# ratio of these, so it costs O(groups) no matter how long the window is.
+ACCUMULATOR_COLUMNS = [
+    'days', 'value_sum', 'volume_sum', 'breadth_sum', 'share_sum',
+    'ret_sum', 'ret_sq_sum', 'log_growth_sum', 'growth_days', 'non_growth_days'
+]
+
+
+def _group_key(cube):
+    """The sector/category name of each cube row ('' for market rows)."""
+    key = pd.Series('', index=cube.index, dtype=object)
+    for grouping in ['sector', 'category']:
+        rows = cube['grouping'] == grouping
+        key[rows] = cube.loc[rows, grouping].astype(object)
+    return key
+
+
+def _contributions(cube):
+    """Turns daily grouping-set rows into additive accumulator rows."""
+    growth = cube['avg_return'] / 100 + 1
+    positive = growth > 0
+    parts = pd.DataFrame({
+        'universe': cube['universe'],
+        'grouping': cube['grouping'],
+        'group': _group_key(cube),
+        'days': 1,
+        'value_sum': cube['total_value'],
+        'volume_sum': cube['total_volume'],
+        'breadth_sum': cube['breadth_pct'],
+        'share_sum': cube['value_share'],
+        'ret_sum': cube['avg_return'],
+        'ret_sq_sum': cube['avg_return'] ** 2,
+        'log_growth_sum': np.log(growth.where(positive, 1.0)),
+        'growth_days': positive.astype(int),
+        'non_growth_days': (~positive).astype(int),
+    })
+    return parts.groupby(['universe', 'grouping', 'group'])[ACCUMULATOR_COLUMNS].sum()
+
+
+def _date_versions(frame):
+    """A fingerprint of each date's rows: the (wrapping) sum of their row hashes, so row order doesn't matter."""
+    codes, dates = pd.factorize(frame['date'])
+    row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    order = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[order], np.arange(len(dates)))
+    return dict(zip(dates, np.add.reduceat(row_hashes[order], starts)))
+
+
+class IncrementalDailyMetrics:
+    """
+    Daily market/sector/category stats that are folded in one trading day at a
+    time instead of being recomputed over the whole window.
+
+    `daily` holds the compute_daily_grouping_sets() rows seen so far. Each date
+    also adds into per-group running sums (value, volume, breadth, return sums
+    and sums of squares, log-growth sums for the geometric mean), and removing a
+    date subtracts them again, so a rolling window costs one day of work.
+    `versions` maps each date folded in by sync()/sync_daily() to a fingerprint
+    of the rows it was folded from, so a date whose rows were re-fetched with
+    different values is folded in again.
+    """
+
+    def __init__(self, universes=None):
+        self.universes = universes or {"DSEX": None}
+        self.daily = pd.DataFrame()
+        self.totals = pd.DataFrame(columns=ACCUMULATOR_COLUMNS, dtype='float64')
+        self.versions = {}
+
+    @property
+    def dates(self):
+        return pd.Index([]) if self.daily.empty else pd.Index(self.daily['date'].unique())
+
+    def drop_dates(self, dates):
+        """Removes dates from the store, subtracting their contributions."""
+        for day in dates:
+            self.versions.pop(day, None)
+        if self.daily.empty or len(dates) == 0:
+            return
+        dropped = self.daily['date'].isin(dates)
+        if not dropped.any():
+            return
+        self.totals = self.totals.sub(_contributions(self.daily[dropped]), fill_value=0)
+        self.totals = self.totals[self.totals['days'] > 0]
+        self.daily = self.daily[~dropped].reset_index(drop=True)
+
+    def append(self, df):
+        """
+        Folds the raw rows of one or more new trading days into the store. Dates
+        that are already present (e.g. today's intraday update) are replaced.
+        """
+        if df.empty:
+            return
+        self.append_daily(compute_daily_grouping_sets.uncached(df, self.universes))
+
+    def append_daily(self, new_daily):
+        """Like append(), for rows already in the compute_daily_grouping_sets() layout."""
+        if new_daily is None or new_daily.empty:
+            return
+        self.drop_dates(new_daily['date'].unique())
+        added = _contributions(new_daily)
+        self.totals = added if self.totals.empty else self.totals.add(added, fill_value=0).sort_index()
+        self.daily = pd.concat([self.daily, new_daily], ignore_index=True) \
+            .sort_values(['universe', 'grouping', 'date'], kind='stable').reset_index(drop=True)
+
+    @instrument
+    def consume(self, chunks):
+        """
+        Folds an iterable of raw price frames covering whole trading days (e.g.
+        the batches of data.base_queries.stream_market_data) into the store.
+        Each batch is reduced to its grouping-set rows straight away, so only
+        one batch of raw rows is alive at a time. Returns the daily rows.
+        """
+        parts = [compute_daily_grouping_sets.uncached(chunk, self.universes) for chunk in chunks if not chunk.empty]
+        if parts:
+            # One merge at the end instead of re-sorting the store per batch
+            self.append_daily(pd.concat(parts, ignore_index=True))
+        return self.daily
+
+    def _prune_to_window(self, versions):
+        """
+        Drops dates outside the window (the keys of `versions`); returns the
+        dates that are new or whose rows changed since they were folded in.
+        """
+        self.drop_dates(self.dates.difference(pd.Index(list(versions))))
+        return [day for day, version in versions.items() if self.versions.get(day) != version]
+
+    @instrument
+    def sync(self, df):
+        """
+        Brings the store in line with the raw frame of the current window: dates
+        that left the window are subtracted, and only dates the store hasn't
+        seen yet or whose rows changed (e.g. today's intraday updates, or a day
+        re-fetched after settling) are folded in. Returns the daily grouping-set
+        rows, like compute_daily_grouping_sets.
+        """
+        if df.empty:
+            self.__init__(self.universes)
+            return self.daily
+
+        versions = _date_versions(df)
+        pending = self._prune_to_window(versions)
+        if pending:
+            # Dropped first, so a changed date that now yields no rows doesn't linger
+            self.drop_dates(pending)
+            self.append(df[df['date'].isin(pending)])
+        self.versions = versions
+        return self.daily
+
+    @instrument
+    def sync_daily(self, daily):
+        """
+        sync() for daily grouping-set rows that were aggregated elsewhere (e.g.
+        by the database, see domains/sector/queries.py) for the current window.
+        """
+        if daily.empty:
+            self.__init__(self.universes)
+            return self.daily
+
+        versions = _date_versions(daily)
+        pending = self._prune_to_window(versions)
+        if pending:
+            self.drop_dates(pending)
+            self.append_daily(daily[daily['date'].isin(pending)])
+        self.versions = versions
+        return self.daily
+
+    def daily_view(self, universe="DSEX", group_col=None):
+        return slice_grouping_set(self.daily, universe, group_col)
+
+    def period_view(self, universe="DSEX", group_col=None):
+        """
+        Period averages straight from the running sums. group_col=None returns
+        the compute_period_averages() dict, otherwise the
+        compute_period_averages_grouped() frame.
+        """
+        grouping = group_col or 'market'
+        if self.totals.empty or (universe, grouping) not in self.totals.index.droplevel('group'):
+            return None if group_col is None else pd.DataFrame()
+
+        t = self.totals.loc[(universe, grouping)]
+        days = t['days']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volatility = np.sqrt(((t['ret_sq_sum'] - t['ret_sum'] ** 2 / days) / (days - 1)).clip(lower=0))
+            volatility = volatility.where(days > 1)
+            geo_positive = (np.exp(t['log_growth_sum'] / t['growth_days']) - 1) * 100
+
+        if group_col is None:
+            row = t.iloc[0]
+            return {
+                # Any day at -100% or worse makes the market geometric mean undefined
+                "market_return": geo_positive.iloc[0] if row['non_growth_days'] == 0 else np.nan,
+                "market_volatility": volatility.iloc[0],
+                "total_value": row['value_sum'] / row['days'],
+                "total_volume": row['volume_sum'] / row['days'],
+                "breadth_pct": row['breadth_sum'] / row['days'],
+            }
+
+        # The grouped view averages the geometric mean over positive-growth days only
+        return pd.DataFrame({
+            group_col: t.index,
+            "total_value": (t['value_sum'] / days).to_numpy(),
+            "total_volume": (t['volume_sum'] / days).to_numpy(),
+            "avg_return": geo_positive.to_numpy(),
+            "breadth_pct": (t['breadth_sum'] / days).to_numpy(),
+            "volatility": volatility.to_numpy(),
+            "value_share": (t['share_sum'] / days).to_numpy(),
+        })
@@ -0,0 +1,69 @@
+import logging
+
+import pandas as pd
+
+from data.client import get_fetcher
+from data.fetcher import FetchError
+from data.membership import universe_spells
+from domains.sector.compute import GROUP_STAT_COLUMNS, GROUP_SUM_COLUMNS, grouping_stats_from_sums
+from utils.instrument import instrument
+
+logger = logging.getLogger(__name__)
+
+# Postgres function defined in sql/daily_aggregates.sql
+GROUP_SUMS_FUNCTION = "dsex_daily_group_sums"
+GROUPINGS = ['market', 'sector', 'category']
+
+
+@instrument
+def fetch_daily_grouping_sets(start_date: str, end_date: str, universes=None, groupings=None, fetcher=None):
+    """
+    Server-side counterpart of compute_daily_grouping_sets(): Postgres reduces
+    the price rows to per-day sums for every grouping and only those travel,
+    so the same layout comes back without downloading the raw prices.
+
+    universes: {"DSEX": None, "DS30": members} as in compute_daily_grouping_sets;
+    member spells travel as parallel arrays, so the database applies the
+    same date-effective membership. groupings limits the result to some of
+    'market' / 'sector' / 'category'.
+    Returns None if the database could not be reached.
+    """
+    universes = universes or {"DSEX": None}
+    groupings = groupings or GROUPINGS
+    fetcher = fetcher or get_fetcher()
+
+    frames = []
+    for name, members in universes.items():
+        args = {"members": None, "member_from": None, "member_to": None,
+                "groupings": None if set(groupings) == set(GROUPINGS) else list(groupings)}
+        if members is not None:
+            spells = universe_spells(members)
+            args["members"] = [str(code) for code in spells['trading_code']]
+            for key, col in [("member_from", 'effective_from'), ("member_to", 'effective_to')]:
+                days = pd.to_datetime(spells[col])
+                args[key] = [None if pd.isna(day) else day.strftime('%Y-%m-%d') for day in days]
+        try:
+            rows = fetcher.rpc(GROUP_SUMS_FUNCTION, start_date, end_date, args)
+        except FetchError as e:
+            logger.warning("Server-side aggregates unavailable, falling back to local compute: %s", e)
+            return None
+
+        sums = pd.DataFrame(rows, columns=['grouping', 'date', 'sector', 'category', *GROUP_SUM_COLUMNS])
+        sums['date'] = pd.to_datetime(sums['date'])
+        sums[GROUP_SUM_COLUMNS] = sums[GROUP_SUM_COLUMNS].astype('float64')
+
+        for grouping in groupings:
+            rolled = sums[sums['grouping'] == grouping]
+            by = ['date'] if grouping == 'market' else ['date', grouping]
+            rolled = grouping_stats_from_sums(rolled[[*by, *GROUP_SUM_COLUMNS]]
+                                              .sort_values(by).reset_index(drop=True))
+            rolled['universe'] = name
+            rolled['grouping'] = grouping
+            frames.append(rolled)
+
+    if not frames:
+        return pd.DataFrame()
+    cube = pd.concat(frames, ignore_index=True)
+    for col in ['sector', 'category']:
+        cube[col] = cube[col].astype('category') if col in cube else pd.Categorical([None] * len(cube))
+    return cube[['universe', 'grouping', 'date', 'sector', 'category', *GROUP_STAT_COLUMNS, 'mkt_total', 'value_share']]
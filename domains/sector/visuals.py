@@ -203,10 +203,12 @@
 
 
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
+from utils.charts import cached_figure, line_trace
+from utils.instrument import instrument
 
 
+@instrument
 def render_grouped_period_cards(avg_df, group_col='sector'):
     """Displays avg metrics in a scannable format."""
     st.markdown(f"### {group_col.title()} Performance (Period Average)")
@@ -221,6 +223,7 @@ def render_grouped_period_cards(avg_df, group_col='sector'):
             c5.metric("Volatility", f"{row['volatility']:.2f}%")
 
 
+@instrument
 def render_grouped_timeline(daily_df, group_col='sector', key_suffix=""):
     """Interactive line charts for daily metrics."""
     groups = sorted(daily_df[group_col].unique())
@@ -236,7 +239,18 @@ def render_grouped_timeline(daily_df, group_col='sector', key_suffix=""):
     filtered = daily_df[daily_df[group_col].isin(selected)]
 
     if not filtered.empty:
-        fig = px.line(filtered, x='date', y=metric, color=group_col, markers=True,
-                      title=f"Daily {metric.replace('_', ' ').title()} by {group_col.title()}")
-        fig.update_layout(hovermode="x unified", template="plotly_white")
-        st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+        fig = build_grouped_timeline_figure(filtered, metric, group_col)
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@cached_figure
+def build_grouped_timeline_figure(filtered, metric, group_col='sector'):
+    """One line per selected group for a daily metric (no Streamlit calls)."""
+    fig = go.Figure()
+    # Traces past the point budget are downsampled and drawn with WebGL (see utils/charts.py)
+    for group, rows in filtered.sort_values('date').groupby(group_col, observed=True, sort=True):
+        fig.add_trace(line_trace(rows['date'], rows[metric], name=str(group), mode='lines+markers'))
+    fig.update_layout(title=f"Daily {metric.replace('_', ' ').title()} by {group_col.title()}",
+                      xaxis_title='date', yaxis_title=metric, legend_title_text=group_col,
+                      hovermode="x unified", template="plotly_white")
+    return fig
\ No newline at end of file
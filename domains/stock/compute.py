@@ -1,32 +1,18 @@
+import math
+import numpy as np
 import pandas as pd
-from scipy.stats import gmean
-
-# Standardized DS30 List for internal filtering
-DS30_SYMBOLS = [
-    'BATBC', 'BEACONPHAR', 'BRACBANK', 'BSC', 'BSCPLC',
-    'BXPHARMA', 'CITYBANK', 'DELTALIFE', 'EBL', 'GP',
-    'GPHISPAT', 'HEIDELBCEM', 'IDLC', 'JAMUNAOIL', 'KBPPWBIL',
-    'KOHINOOR', 'LANKABAFIN', 'LHB', 'LINDEBD', 'LOVELLO',
-    'MJLBD', 'OLYMPIC', 'PADMAOIL', 'PRIMEBANK', 'PUBALIBANK',
-    'RENATA', 'ROBI', 'SQURPHARMA', 'UNIQUEHRL', 'WALTONHIL'
-]
-
+from data.cache import memoize
+from data.constituents import index_constituents
+from domains.stock.panel import as_stock_panel
+from utils.instrument import instrument
+from utils.math import period_stats
 
-def get_benchmark_df(df, name, b_type):
-    """Helper to filter the dataframe based on benchmark selection."""
-    if b_type == "index":
-        if name == "DS30":
-            return df[df['trading_code'].isin(DS30_SYMBOLS)]
-        return df  # Default to DSEX (full market)
-    elif b_type == "sector":
-        return df[df['sector'] == name]
-    elif b_type == "category":
-        return df[df['category'] == name]
-    elif b_type == "stock":
-        # Handle individual stock as benchmark
-        return df[df['trading_code'] == name]
-    return df
 
+TIMELINE_COLUMNS = [
+    'date', 'open', 'high', 'low', 'close', 'Bench Price', 'Daily Return', 'Bench Return',
+    'Daily Traded Value', 'Bench Traded Value', 'Liquidity Share', 'Excess Return vs Market',
+    'Participation Index', 'Bench Participation Index'
+]
 
 
 # def calculate_stock_daily_timeline(df, target_stock, benchmark_name, benchmark_type):
@@ -74,110 +60,189 @@ def get_benchmark_df(df, name, b_type):
 #
 #     return timeline
 
-def calculate_stock_daily_timeline(df, target_stock, benchmark_name, benchmark_type):
-    # 1. Prepare Target Data
-    stock_df = df[df['trading_code'] == target_stock].copy().sort_values('date')
-    # Pre-calculate target return to avoid alignment issues later
-    stock_df['target_ret'] = ((stock_df['ltp'] - stock_df['ycp']) / stock_df['ycp']) * 100
-    stock_adtv = stock_df['value_mn'].mean()
-
-    # 2. Prepare Benchmark Data
-    bench_df = get_benchmark_df(df, benchmark_name, benchmark_type).copy()
-    bench_df = bench_df[bench_df['ycp'] > 0].copy()
-    bench_df['raw_ret_pct'] = ((bench_df['ltp'] - bench_df['ycp']) / bench_df['ycp']) * 100
-
-    # Aggregate Benchmark by Date
-    bench_daily = bench_df.groupby('date').agg(
-        bench_ltp=('ltp', 'mean'),
-        bench_ret=('raw_ret_pct', 'mean'),  # This is the average % return for the bench
-        bench_val=('value_mn', 'sum')
-    ).reset_index()
-
-    bench_adtv = bench_daily['bench_val'].mean()
-
-    # 3. Market Total for Liquidity Share
-    market_total = df.groupby('date')['value_mn'].sum().rename('mkt_val').reset_index()
-
-    # 4. Merging - Use 'left' join on stock_df to keep it as the master timeline
-    merged = stock_df.merge(bench_daily, on='date', how='left')
-    merged = merged.merge(market_total, on='date', how='left')
+@instrument
+@memoize
+def calculate_stock_daily_timeline(df, target_stock, benchmark_name, benchmark_type, constituents=None):
+    """
+    The target's OHLC and daily stats next to its benchmark's. `constituents`
+    is the index constituent history (data.constituents; None = the built-in
+    registry), so a DS30 benchmark uses the members of each date.
+    """
+    panel = as_stock_panel(df)
+    s = panel.symbol_pos(target_stock)
+    if s is None:
+        return pd.DataFrame(columns=TIMELINE_COLUMNS)
+
+    # 1. Target rows are a column lookup on the panel
+    rows = panel.has_row[:, s]
+    ltp, ycp = panel.fields['ltp'][rows, s], panel.fields['ycp'][rows, s]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        target_ret = ((ltp - ycp) / ycp) * 100
+    value = panel.fields['value_mn'][rows, s]
+    stock_adtv = np.nanmean(value) if (~np.isnan(value)).any() else np.nan
+
+    # 2. Benchmark daily aggregates (cached on the panel per benchmark)
+    bench = panel.group_daily(benchmark_name, benchmark_type, index_constituents(constituents, "DS30"))
+    bench_present = bench['n'] > 0
+    bench_adtv = bench['value_sum'][bench_present].mean() if bench_present.any() else np.nan
 
-    # --- THE CRITICAL FIX ---
     # If a benchmark has no data for a specific day, fill the return with 0
-    # so the subtraction (target - 0) doesn't break.
-    merged['bench_ret'] = merged['bench_ret'].fillna(0)
-    merged['bench_ltp'] = merged['bench_ltp'].fillna(method='ffill')  # Carry last price forward
-
-    # 5. Final Calculation
-    # We use the pre-calculated target_ret and the filled bench_ret
-    excess_ret = merged['target_ret'] - merged['bench_ret']
+    # so the subtraction (target - 0) doesn't break; carry the last price forward.
+    bench_ret = np.nan_to_num(bench['ret_mean'][rows] * 100, nan=0.0)
+    bench_ltp = pd.Series(bench['ltp_mean'][rows]).ffill().to_numpy()
+    bench_val = bench['value_sum'][rows]
 
     timeline = pd.DataFrame({
-        'date': merged['date'],
-        'open': merged['openp'],
-        'high': merged['high'],
-        'low': merged['low'],
-        'close': merged['closep'],
-        'Bench Price': merged['bench_ltp'],
-        'Daily Return': merged['target_ret'],
-        'Bench Return': merged['bench_ret'],
-        'Daily Traded Value': merged['value_mn'],
-        'Bench Traded Value': merged['bench_val'],
-        'Liquidity Share': (merged['value_mn'] / merged['mkt_val'] * 100),
-        'Excess Return vs Market': excess_ret,
-        'Participation Index': (merged['value_mn'] / stock_adtv) if stock_adtv > 0 else 0,
-        'Bench Participation Index': (merged['bench_val'] / bench_adtv) if bench_adtv > 0 else 0
+        'date': panel.dates[rows],
+        'open': panel.fields['openp'][rows, s],
+        'high': panel.fields['high'][rows, s],
+        'low': panel.fields['low'][rows, s],
+        'close': panel.fields['closep'][rows, s],
+        'Bench Price': bench_ltp,
+        'Daily Return': target_ret,
+        'Bench Return': bench_ret,
+        'Daily Traded Value': value,
+        'Bench Traded Value': bench_val,
+        'Liquidity Share': value / panel.market_value[rows] * 100,
+        'Excess Return vs Market': target_ret - bench_ret,
+        'Participation Index': (value / stock_adtv) if stock_adtv > 0 else 0,
+        'Bench Participation Index': (bench_val / bench_adtv) if bench_adtv > 0 else 0
     })
 
     return timeline
 
-def calculate_period_comparison(df, entity_name, entity_type):
-    """Calculates Period Average pillars using exactly the same theory as market/compute.py."""
-
-    # 1. Standardize the data filtering
-    if entity_type == "stock":
-        working_df = df[df['trading_code'] == entity_name].copy()
-    else:
-        # Use your helper to get the group (Sector/Index/Category)
-        working_df = get_benchmark_df(df, entity_name, entity_type)
-
-    if working_df.empty:
+@instrument
+@memoize
+def calculate_period_comparison(df, entity_name, entity_type, constituents=None):
+    """
+    Calculates Period Average pillars using exactly the same theory as market/compute.py.
+    DS30 uses the members of each date from `constituents` (None = the built-in registry).
+    """
+    panel = as_stock_panel(df)
+    ds30 = index_constituents(constituents, "DS30")
+
+    # 1. Standardize the data filtering (a date x symbol mask over the panel)
+    members = panel.member_mask(entity_name, entity_type, ds30)
+    if not (panel.has_row & members).any():
         return {"Entity": entity_name, "Avg Return": 0, "Volatility": 0, "Pos. Days": 0, "ADTV": 0}
 
     # 2. Daily Market Metrics Step (Mirroring compute_daily_market_metrics)
-    # Filter out bad data like the market code does
-    working_df = working_df[working_df['ycp'] > 0].dropna(subset=['ltp', 'ycp'])
-    working_df['stock_return'] = (working_df['ltp'] - working_df['ycp']) / working_df['ycp']
-
-    # Group by date to get the "Daily Market Return" for this entity
-    daily_df = working_df.groupby('date').agg(
-        market_return=('stock_return', lambda x: x.mean() * 100),  # Convert to %
-        total_value=('value_mn', 'sum'),
-        total_volume=('volume', 'sum')
-    ).reset_index()
-
-    if daily_df.empty:
+    daily = panel.group_daily(entity_name, entity_type, ds30)
+    present = daily['n'] > 0
+    if not present.any():
         return {"Entity": entity_name, "Avg Return": 0, "Volatility": 0, "Pos. Days": 0, "ADTV": 0}
 
-    # 3. Period Average Step (Mirroring compute_period_averages)
-
-    # A. Volatility: Standard deviation of the daily percentage returns
-    period_vol = daily_df['market_return'].std()
+    market_return = daily['ret_mean'][present] * 100  # Convert to %
 
-    # B. Geometric Mean: Convert % back to decimal (1.0x) for gmean
-    returns_decimal = (daily_df['market_return'] / 100) + 1
-
-    if (returns_decimal <= 0).any():
-        geo_mean_return = 0
-    else:
-        # Matches your working theory perfectly
-        geo_mean_return = (gmean(returns_decimal) - 1) * 100
+    # 3. Period Average Step (Mirroring compute_period_averages): std and geometric
+    # mean of the daily % returns; a day at -100% or worse reports the mean as 0
+    stats = period_stats(market_return, non_positive='zero')
 
     return {
         "Entity": entity_name,
-        "Avg Return": geo_mean_return,
-        "Volatility": period_vol,
-        "Pos. Days": (daily_df['market_return'] > 0).mean() * 100,
-        "ADTV": daily_df['total_value'].mean(),
-        "Total Volume": working_df['volume'].sum()
-    }
\ No newline at end of file
+        "Avg Return": stats['geo_mean'][0],
+        "Volatility": stats['std'][0],
+        "Pos. Days": stats['pos_pct'][0],
+        "ADTV": daily['value_sum'][present].mean(),
+        "Total Volume": daily['volume_sum'][present].sum()
+    }
+
+
+ROLLING_BENCHMARKS = ['DSEX', 'DS30', 'Sector', 'Category']
+# Share of a window's dates a stock must have traded on for its statistics to show
+ROLLING_MIN_COVERAGE = 0.8
+ROLLING_COLUMNS = ['date', 'trading_code', 'Rolling Return', 'Rolling Volatility'] + [
+    f"{stat} vs {bench}" for bench in ROLLING_BENCHMARKS for stat in ('Beta', 'Correlation')
+]
+
+
+def _rolling_sum(grid, window):
+    """
+    Trailing `window`-row sums down every column at once: one cumulative sum
+    and one shifted difference, so the cost is O(dates x symbols) whatever the
+    window length. NaN counts as 0 (pair it with a rolling count of the mask).
+    """
+    csum = np.cumsum(np.nan_to_num(grid), axis=0)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    return out
+
+
+def _rolling_pair_stats(stock_ret, bench_ret, window, min_periods):
+    """Rolling beta and correlation of each stock column vs its benchmark column."""
+    pair = ~np.isnan(stock_ret) & ~np.isnan(bench_ret)
+    x = np.where(pair, stock_ret, 0.0)
+    y = np.where(pair, bench_ret, 0.0)
+
+    n = _rolling_sum(pair.astype('float64'), window)
+    sx, sy = _rolling_sum(x, window), _rolling_sum(y, window)
+    sxx, syy, sxy = _rolling_sum(x * x, window), _rolling_sum(y * y, window), _rolling_sum(x * y, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = np.maximum(sxx - sx * sx / n, 0.0)
+        var_y = np.maximum(syy - sy * sy / n, 0.0)
+        beta = np.where(var_y > 0, cov / var_y, np.nan)
+        corr = np.where((var_x > 0) & (var_y > 0), cov / np.sqrt(var_x * var_y), np.nan)
+
+    enough = n >= min_periods
+    return np.where(enough, beta, np.nan), np.where(enough, np.clip(corr, -1.0, 1.0), np.nan)
+
+
+@instrument
+@memoize
+def calculate_rolling_analytics(df, window=20, min_periods=None, constituents=None):
+    """
+    N-trading-day rolling return, volatility, beta and correlation for every
+    stock against DSEX, DS30, its own sector and its own category.
+
+    Everything runs on the (date x symbol) panel: the window statistics come
+    from cumulative sums, so all symbols and all four benchmarks are updated
+    in a handful of vectorized passes instead of a rolling().apply per ticker.
+    Returns are in % (compounded over the window); volatility is the standard
+    deviation of the daily % returns. One row per traded (date, stock).
+    DS30 uses the members of each date from `constituents` (None = the
+    built-in registry). A window needs `min_periods` valid days (default: ROLLING_MIN_COVERAGE of
+    it), so a suspension or a no-trade day doesn't blank the next `window` rows.
+    """
+    min_periods = max(2, min_periods or math.ceil(ROLLING_MIN_COVERAGE * window))
+    panel = as_stock_panel(df)
+    if not len(panel.symbols):
+        return pd.DataFrame(columns=ROLLING_COLUMNS)
+
+    ret = panel.ret
+    valid = panel.valid.astype('float64')
+
+    # 1. The stock's own window: compounded return and volatility
+    n = _rolling_sum(valid, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_growth = np.where(panel.valid, np.log1p(ret), np.nan)
+        rolling_return = np.expm1(_rolling_sum(log_growth, window)) * 100
+        s1, s2 = _rolling_sum(ret, window), _rolling_sum(ret * ret, window)
+        variance = np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1)
+        volatility = np.sqrt(variance) * 100
+
+    enough = n >= min_periods
+    stats = {
+        'Rolling Return': np.where(enough, rolling_return, np.nan),
+        'Rolling Volatility': np.where(enough, volatility, np.nan),
+    }
+
+    # 2. Benchmarks: index returns broadcast to every column, group returns per column
+    bench_grids = {
+        'DSEX': panel.group_daily("DSEX", "index")['ret_mean'][:, None],
+        'DS30': panel.group_daily("DS30", "index", index_constituents(constituents, "DS30"))['ret_mean'][:, None],
+        'Sector': panel.peer_returns('sector'),
+        'Category': panel.peer_returns('category'),
+    }
+    for bench, bench_ret in bench_grids.items():
+        bench_ret = np.broadcast_to(bench_ret, ret.shape)
+        stats[f"Beta vs {bench}"], stats[f"Correlation vs {bench}"] = _rolling_pair_stats(
+            ret, bench_ret, window, min_periods)
+
+    # 3. Long layout over the rows that exist
+    d_idx, s_idx = np.nonzero(panel.has_row)
+    out = pd.DataFrame({'date': panel.dates[d_idx], 'trading_code': panel.symbols[s_idx]})
+    for col, grid in stats.items():
+        out[col] = grid[d_idx, s_idx]
+    return out[ROLLING_COLUMNS]
@@ -0,0 +1,241 @@
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+
+from data.cache import memoize
+from data.membership import constituent_mask
+from utils.instrument import instrument
+
+logger = logging.getLogger(__name__)
+
+PANEL_FIELDS = ['openp', 'high', 'low', 'closep', 'ltp', 'ycp', 'value_mn', 'volume']
+# Identifies each built panel in the memo keys of its derived grids
+_panel_ids = itertools.count()
+
+
+class StockPanel:
+    """
+    The raw frame pivoted once into dense date x symbol NumPy arrays (or, with
+    from_window(), the history store's grids copied in without a long frame).
+
+    fields[col][d, s] holds the value of `col` for dates[d] / symbols[s] (NaN where
+    the stock has no row). `ret` is the decimal daily return (ltp - ycp) / ycp on
+    the same rows the compute modules keep (ycp > 0 and ltp present). Group
+    daily totals and peer grids are computed on first use and memoized per
+    panel (so the memo cache counts their bytes too), and a
+    stock-vs-benchmark lookup is a column slice plus a few vector ops. The
+    compute functions take either a price frame or a panel (as_stock_panel).
+    """
+
+    def __init__(self, df):
+        df = df[df['trading_code'].notna()]
+        date_codes, dates = pd.factorize(df['date'], sort=True)
+        symbol_codes, symbols = pd.factorize(df['trading_code'].astype(str), sort=True)
+
+        # Two rows for one (date, symbol) cell would silently overwrite each
+        # other in the grids; keep the last, like a re-fetched intraday update
+        duplicated = pd.Index(date_codes.astype('int64') * len(symbols) + symbol_codes).duplicated(keep='last')
+        if duplicated.any():
+            logger.warning("Dropping %d duplicate (date, symbol) price rows", int(duplicated.sum()))
+            keep = ~duplicated
+            df, date_codes, symbol_codes = df[keep], date_codes[keep], symbol_codes[keep]
+
+        shape = (len(dates), len(symbols))
+        has_row = np.zeros(shape, dtype=bool)
+        has_row[date_codes, symbol_codes] = True
+        fields = {}
+        for col in PANEL_FIELDS:
+            grid = np.full(shape, np.nan)
+            # Projected frames (see data.base_queries.MARKET_COLUMNS) may leave out OHLC
+            if col in df.columns:
+                grid[date_codes, symbol_codes] = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            fields[col] = grid
+
+        # Symbol attributes (each symbol has one sector/category)
+        first_row = pd.Series(np.arange(len(df))).groupby(symbol_codes).first().to_numpy()
+        self._set_grids(dates, symbols, has_row, fields,
+                        df['sector'].astype(object).to_numpy()[first_row],
+                        df['category'].astype(object).to_numpy()[first_row])
+
+    @classmethod
+    def from_window(cls, windows, tail, dimension):
+        """
+        A panel from history-store grids (data.history.HistoryWindow, all over
+        the same dates, e.g. the market columns of every symbol plus the OHLC
+        of one) followed by the long frame `tail` of the days after them.
+        The window grids are copied into the panel once, with no long frame in
+        between; `dimension` maps their symbol ids to trading codes, sectors
+        and categories. Symbol ids the dimension doesn't know are left out,
+        like rows without a trading_code in the frame constructor.
+        """
+        tail_panel = cls(tail) if not tail.empty else None
+        codes = pd.Categorical(dimension['trading_code']).astype(object)
+        labels = {col: pd.Categorical(dimension[col]).astype(object) for col in ['sector', 'category']}
+        dim_index = pd.Index(dimension['id'])
+
+        # 1. Symbols: every named symbol with a row in a window or in the tail
+        picks, attrs = [], {}
+        for window in windows:
+            pos = dim_index.get_indexer(window.symbol_ids)
+            keep = (pos >= 0) & window.has_row.any(axis=0)
+            picks.append((window, keep, codes[pos[keep]]))
+            for p in pos[keep]:
+                attrs[codes[p]] = (labels['sector'][p], labels['category'][p])
+        if tail_panel is not None:
+            attrs.update(zip(tail_panel.symbols, zip(tail_panel.sector, tail_panel.category)))
+        symbols = pd.Index(sorted(attrs))
+
+        # 2. Dates: the windows' days, then the tail's
+        window_dates = windows[0].dates if windows else pd.DatetimeIndex([])
+        dates = window_dates if tail_panel is None else window_dates.append(tail_panel.dates)
+        n_window = len(window_dates)
+        shape = (len(dates), len(symbols))
+
+        has_row = np.zeros(shape, dtype=bool)
+        fields = {col: np.full(shape, np.nan) for col in PANEL_FIELDS}
+        for window, keep, window_codes in picks:
+            cols = symbols.get_indexer(window_codes)
+            present = window.has_row[:, keep]
+            has_row[:n_window, cols] |= present
+            for col, grid in window.grids.items():
+                if col in fields:
+                    fields[col][:n_window, cols] = np.where(present, grid[:, keep], np.nan)
+        if tail_panel is not None:
+            cols = symbols.get_indexer(tail_panel.symbols)
+            has_row[n_window:, cols] = tail_panel.has_row
+            for col in PANEL_FIELDS:
+                fields[col][n_window:, cols] = tail_panel.fields[col]
+
+        panel = cls.__new__(cls)
+        panel._set_grids(dates, symbols, has_row, fields,
+                         [attrs[code][0] for code in symbols], [attrs[code][1] for code in symbols])
+        return panel
+
+    def _set_grids(self, dates, symbols, has_row, fields, sector, category):
+        self.dates = pd.DatetimeIndex(dates) if pd.api.types.is_datetime64_any_dtype(dates) else pd.Index(dates)
+        self.symbols = pd.Index(symbols)
+        self.has_row = has_row
+        self.fields = fields
+        self.sector = pd.Index(sector, dtype=object)
+        self.category = pd.Index(category, dtype=object)
+
+        ltp, ycp = self.fields['ltp'], self.fields['ycp']
+        self.valid = self.has_row & (ycp > 0) & ~np.isnan(ltp)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.ret = np.where(self.valid, (ltp - ycp) / ycp, np.nan)
+
+        # Daily market total traded value over every row (not just valid ones)
+        self.market_value = np.where(self.has_row.any(axis=1),
+                                     np.nansum(self.fields['value_mn'], axis=1), np.nan)
+        self.memo_key = ('stock_panel', next(_panel_ids))
+
+    @property
+    def empty(self):
+        """Like DataFrame.empty, so callers can test a panel the way they test a price frame."""
+        return not (len(self.dates) and len(self.symbols))
+
+    @property
+    def nbytes(self):
+        return (sum(a.nbytes for a in self.fields.values()) + self.ret.nbytes + self.has_row.nbytes * 2
+                + self.market_value.nbytes)
+
+    def symbol_pos(self, symbol):
+        pos = self.symbols.get_indexer([symbol])[0]
+        return None if pos < 0 else pos
+
+    def symbol_mask(self, name, b_type):
+        """Boolean mask over symbols for a sector / category / stock selection (every symbol otherwise)."""
+        if b_type == "sector":
+            return np.asarray(self.sector == name)
+        if b_type == "category":
+            return np.asarray(self.category == name)
+        if b_type == "stock":
+            return np.asarray(self.symbols == name)
+        return np.ones(len(self.symbols), dtype=bool)
+
+    def member_mask(self, name, b_type, universe=None):
+        """
+        Boolean (dates x symbols) mask of a benchmark selection. DS30 follows
+        `universe` (constituent-history rows or a symbol list, see
+        data.membership.universe_spells), so every date uses the constituents
+        in effect that day; without one DS30 is the whole market like DSEX.
+        """
+        if b_type == "index" and name == "DS30" and universe is not None:
+            return constituent_mask(universe, self.dates, self.symbols)
+        return np.broadcast_to(self.symbol_mask(name, b_type), self.has_row.shape)
+
+    def group_daily(self, name, b_type, universe=None):
+        """
+        Per-date aggregates of a symbol group over its valid rows:
+        n (rows), ret_mean (decimal), ltp_mean, value_sum, volume_sum.
+        Dates where the group has no valid row are NaN (n == 0).
+        """
+        return _group_daily(self, name, b_type, universe if b_type == "index" else None)
+
+    def peer_returns(self, by):
+        """
+        (dates x symbols) grid of the mean daily return (decimal) of each symbol's
+        own sector or category, so every column can be compared with its group in
+        one vectorized pass. NaN where the group has no valid row that day.
+        """
+        return _peer_returns(self, by)
+
+
+@memoize
+def _group_daily(panel, name, b_type, universe):
+    valid = panel.valid & panel.member_mask(name, b_type, universe)
+    n = valid.sum(axis=1)
+    present = n > 0
+
+    def masked(field):
+        return np.where(valid, field, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "n": n,
+            "ret_mean": np.where(present, np.nansum(masked(panel.ret), axis=1) / n, np.nan),
+            "ltp_mean": np.where(present, np.nansum(masked(panel.fields['ltp']), axis=1) / n, np.nan),
+            "value_sum": np.where(present, np.nansum(masked(panel.fields['value_mn']), axis=1), np.nan),
+            "volume_sum": np.where(present, np.nansum(masked(panel.fields['volume']), axis=1), np.nan),
+        }
+
+
+@memoize
+def _peer_returns(panel, by):
+    labels = panel.sector if by == 'sector' else panel.category
+    codes, groups = pd.factorize(labels)
+    # One-hot (symbols x groups) turns the per-group daily sums into a matmul
+    onehot = np.zeros((len(panel.symbols), len(groups) + 1))
+    onehot[np.arange(len(panel.symbols)), np.where(codes >= 0, codes, len(groups))] = 1.0
+    sums = np.nan_to_num(panel.ret) @ onehot
+    counts = panel.valid.astype('float64') @ onehot
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    grid = means[:, np.where(codes >= 0, codes, len(groups))]
+    grid[:, codes < 0] = np.nan
+    return grid
+
+
+@instrument
+@memoize
+def build_stock_panel(df):
+    """One StockPanel per dataset (memoized on the frame fingerprint)."""
+    return StockPanel(df)
+
+
+@instrument
+@memoize
+def build_window_panel(windows, tail, dimension):
+    """
+    One StockPanel per history-store slice and tail frame (see
+    StockPanel.from_window and data.base_queries.fetch_market_window),
+    memoized on the windows' generation/slice keys and the frames' fingerprints.
+    """
+    return StockPanel.from_window(tuple(windows), tail, dimension)
+
+
+def as_stock_panel(data):
+    """`data` itself if it is already a StockPanel, else the panel of the price frame `data`."""
+    return data if isinstance(data, StockPanel) else build_stock_panel(data)
@@ -1,8 +1,45 @@
+import numpy as np
+
+from data.base_queries import MARKET_COLUMNS, OHLC_COLUMNS, fetch_market_window
+from data.cache import memoize
+from data.membership import build_membership_index
+from domains.stock.panel import build_window_panel
+
+
 def get_filtered_stock_list(df, sectors=None, categories=None):
     if df.empty: return []
-    temp_df = df.copy()
+    index = build_membership_index(df)
+    rows = None
     if sectors:
-        temp_df = temp_df[temp_df['sector'].isin(sectors)]
+        rows = index.rows('sector', sectors)
     if categories:
-        temp_df = temp_df[temp_df['category'].isin(categories)]
-    return sorted(temp_df['trading_code'].unique())
\ No newline at end of file
+        category_rows = index.rows('category', categories)
+        rows = category_rows if rows is None else np.intersect1d(rows, category_rows, assume_unique=True)
+    codes = df['trading_code'] if rows is None else df['trading_code'].iloc[rows]
+    return sorted(codes.unique())
+
+
+def fetch_stock_panel(start_date: str, end_date: str, target_stock=None, with_ohlc=True):
+    """
+    The StockPanel the stock, screener, structure and index computations read:
+    the market columns of every symbol (benchmarks and market totals need
+    them) plus, for the daily charts, the OHLC columns of `target_stock` only.
+    Days the history store serves go from its memory-mapped grids straight
+    into the panel; only the days after them are loaded as a long frame.
+    """
+    market_window, tail, dimension = fetch_market_window(start_date, end_date, MARKET_COLUMNS)
+    windows = [market_window]
+    if target_stock is not None and with_ohlc:
+        ohlc_window, ohlc_tail, _ = fetch_market_window(start_date, end_date, OHLC_COLUMNS, symbols=[target_stock])
+        windows.append(ohlc_window)
+        if not tail.empty:
+            tail = _with_ohlc(tail, ohlc_tail)
+    return build_window_panel(tuple(w for w in windows if w is not None), tail, dimension)
+
+
+@memoize
+def _with_ohlc(market, ohlc):
+    if ohlc.empty:
+        # The target has no rows in the range: the charts show empty OHLC
+        return market.assign(**{c: float('nan') for c in OHLC_COLUMNS if c not in market.columns})
+    return market.merge(ohlc[OHLC_COLUMNS], on=['date', 'symbol_id'], how='left')
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from data.cache import memoize
+from data.constituents import index_constituents
+from domains.stock.panel import as_stock_panel
+from utils.instrument import instrument
+from utils.math import period_stats
+
+SCREENER_COLUMNS = [
+    'Rank', 'Symbol', 'Sector', 'Category', 'Avg Return', 'Volatility', 'Pos. Days', 'ADTV',
+    'Total Volume', 'Trading Days', 'Excess vs DSEX', 'Excess vs DS30', 'Excess vs Sector',
+    'Excess vs Category'
+]
+
+
+def _column_period_stats(ret_pct, value):
+    """
+    Period pillars for every column of a date x entity matrix of daily % returns
+    (NaN = no data that day), the same definitions calculate_period_comparison
+    uses: geometric mean return, std of daily returns, % positive days and ADTV.
+    """
+    n_dates, n_entities = ret_pct.shape
+    # Each column is a group of the shared kernel; a day at -100% or worse reports the mean as 0
+    stats = period_stats(ret_pct.ravel(), np.tile(np.arange(n_entities), n_dates), n_entities,
+                         non_positive='zero')
+
+    present = ~np.isnan(ret_pct)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adtv = np.where(present, np.nan_to_num(value), 0).sum(axis=0) / stats['days']
+
+    return {"geo": stats['geo_mean'], "vol": stats['std'], "pos": stats['pos_pct'], "adtv": adtv,
+            "days": stats['days']}
+
+
+def _group_daily_returns(panel, membership):
+    """
+    Equal-weighted daily % return and traded value of many symbol groups at once.
+    membership is a symbols x groups 0/1 matrix, so the whole thing is two
+    matrix products over the panel.
+    """
+    valid = panel.valid.astype('float64')
+    n = valid @ membership
+    ret_sum = np.where(panel.valid, panel.ret, 0) @ membership
+    value_sum = np.where(panel.valid, np.nan_to_num(panel.fields['value_mn']), 0) @ membership
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret_pct = np.where(n > 0, ret_sum / n * 100, np.nan)
+    return ret_pct, np.where(n > 0, value_sum, np.nan)
+
+
+def _one_hot(codes, n_groups):
+    membership = np.zeros((len(codes), n_groups))
+    known = codes >= 0
+    membership[np.flatnonzero(known), codes[known]] = 1.0
+    return membership
+
+
+@instrument
+@memoize
+def screen_stocks(df, sort_by='Avg Return', ascending=False, constituents=None):
+    """
+    Period stats for every symbol in `df` in one vectorized pass, with excess
+    return (geometric mean difference, same as the relative verdict) over DSEX,
+    DS30, the stock's own sector and its own category. Returns a ranked table.
+    DS30 uses the members of each date from `constituents` (None = the
+    built-in registry).
+    """
+    if df.empty:
+        return pd.DataFrame(columns=SCREENER_COLUMNS)
+
+    panel = as_stock_panel(df)
+
+    # 1. Every stock: its own daily return is its column of the panel
+    stock_ret = np.where(panel.valid, panel.ret * 100, np.nan)
+    stocks = _column_period_stats(stock_ret, panel.fields['value_mn'])
+    total_volume = np.where(panel.valid, np.nan_to_num(panel.fields['volume']), 0).sum(axis=0)
+
+    # 2. Benchmarks: DSEX, every sector and every category in one go; DS30
+    # changes members over time, so its daily series comes from the panel
+    sector_codes, sectors = pd.factorize(panel.sector)
+    category_codes, categories = pd.factorize(panel.category)
+    membership = np.hstack([
+        np.ones((len(panel.symbols), 1)),
+        _one_hot(sector_codes, len(sectors)),
+        _one_hot(category_codes, len(categories)),
+    ])
+    group_ret, group_value = _group_daily_returns(panel, membership)
+    ds30 = panel.group_daily("DS30", "index", index_constituents(constituents, "DS30"))
+    group_ret = np.column_stack([group_ret[:, :1], ds30['ret_mean'] * 100, group_ret[:, 1:]])
+    group_value = np.column_stack([group_value[:, :1], ds30['value_sum'], group_value[:, 1:]])
+    group_geo = _column_period_stats(group_ret, group_value)['geo']
+
+    dsex_geo, ds30_geo = group_geo[0], group_geo[1]
+    sector_geo = group_geo[2:2 + len(sectors)]
+    category_geo = group_geo[2 + len(sectors):]
+
+    def own_group(geo, codes):
+        return np.where(codes >= 0, geo[np.maximum(codes, 0)], np.nan)
+
+    table = pd.DataFrame({
+        'Symbol': panel.symbols,
+        'Sector': panel.sector,
+        'Category': panel.category,
+        'Avg Return': stocks['geo'],
+        'Volatility': stocks['vol'],
+        'Pos. Days': stocks['pos'],
+        'ADTV': stocks['adtv'],
+        'Total Volume': total_volume,
+        'Trading Days': stocks['days'],
+        'Excess vs DSEX': stocks['geo'] - dsex_geo,
+        'Excess vs DS30': stocks['geo'] - ds30_geo,
+        'Excess vs Sector': stocks['geo'] - own_group(sector_geo, sector_codes),
+        'Excess vs Category': stocks['geo'] - own_group(category_geo, category_codes),
+    })
+    # Symbols that never had a valid return row can't be ranked
+    table = table[table['Trading Days'] > 0]
+
+    table = table.sort_values(sort_by, ascending=ascending, na_position='last').reset_index(drop=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table
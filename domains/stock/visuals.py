@@ -1,8 +1,11 @@
 
 import streamlit as st
 import plotly.graph_objects as go
+from utils.charts import cached_figure
+from utils.instrument import instrument
 
 
+@instrument
 def render_stock_daily_charts(df, ticker, bench_name):
     """Refreshed daily charts including the overlay candlestick."""
     render_candlestick_chart(df, ticker, bench_name)
@@ -11,77 +14,120 @@ def render_stock_daily_charts(df, ticker, bench_name):
     # 1. Daily Return Comparison
     col1, col2 = st.columns(2)
     with col1:
-        fig1 = go.Figure()
-        fig1.add_trace(go.Scatter(x=df['date'], y=df['Daily Return'], name=ticker, line=dict(color='#636EFA')))
-        fig1.add_trace(
-            go.Scatter(x=df['date'], y=df['Bench Return'], name=bench_name, line=dict(color='#FECB52', dash='dot')))
-        fig1.update_layout(title="Daily Return Comparison (%)", template="plotly_white", height=300,
-                           hovermode="x unified")
-        st.plotly_chart(fig1, use_container_width=True, key=f"ret_{ticker}_{bench_name}")
+        st.plotly_chart(build_return_comparison_figure(df, ticker, bench_name),
+                        use_container_width=True, key=f"ret_{ticker}_{bench_name}")
 
     with col2:
         # Participation Index Comparison
-        fig2 = go.Figure()
-        fig2.add_trace(go.Scatter(x=df['date'], y=df['Participation Index'], name=ticker, fill='tozeroy',
-                                  line=dict(color='#FFA15A')))
-        fig2.add_trace(
-            go.Scatter(x=df['date'], y=df['Bench Participation Index'], name=bench_name, line=dict(color='#B6E880')))
-        fig2.add_hline(y=1.0, line_dash="dot", line_color="gray")
-        fig2.update_layout(title="Participation Index (1.0 = Avg)", template="plotly_white", height=300,
-                           hovermode="x unified")
-        st.plotly_chart(fig2, use_container_width=True, key=f"part_{ticker}_{bench_name}")
+        st.plotly_chart(build_participation_figure(df, ticker, bench_name),
+                        use_container_width=True, key=f"part_{ticker}_{bench_name}")
 
     # 2. Volume & Liquidity
     col3, col4 = st.columns(2)
     with col3:
-        fig3 = go.Figure()
-        fig3.add_trace(go.Bar(x=df['date'], y=df['Daily Traded Value'], name=ticker, marker_color='#00CC96'))
-        # Note: We don't overlay Benchmark volume here as the scale difference (Stock vs Index) would break the chart.
-        fig3.update_layout(title=f"{ticker} Value (Mn)", template="plotly_white", height=300)
-        st.plotly_chart(fig3, use_container_width=True, key=f"val_{ticker}")
+        st.plotly_chart(build_traded_value_figure(df, ticker), use_container_width=True, key=f"val_{ticker}")
 
     with col4:
-        fig4 = go.Figure(go.Scatter(x=df['date'], y=df['Liquidity Share'], line=dict(color='#EF553B')))
-        fig4.update_layout(title="Liquidity Share (%)", template="plotly_white", height=300)
-        st.plotly_chart(fig4, use_container_width=True, key=f"liq_{ticker}")
+        st.plotly_chart(build_liquidity_share_figure(df), use_container_width=True, key=f"liq_{ticker}")
 
         # 3. Excess Return (Conditional Coloring)
-        colors = ['#00CC96' if x >= 0 else '#EF553B' for x in df['Excess Return vs Market']]
-
-        fig5 = go.Figure()
-        fig5.add_trace(go.Bar(
-            x=df['date'],
-            y=df['Excess Return vs Market'],
-            marker_color=colors,
-            name="Excess Return",
-            # Adding a slight border to bars for a cleaner look
-            marker_line_width=0,
-        ))
-
-        fig5.add_hline(y=0, line_dash="dash", line_color="black", line_width=1)
-
-        fig5.update_layout(
-            title={
-                'text': f"Excess Return: {ticker} vs {bench_name} (%)",
-                'y': 0.9,
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            },
-            template="plotly_white",
-            height=350,  # Slightly taller for better centering
-            hovermode="x unified",
-            # Centering the plot area by adjusting margins
-            margin=dict(l=50, r=50, t=80, b=50),
-            showlegend=False,  # Hidden since the title and colors explain the data
-            xaxis=dict(showgrid=False),
-            yaxis=dict(zeroline=False, title="Return Diff (%)")
-        )
-
         # Using a container to provide extra padding for "centering" feel
         with st.container():
-            st.plotly_chart(fig5, use_container_width=True, key=f"exc_{ticker}_{bench_name}")
+            st.plotly_chart(build_excess_return_figure(df, ticker, bench_name),
+                            use_container_width=True, key=f"exc_{ticker}_{bench_name}")
+
+
+@cached_figure
+def build_return_comparison_figure(df, ticker, bench_name):
+    fig1 = go.Figure()
+    fig1.add_trace(go.Scatter(x=df['date'], y=df['Daily Return'], name=ticker, line=dict(color='#636EFA')))
+    fig1.add_trace(
+        go.Scatter(x=df['date'], y=df['Bench Return'], name=bench_name, line=dict(color='#FECB52', dash='dot')))
+    fig1.update_layout(title="Daily Return Comparison (%)", template="plotly_white", height=300,
+                       hovermode="x unified")
+    return fig1
+
+
+@cached_figure
+def build_participation_figure(df, ticker, bench_name):
+    fig2 = go.Figure()
+    fig2.add_trace(go.Scatter(x=df['date'], y=df['Participation Index'], name=ticker, fill='tozeroy',
+                              line=dict(color='#FFA15A')))
+    fig2.add_trace(
+        go.Scatter(x=df['date'], y=df['Bench Participation Index'], name=bench_name, line=dict(color='#B6E880')))
+    fig2.add_hline(y=1.0, line_dash="dot", line_color="gray")
+    fig2.update_layout(title="Participation Index (1.0 = Avg)", template="plotly_white", height=300,
+                       hovermode="x unified")
+    return fig2
+
+
+@cached_figure
+def build_traded_value_figure(df, ticker):
+    fig3 = go.Figure()
+    fig3.add_trace(go.Bar(x=df['date'], y=df['Daily Traded Value'], name=ticker, marker_color='#00CC96'))
+    # Note: We don't overlay Benchmark volume here as the scale difference (Stock vs Index) would break the chart.
+    fig3.update_layout(title=f"{ticker} Value (Mn)", template="plotly_white", height=300)
+    return fig3
+
+
+@cached_figure
+def build_liquidity_share_figure(df):
+    fig4 = go.Figure(go.Scatter(x=df['date'], y=df['Liquidity Share'], line=dict(color='#EF553B')))
+    fig4.update_layout(title="Liquidity Share (%)", template="plotly_white", height=300)
+    return fig4
+
+
+@cached_figure
+def build_excess_return_figure(df, ticker, bench_name):
+    colors = ['#00CC96' if x >= 0 else '#EF553B' for x in df['Excess Return vs Market']]
+
+    fig5 = go.Figure()
+    fig5.add_trace(go.Bar(
+        x=df['date'],
+        y=df['Excess Return vs Market'],
+        marker_color=colors,
+        name="Excess Return",
+        # Adding a slight border to bars for a cleaner look
+        marker_line_width=0,
+    ))
+
+    fig5.add_hline(y=0, line_dash="dash", line_color="black", line_width=1)
+
+    fig5.update_layout(
+        title={
+            'text': f"Excess Return: {ticker} vs {bench_name} (%)",
+            'y': 0.9,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        template="plotly_white",
+        height=350,  # Slightly taller for better centering
+        hovermode="x unified",
+        # Centering the plot area by adjusting margins
+        margin=dict(l=50, r=50, t=80, b=50),
+        showlegend=False,  # Hidden since the title and colors explain the data
+        xaxis=dict(showgrid=False),
+        yaxis=dict(zeroline=False, title="Return Diff (%)")
+    )
+    return fig5
+
+@instrument
+def render_relative_verdict(target_stats, bench_stats):
+    """Displays the relative return verdict as requested."""
+    rel_return = target_stats['Avg Return'] - bench_stats['Avg Return']
+
+    if rel_return > 0:
+        st.success(
+            f"🚀 **{target_stats['Entity']}** is outperforming **{bench_stats['Entity']}** by **{rel_return:.2f}%** (Geometric Mean) over this period.")
+    elif rel_return < 0:
+        st.error(
+            f"⚠️ **{target_stats['Entity']}** is underperforming **{bench_stats['Entity']}** by **{abs(rel_return):.2f}%** (Geometric Mean) over this period.")
+    else:
+        st.info(f"⚖️ **{target_stats['Entity']}** is performing exactly at par with **{bench_stats['Entity']}**.")
+
 
+@instrument
 def render_comparison_cards(target, bench):
     """Side-by-side metric cards for Period Average."""
     c1, c2 = st.columns(2)
@@ -101,8 +147,15 @@ def render_comparison_cards(target, bench):
                 st.caption(f"Total Period Volume: {data.get('Total Volume', 0):,.0f}")
 
 
+@instrument
 def render_candlestick_chart(df, ticker, bench_name):
     """Renders a candlestick chart with a benchmark trend line overlay."""
+    fig = build_candlestick_figure(df, ticker, bench_name)
+    st.plotly_chart(fig, use_container_width=True, key=f"candle_{ticker}_{bench_name}")
+
+
+@cached_figure
+def build_candlestick_figure(df, ticker, bench_name):
     fig = go.Figure()
 
     # 1. Primary Candlestick for Target Stock
@@ -137,5 +190,44 @@ def render_candlestick_chart(df, ticker, bench_name):
         hovermode="x unified",
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
+    return fig
+
+ROLLING_COLORS = {'DSEX': '#636EFA', 'DS30': '#EF553B', 'Sector': '#00CC96', 'Category': '#AB63FA'}
 
-    st.plotly_chart(fig, use_container_width=True, key=f"candle_{ticker}_{bench_name}")
\ No newline at end of file
+
+@instrument
+def render_rolling_analytics(df, ticker, window):
+    """Rolling return/volatility of the stock and its rolling beta/correlation vs each benchmark."""
+    st.plotly_chart(build_rolling_return_figure(df, ticker, window),
+                    use_container_width=True, key=f"roll_ret_{ticker}_{window}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(build_rolling_benchmark_figure(df, "Beta", window),
+                        use_container_width=True, key=f"roll_beta_{ticker}_{window}")
+    with col2:
+        st.plotly_chart(build_rolling_benchmark_figure(df, "Correlation", window),
+                        use_container_width=True, key=f"roll_corr_{ticker}_{window}")
+
+
+@cached_figure
+def build_rolling_return_figure(df, ticker, window):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df['date'], y=df['Rolling Return'], name="Return", line=dict(color='#636EFA')))
+    fig.add_trace(go.Scatter(x=df['date'], y=df['Rolling Volatility'], name="Volatility",
+                             line=dict(color='#FFA15A', dash='dot'), yaxis="y2"))
+    fig.update_layout(title=f"{ticker}: {window}-Day Rolling Return & Volatility (%)", template="plotly_white",
+                      height=320, hovermode="x unified",
+                      yaxis=dict(title="Return (%)"),
+                      yaxis2=dict(title="Volatility (%)", overlaying="y", side="right", showgrid=False))
+    return fig
+
+
+@cached_figure
+def build_rolling_benchmark_figure(df, stat, window):
+    fig = go.Figure()
+    for bench, color in ROLLING_COLORS.items():
+        fig.add_trace(go.Scatter(x=df['date'], y=df[f"{stat} vs {bench}"], name=bench, line=dict(color=color)))
+    fig.add_hline(y=1.0 if stat == "Beta" else 0.0, line_dash="dot", line_color="gray")
+    fig.update_layout(title=f"{window}-Day Rolling {stat}", template="plotly_white", height=320,
+                      hovermode="x unified")
+    return fig
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+from data.cache import memoize
+from domains.stock.panel import as_stock_panel
+from utils.instrument import instrument
+
+
+@instrument
+@memoize
+def compute_return_correlation(df, universe=None, min_overlap=20):
+    """
+    Symbol x symbol Pearson correlation of daily returns, (ltp - ycp) / ycp on
+    the panel's valid rows, with pairwise handling of missing days: each pair
+    only uses the days both stocks traded. Pairs sharing fewer than
+    `min_overlap` days are NaN, and stocks with fewer valid days are dropped.
+    `universe` (constituent-history rows or a symbol list, None = every stock)
+    restricts each stock to the days it was a member.
+
+    All pairwise sums come out of a few (days x symbols) matrix products, so
+    the whole matrix costs about as much as one X.T @ X.
+    """
+    panel = as_stock_panel(df)
+    # A universe's stocks only count on the days they were members of it
+    valid = panel.valid & panel.member_mask("DS30", "index", universe)
+    members = valid.sum(axis=0) >= min_overlap
+
+    # 1. Cleaned return panel: 0 where the stock has no valid return, plus its mask
+    mask = valid[:, members].astype('float64')
+    x = np.where(valid[:, members], panel.ret[:, members], 0.0)
+
+    # 2. Pairwise sums over the days both i and j traded
+    n = mask.T @ mask               # overlap days
+    sx = x.T @ mask                 # sum of x_i over the overlap with j
+    sxx = (x * x).T @ mask          # sum of x_i^2 over the overlap with j
+    sxy = x.T @ x                   # sum of x_i * x_j (zeros drop non-overlap days)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sxy - sx * sx.T
+        var_i = n * sxx - sx * sx
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr = np.where((n >= min_overlap) & np.isfinite(corr), np.clip(corr, -1.0, 1.0), np.nan)
+    np.fill_diagonal(corr, 1.0)
+
+    symbols = panel.symbols[members]
+    return pd.DataFrame(corr, index=symbols, columns=symbols)
+
+
+@instrument
+@memoize
+def cluster_correlation_matrix(corr, n_clusters=8, method='average'):
+    """
+    Hierarchical clustering of the stocks on the correlation distance
+    sqrt(2 * (1 - corr)); pairs without enough overlap count as uncorrelated.
+    Returns the matrix reordered by the dendrogram's leaves and a frame of
+    trading_code / cluster in that same order.
+    """
+    if len(corr) < 2:
+        return corr, pd.DataFrame({'trading_code': corr.index, 'cluster': 1})
+
+    filled = np.nan_to_num(corr.to_numpy(), nan=0.0)
+    dist = np.sqrt(np.maximum(2.0 * (1.0 - filled), 0.0))
+    np.fill_diagonal(dist, 0.0)
+    tree = linkage(squareform(dist, checks=False), method=method)
+
+    order = leaves_list(tree)
+    labels = fcluster(tree, t=min(n_clusters, len(corr)), criterion='maxclust')
+    ordered = corr.iloc[order, order]
+    clusters = pd.DataFrame({'trading_code': corr.index[order], 'cluster': labels[order]})
+    return ordered, clusters
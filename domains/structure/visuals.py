@@ -0,0 +1,38 @@
+import streamlit as st
+import plotly.graph_objects as go
+from utils.charts import cached_figure
+from utils.instrument import instrument
+
+
+@instrument
+def render_market_structure(ordered, clusters, key_suffix=""):
+    """Clustered correlation heatmap plus the members of each cluster."""
+    st.plotly_chart(build_correlation_heatmap(ordered), use_container_width=True, key=f"corr_{key_suffix}")
+
+    st.write("### Clusters")
+    summary = (clusters.groupby('cluster', sort=False)['trading_code']
+               .agg(Stocks='count', Members=lambda codes: ", ".join(codes))
+               .reset_index().rename(columns={'cluster': 'Cluster'}))
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+
+@cached_figure
+def build_correlation_heatmap(ordered):
+    fig = go.Figure(go.Heatmap(
+        z=ordered.to_numpy(),
+        x=ordered.columns,
+        y=ordered.index,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu_r',
+        colorbar=dict(title="Corr"),
+        hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>"
+    ))
+    fig.update_layout(
+        title="Daily Return Correlation (clustered order)",
+        template="plotly_white",
+        height=max(500, min(12 * len(ordered), 1000)),
+        xaxis=dict(showticklabels=len(ordered) <= 60),
+        yaxis=dict(showticklabels=len(ordered) <= 60, autorange='reversed'),
+    )
+    return fig
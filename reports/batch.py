@@ -0,0 +1,206 @@
+"""
+Headless batch run of the dashboard's analytics for one date range, written
+as Parquet so the app (or anything else) can read the views instead of
+computing them:
+
+    REPORT_DIR/<start>_<end>/
+        daily_grouping_sets.parquet   market / sector / category daily stats, DSEX and DS30
+        market_period.parquet         period averages per universe
+        group_period.parquet          sector and category period averages per universe
+        period_comparison.parquet     Period Average pillars per stock, index, sector and category
+        manifest.json
+
+    python -m reports.batch --start 2024-01-01 --end 2024-12-31 [--workers 8] [--stream]
+
+The market and sector views are folded into one IncrementalDailyMetrics
+store a batch of trading days at a time; the per-entity comparisons are
+spread over a process pool. With --stream the batches come straight from
+the database (data.base_queries.stream_market_data), so a range too long
+to hold as one frame still gets its market and sector views; the
+comparisons, which need the whole frame, are skipped.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+from config.settings import REPORT_DIR, REPORT_WORKERS
+from data.constituents import index_constituents
+from domains.sector.incremental import IncrementalDailyMetrics
+from domains.stock.compute import calculate_period_comparison
+
+# The price frame and constituent history each worker process compares entities on (set once per worker)
+_worker_df = None
+_worker_constituents = None
+
+
+def report_path(start_date, end_date, output_dir=REPORT_DIR):
+    return os.path.join(output_dir, f"{start_date}_{end_date}")
+
+
+def read_report(start_date, end_date, name, output_dir=REPORT_DIR):
+    """One precomputed view (e.g. "market_period"), or None if it hasn't been built."""
+    path = os.path.join(report_path(start_date, end_date, output_dir), f"{name}.parquet")
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def report_universes(constituents=None):
+    """DSEX plus DS30, whose rows are flagged with the constituents in effect on their own date."""
+    return {"DSEX": None, "DS30": index_constituents(constituents, "DS30")}
+
+
+def _init_worker(df, constituents=None):
+    global _worker_df, _worker_constituents
+    _worker_df = df
+    _worker_constituents = constituents
+
+
+def _compare_entities(entities):
+    """calculate_period_comparison() for a batch of (name, type) entities in a worker."""
+    rows = []
+    for name, entity_type in entities:
+        stats = calculate_period_comparison(_worker_df, name, entity_type, _worker_constituents)
+        rows.append({"entity_type": entity_type, **stats})
+    return rows
+
+
+def compute_market_views(batches, constituents=None):
+    """
+    Daily grouping-set rows plus market and grouped period averages for every
+    universe, folded from `batches` (price frames of whole trading days) so
+    only one batch of raw rows is alive at a time.
+    """
+    store = IncrementalDailyMetrics(report_universes(constituents))
+    daily = store.consume(batches)
+
+    market_rows, group_frames = [], []
+    for universe in store.universes:
+        stats = store.period_view(universe)
+        if stats is not None:
+            market_rows.append({"universe": universe, **stats})
+        for group_col in ['sector', 'category']:
+            grouped = store.period_view(universe, group_col=group_col)
+            if not grouped.empty:
+                grouped = grouped.rename(columns={group_col: 'group'})
+                grouped.insert(0, 'grouping', group_col)
+                grouped.insert(0, 'universe', universe)
+                group_frames.append(grouped)
+
+    market = pd.DataFrame(market_rows)
+    groups = pd.concat(group_frames, ignore_index=True) if group_frames else pd.DataFrame()
+    return daily, market, groups
+
+
+def compute_period_comparisons(df, workers=REPORT_WORKERS, constituents=None):
+    """
+    Period Average pillars (see calculate_period_comparison) for every stock,
+    both indices, every sector and every category. Entities are dealt out to
+    `workers` processes in interleaved batches; each worker receives the frame
+    once, builds its own stock panel and reuses it for all its entities.
+    """
+    entities = [(code, "stock") for code in sorted(df['trading_code'].dropna().unique())]
+    entities += [("DSEX", "index"), ("DS30", "index")]
+    entities += [(name, "sector") for name in sorted(df['sector'].dropna().unique())]
+    entities += [(name, "category") for name in sorted(df['category'].dropna().unique())]
+
+    if workers <= 1:
+        _init_worker(df, constituents)
+        rows = _compare_entities(entities)
+    else:
+        batches = [entities[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df, constituents)) as pool:
+            rows = [row for batch in pool.map(_compare_entities, batches) for row in batch]
+
+    return pd.DataFrame(rows)
+
+
+def run_report(df, start_date, end_date, output_dir=REPORT_DIR, workers=REPORT_WORKERS, log=print,
+               constituents=None, batches=None):
+    """
+    Computes every view for the price frame `df` and writes them under
+    report_path(). `constituents` is the index constituent history
+    (data.constituents.fetch_constituent_history; None = the built-in registry).
+    Pass exactly one of `df` and `batches`: `batches` (e.g. stream_market_data())
+    feeds the market and sector views a few trading days at a time, and the
+    per-entity comparisons, which need the whole frame, are skipped.
+    """
+    if (df is None) == (batches is None):
+        raise ValueError("run_report() needs exactly one of df and batches")
+    path = report_path(start_date, end_date, output_dir)
+    os.makedirs(path, exist_ok=True)
+    timings = {}
+    tally = {"rows": 0, "symbols": set()}
+
+    def write(name, frame):
+        frame.to_parquet(os.path.join(path, f"{name}.parquet"), index=False)
+        log(f"{name}: {len(frame):,} rows")
+
+    def counted(frames):
+        for frame in frames:
+            tally["rows"] += len(frame)
+            tally["symbols"].update(frame['trading_code'].dropna().unique())
+            yield frame
+
+    # 1. Daily market/sector/category stats for both universes, and their period averages
+    started = time.perf_counter()
+    daily, market, groups = compute_market_views(counted([df] if batches is None else batches), constituents)
+    write("daily_grouping_sets", daily)
+    write("market_period", market)
+    write("group_period", groups)
+    timings["market_views"] = time.perf_counter() - started
+
+    # 2. Per-entity period comparisons over the process pool
+    if df is not None:
+        started = time.perf_counter()
+        write("period_comparison", compute_period_comparisons(df, workers, constituents))
+        timings["comparisons"] = time.perf_counter() - started
+
+    manifest = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "rows": tally["rows"],
+        "symbols": len(tally["symbols"]),
+        "trading_days": int(daily['date'].nunique()) if not daily.empty else 0,
+        "generated_at": time.time(),
+        "seconds": {step: round(seconds, 3) for step, seconds in timings.items()},
+    }
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    log(f"Report written to {path}")
+    return path
+
+
+def main():
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Precompute the dashboard views for a date range.")
+    parser.add_argument("--start", default=(yesterday - timedelta(days=30)).isoformat())
+    parser.add_argument("--end", default=yesterday.isoformat())
+    parser.add_argument("--output", default=REPORT_DIR)
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--stream", action="store_true",
+                        help="Fold the market and sector views from a streamed read of the database "
+                             "and skip the per-entity comparisons (for ranges too long to hold in memory)")
+    args = parser.parse_args()
+
+    # Same cached, typed price frame and constituent history the app loads
+    from data.base_queries import MARKET_COLUMNS, fetch_market_data, stream_market_data
+    from data.constituents import fetch_constituent_history
+    constituents = fetch_constituent_history()
+    if args.stream:
+        batches = stream_market_data(args.start, args.end, columns=MARKET_COLUMNS)
+        run_report(None, args.start, args.end, args.output, args.workers, constituents=constituents,
+                   batches=batches)
+        return
+
+    df = fetch_market_data(args.start, args.end, columns=MARKET_COLUMNS)
+    if df is None or df.empty:
+        raise SystemExit(f"No price data for {args.start}..{args.end}")
+    run_report(df, args.start, args.end, args.output, args.workers, constituents=constituents)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+-- Server-side daily aggregates for the market and sector tabs.
+--
+-- dsex_daily_group_sums() returns one row per (date, grouping, group) with
+-- the additive sums domains/sector/compute.py derives every daily stat from
+-- (see GROUP_SUM_COLUMNS / grouping_stats_from_sums). A day costs ~25 rows
+-- (market + sectors + categories) instead of ~400 price rows, and only ~1 row
+-- when just the market grouping is requested.
+--
+-- Called through PostgREST as POST /rest/v1/rpc/dsex_daily_group_sums by
+-- domains/sector/queries.py and domains/market/queries.py.
+
+-- The universe used to be a plain list of trading codes
+drop function if exists dsex_daily_group_sums(date, date, text[], text[]);
+
+create or replace function dsex_daily_group_sums(
+    start_date date,
+    end_date date,
+    members text[] default null,      -- trading codes of the universe; null = every stock
+    groupings text[] default null,    -- subset of {market, sector, category}; null = all
+    member_from date[] default null,  -- per member: first day of its spell (null = always)
+    member_to date[] default null     -- per member: day its spell ended, exclusive (null = open)
+)
+returns table (
+    grouping text,
+    date date,
+    sector text,
+    category text,
+    total_value double precision,
+    total_volume double precision,
+    n bigint,
+    ret_sum double precision,
+    ret_sq_sum double precision,
+    advancers bigint,
+    stock_count bigint
+)
+language sql
+stable
+as $$
+    with priced as (
+        -- Same row filter as the Python roll-up: a usable ycp and a last price
+        select p.date,
+               m.sector,
+               m.category,
+               m.trading_code,
+               p.value_mn,
+               p.volume,
+               ((p.ltp - p.ycp) / p.ycp)::double precision as ret
+        from dsex_prices p
+        left join dsex_mapper m on m.id = p.mapper_id
+        where p.date between start_date and end_date
+          and p.ycp > 0
+          and p.ltp is not null
+          -- Date-effective membership: the row's date must fall in one of its symbol's spells
+          and (members is null or exists (
+                select 1
+                from unnest(members, member_from, member_to) as u(code, from_date, to_date)
+                where u.code = m.trading_code
+                  and (u.from_date is null or p.date >= u.from_date)
+                  and (u.to_date is null or p.date < u.to_date)))
+    ),
+    sums as (
+        select case
+                   when grouping(sector) = 0 then 'sector'
+                   when grouping(category) = 0 then 'category'
+                   else 'market'
+               end as grouping,
+               date,
+               sector,
+               category,
+               sum(value_mn)::double precision as total_value,
+               sum(volume)::double precision as total_volume,
+               count(*) as n,
+               sum(ret) as ret_sum,
+               sum(ret * ret) as ret_sq_sum,
+               count(*) filter (where ret > 0) as advancers,
+               count(distinct trading_code) as stock_count
+        from priced
+        group by grouping sets ((date), (date, sector), (date, category))
+    )
+    select *
+    from sums s
+    -- Symbols without a sector/category only count towards the market rows
+    where not (s.grouping = 'sector' and s.sector is null)
+      and not (s.grouping = 'category' and s.category is null)
+      and (groupings is null or s.grouping = any (groupings))
+    order by s.date, s.grouping, s.sector, s.category
+$$;
+
+grant execute on function dsex_daily_group_sums(date, date, text[], text[], date[], date[]) to anon, authenticated;
@@ -0,0 +1,25 @@
+-- Constituent history of the DSE indexes, one row per membership spell.
+--
+-- A symbol belongs to `index_name` from effective_from (inclusive) until
+-- effective_to (exclusive); a null effective_to means it is still a member.
+-- A rebalance closes the leaving symbols' rows and opens rows for the
+-- joiners, so any past date resolves to the constituents of that day.
+--
+-- Read through PostgREST by data/constituents.py and cached locally;
+-- until the table is filled the app falls back to UNIVERSE_REGISTRY in
+-- config/metrics.py.
+
+create table if not exists dsex_index_constituents (
+    id bigint generated always as identity primary key,
+    index_name text not null,
+    trading_code text not null,
+    effective_from date not null,
+    effective_to date,
+    check (effective_to is null or effective_to > effective_from)
+);
+
+create index if not exists dsex_index_constituents_index_name
+    on dsex_index_constituents (index_name, effective_from);
+
+alter table dsex_index_constituents enable row level security;
+create policy "read index constituents" on dsex_index_constituents for select to anon, authenticated using (true);
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+# The repo is run from its root rather than installed, and nothing here may touch the real cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DSEX_CACHE_DIR", tempfile.mkdtemp(prefix="dsex-tests-"))
+
+import pandas as pd
+import pytest
+
+from benchmarks.stub_postgrest import StubPostgrest
+from benchmarks.synthetic import generate_constituent_rows, generate_market_frame, trading_days
+from data.constituents import CONSTITUENT_COLUMNS, _typed_constituents
+
+N_SYMBOLS, N_DAYS = 60, 30
+
+
+@pytest.fixture(scope="session")
+def market_frame():
+    """The typed frame the stub's tables describe (same generator, seed and dates)."""
+    return generate_market_frame(N_SYMBOLS, N_DAYS)
+
+
+@pytest.fixture(scope="session")
+def constituent_history():
+    """DS30 history with a rebalance halfway through the range."""
+    rows = pd.DataFrame(generate_constituent_rows(N_SYMBOLS, N_DAYS))
+    return _typed_constituents(rows[CONSTITUENT_COLUMNS])
+
+
+@pytest.fixture(scope="session")
+def date_range():
+    days = trading_days(N_DAYS)
+    return days[0].isoformat(), days[-1].isoformat()
+
+
+@pytest.fixture(scope="session")
+def stub():
+    with StubPostgrest(N_SYMBOLS, N_DAYS) as server:
+        yield server
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from data.cache import is_fresh, missing_date_ranges, settled_at
+
+DAY = date(2024, 3, 12)
+SETTLED = settled_at(DAY)
+TTL = 3600
+
+
+def test_day_fetched_after_settling_is_fresh_forever():
+    assert is_fresh(DAY, SETTLED + 1, now=SETTLED + 365 * 86400, ttl=TTL)
+
+
+def test_day_fetched_mid_session_is_refetched_once_settled():
+    fetched_at = SETTLED - 600
+    assert is_fresh(DAY, fetched_at, now=SETTLED - 60, ttl=TTL)
+    assert not is_fresh(DAY, fetched_at, now=SETTLED + 1, ttl=TTL)
+
+
+def test_unsettled_day_expires_after_ttl():
+    fetched_at = SETTLED - 3 * TTL
+    assert not is_fresh(DAY, fetched_at, now=fetched_at + TTL + 1, ttl=TTL)
+
+
+def _settled_manifest(days):
+    return {day.isoformat(): settled_at(day) + 60 for day in days}
+
+
+def test_missing_date_ranges_only_returns_gaps():
+    days = [DAY + timedelta(days=i) for i in range(10)]
+    manifest = _settled_manifest(days[:3] + days[5:8])
+    assert missing_date_ranges(days[0], days[-1], manifest) == [
+        (days[3].isoformat(), days[4].isoformat()),
+        (days[8].isoformat(), days[9].isoformat()),
+    ]
+
+
+def test_missing_date_ranges_refetches_stale_days():
+    days = [DAY + timedelta(days=i) for i in range(5)]
+    manifest = _settled_manifest(days)
+    # Fetched during the session, and that session has long since closed
+    manifest[days[2].isoformat()] = settled_at(days[2]) - 600
+    assert missing_date_ranges(days[0], days[-1], manifest) == [(days[2].isoformat(), days[2].isoformat())]
+
+
+def test_fully_cached_range_needs_nothing():
+    days = [DAY + timedelta(days=i) for i in range(5)]
+    assert missing_date_ranges(days[0], days[-1], _settled_manifest(days)) == []
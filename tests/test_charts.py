@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from utils.charts import downsample, line_trace, lttb_indices
+
+
+@pytest.fixture
+def long_series():
+    rng = np.random.default_rng(5)
+    x = pd.Series(pd.bdate_range("2010-01-01", periods=5000))
+    y = pd.Series(np.cumsum(rng.normal(0, 1, 5000)))
+    return x, y
+
+
+@pytest.mark.parametrize("budget", [3, 50, 700])
+def test_lttb_keeps_endpoints_within_budget(budget):
+    x = np.arange(2000, dtype='float64')
+    y = np.sin(x / 40)
+    idx = lttb_indices(x, y, budget)
+    assert len(idx) == budget
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 437 in lttb_indices(np.arange(1000, dtype='float64'), y, 40)
+
+
+def test_downsample_drops_nan_and_respects_budget(long_series):
+    x, y = long_series
+    y = y.copy()
+    y.iloc[::10] = np.nan
+    x_out, y_out = downsample(x, y, budget=300)
+    assert len(x_out) == 300
+    assert y_out.notna().all()
+    assert x_out.iloc[0] == x.iloc[1] and x_out.iloc[-1] == x.iloc[-1]
+
+
+def test_short_series_is_unchanged(long_series):
+    x, y = (s.iloc[:100] for s in long_series)
+    x_out, y_out = downsample(x, y, budget=300)
+    pd.testing.assert_series_equal(y_out, y)
+    assert isinstance(line_trace(x, y, budget=300), go.Scatter)
+    trace = line_trace(*long_series, budget=300)
+    assert isinstance(trace, go.Scattergl) and len(trace.x) == 300
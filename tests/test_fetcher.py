@@ -0,0 +1,50 @@
+import pytest
+
+from data.base_queries import PRICE_SELECT
+from data.fetcher import ChunkedFetcher, split_date_chunks
+
+
+@pytest.fixture
+def recorded_queries(stub, monkeypatch):
+    queries = []
+    query = stub.db.query
+
+    def record(table, params):
+        queries.append((table, params))
+        return query(table, params)
+
+    monkeypatch.setattr(stub.db, "query", record)
+    return queries
+
+
+def test_keyset_paging_returns_every_row_once(stub, date_range, recorded_queries):
+    start_date, end_date = date_range
+    # Pages much smaller than a day's rows, so every chunk needs several of them
+    fetcher = ChunkedFetcher(stub.url, "anon", page_size=7, chunk_days=3, max_workers=4)
+    rows = fetcher.fetch(start_date, end_date, PRICE_SELECT)
+
+    expected = [row for row in stub.db.tables["dsex_prices"] if start_date <= row["date"] <= end_date]
+    assert [row["id"] for row in rows] == [row["id"] for row in expected]
+    assert rows[0]["ltp"] == expected[0]["ltp"]
+
+    pages = [params for table, params in recorded_queries if table == "dsex_prices"]
+    assert len(pages) > len(expected) // 7
+    assert all("offset" not in params for params in pages)
+    # Only each chunk's first page has no key filter; the rest continue after the previous page's last key
+    assert sum("id" not in params for params in pages) == len(split_date_chunks(start_date, end_date, 3))
+    assert all(params["id"].startswith("gt.") for params in pages if "id" in params)
+
+
+def test_iter_chunks_yields_chunks_in_date_order(stub, date_range):
+    start_date, end_date = date_range
+    fetcher = ChunkedFetcher(stub.url, "anon", page_size=50, chunk_days=5, max_workers=3)
+    chunks = list(fetcher.iter_chunks(start_date, end_date, "date,ltp"))
+
+    assert [chunk for chunk, _ in chunks] == sorted(chunk for chunk, _ in chunks)
+    for (chunk_start, chunk_end), rows in chunks:
+        assert all(chunk_start <= row["date"] <= chunk_end for row in rows)
+
+
+def test_fetch_table_pages_by_id(stub):
+    rows = ChunkedFetcher(stub.url, "anon", page_size=8).fetch_table("dsex_mapper", "id,trading_code")
+    assert [row["id"] for row in rows] == [row["id"] for row in stub.db.tables["dsex_mapper"]]
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data.history as history
+from data.history import HistoryStore, sync_history
+
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(history, "CURRENT_PATH", str(tmp_path / "CURRENT"))
+    history._open_stores.clear()
+    yield tmp_path
+    history._open_stores.clear()
+
+
+@pytest.fixture
+def fetch_range(market_frame):
+    prices = market_frame.drop(columns=['trading_code', 'sector', 'category'])
+
+    def fetch(start, end):
+        return prices[prices['date'].between(pd.Timestamp(start), pd.Timestamp(end))].reset_index(drop=True)
+    return fetch
+
+
+def _sync(fetch_range, start, end, **kwargs):
+    return sync_history(fetch_range, start.date().isoformat(), end.date().isoformat(), log=lambda _: None, **kwargs)
+
+
+def _sorted(frame):
+    return frame.sort_values(['date', 'symbol_id']).reset_index(drop=True)
+
+
+def test_read_frame_round_trips_the_rows(history_dir, fetch_range, market_frame):
+    dates = market_frame['date'].sort_values().unique()
+    store = _sync(fetch_range, dates[0], dates[-1])
+    expected = fetch_range(dates[3], dates[20])
+    pd.testing.assert_frame_equal(_sorted(store.read_frame(dates[3], dates[20])), _sorted(expected),
+                                  check_dtype=False)
+
+
+def test_window_is_a_view_of_the_memory_map(history_dir, fetch_range, market_frame):
+    dates = market_frame['date'].sort_values().unique()
+    store = _sync(fetch_range, dates[0], dates[-1])
+    window = store.window(dates[5], dates[9], ['ltp', 'volume'])
+
+    assert list(window.dates) == list(pd.DatetimeIndex(dates[5:10]))
+    assert set(window.grids) == {'ltp', 'volume'}
+    assert isinstance(window.grids['ltp'], np.memmap) and window.grids['ltp'].base is not None
+    assert window.has_row.shape == window.grids['ltp'].shape == (5, len(window.symbol_ids))
+    # A symbol subset gathers just those columns
+    subset = store.window(dates[5], dates[9], ['ltp'], window.symbol_ids[[4, 1]])
+    np.testing.assert_array_equal(subset.symbol_ids, window.symbol_ids[[1, 4]])
+    np.testing.assert_array_equal(subset.grids['ltp'], window.grids['ltp'][:, [1, 4]])
+
+
+def test_window_key_names_the_generation_and_slice(history_dir, fetch_range, market_frame):
+    dates = market_frame['date'].sort_values().unique()
+    store = _sync(fetch_range, dates[0], dates[15])
+    key = store.window(dates[2], dates[9], ['ltp']).memo_key
+    assert store.window(dates[2], dates[9], ['ltp']).memo_key == key
+    assert store.window(dates[2], dates[10], ['ltp']).memo_key != key
+    assert store.window(dates[2], dates[9], ['ycp']).memo_key != key
+    resynced = sync_history(fetch_range, end_date=dates[-1].date().isoformat(), log=lambda _: None)
+    assert resynced.window(dates[2], dates[9], ['ltp']).memo_key != key
+
+
+def test_incremental_sync_keeps_older_rows(history_dir, fetch_range, market_frame):
+    dates = market_frame['date'].sort_values().unique()
+    first = _sync(fetch_range, dates[0], dates[15])
+    second = sync_history(fetch_range, end_date=dates[-1].date().isoformat(), resync_days=3, log=lambda _: None)
+
+    assert second.generation != first.generation
+    assert len(second.dates) == len(dates)
+    pd.testing.assert_frame_equal(_sorted(second.read_frame(dates[0], dates[-1])),
+                                  _sorted(fetch_range(dates[0], dates[-1])), check_dtype=False)
+
+
+def test_rejects_an_end_before_the_store(history_dir, fetch_range, market_frame):
+    dates = market_frame['date'].sort_values().unique()
+    store = _sync(fetch_range, dates[0], dates[-1])
+    with pytest.raises(ValueError):
+        _sync(fetch_range, dates[5], dates[10])
+    assert HistoryStore.open().generation == store.generation
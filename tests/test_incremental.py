@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.constituents import index_constituents
+from domains.sector.compute import compute_daily_grouping_sets
+from domains.sector.incremental import IncrementalDailyMetrics
+
+
+@pytest.fixture
+def universes(constituent_history):
+    return {"DSEX": None, "DS30": index_constituents(constituent_history, "DS30")}
+
+
+def _assert_matches_fresh(store, df, universes):
+    fresh = IncrementalDailyMetrics(universes)
+    fresh.sync(df)
+    pd.testing.assert_frame_equal(store.daily, fresh.daily)
+    for universe in universes:
+        assert store.period_view(universe) == pytest.approx(fresh.period_view(universe), nan_ok=True)
+        pd.testing.assert_frame_equal(store.period_view(universe, 'sector'), fresh.period_view(universe, 'sector'))
+
+
+def test_sync_matches_a_full_recompute(market_frame, universes):
+    store = IncrementalDailyMetrics(universes)
+    daily = store.sync(market_frame)
+    expected = compute_daily_grouping_sets.uncached(market_frame, universes) \
+        .sort_values(['universe', 'grouping', 'date'], kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(daily[expected.columns], expected, check_dtype=False)
+
+
+def test_rolling_window_only_folds_new_dates(market_frame, universes):
+    dates = sorted(market_frame['date'].unique())
+    store = IncrementalDailyMetrics(universes)
+    store.sync(market_frame[market_frame['date'] < dates[20]])
+    window = market_frame[market_frame['date'] >= dates[5]]
+    store.sync(window)
+    _assert_matches_fresh(store, window, universes)
+
+
+def test_refolds_dates_whose_rows_changed(market_frame, universes):
+    store = IncrementalDailyMetrics(universes)
+    store.sync(market_frame)
+
+    # A settled day re-fetched with corrected prices, in the middle of the window
+    day = sorted(market_frame['date'].unique())[10]
+    changed = market_frame.copy()
+    rows = changed['date'] == day
+    changed.loc[rows, 'ltp'] = changed.loc[rows, 'ltp'] * np.float32(1.05)
+    changed.loc[rows, 'value_mn'] = changed.loc[rows, 'value_mn'] * 2
+    before = store.period_view("DSEX")
+
+    store.sync(changed)
+    assert store.period_view("DSEX") != pytest.approx(before)
+    _assert_matches_fresh(store, changed, universes)
+
+
+def test_unchanged_window_folds_nothing(market_frame, universes, monkeypatch):
+    store = IncrementalDailyMetrics(universes)
+    store.sync(market_frame)
+    monkeypatch.setattr(store, "append", lambda df: pytest.fail("nothing changed"))
+    store.sync(market_frame.sample(frac=1, random_state=0))
+
+
+def test_sync_daily_refolds_changed_dates(market_frame, universes):
+    daily = compute_daily_grouping_sets.uncached(market_frame, universes)
+    store = IncrementalDailyMetrics(universes)
+    store.sync_daily(daily)
+
+    day = daily['date'].iloc[len(daily) // 2]
+    changed = daily.copy()
+    changed.loc[changed['date'] == day, 'total_value'] += 100.0
+    store.sync_daily(changed)
+
+    fresh = IncrementalDailyMetrics(universes)
+    fresh.sync_daily(changed)
+    pd.testing.assert_frame_equal(store.daily, fresh.daily)
+    assert store.period_view("DSEX") == pytest.approx(fresh.period_view("DSEX"))
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from domains.index.compute import INDEX_BASE, reconstruct_index
+from domains.market.compute import compute_daily_market_metrics
+
+
+def _priced(df):
+    priced = df[(df['ycp'] > 0) & df['ltp'].notna()].copy()
+    ycp = priced['ycp'].astype('float64')
+    priced['ret'] = (priced['ltp'].astype('float64') - ycp) / ycp
+    priced['code'] = priced['trading_code'].astype(str)
+    return priced
+
+
+def _is_member(history, code, day):
+    spells = history[history['trading_code'] == code]
+    return bool(((spells['effective_from'] <= day)
+                 & (spells['effective_to'].isna() | (day < spells['effective_to']))).any())
+
+
+def _naive_index(df, history, weighting="equal", weight_window=20):
+    """Day-by-day loop over the priced members of each date."""
+    priced = _priced(df)
+    value = df.pivot_table(index='date', columns='trading_code', values='value_mn', observed=True)
+    dates = sorted(df['date'].unique())
+    returns, counts = [], []
+    for i, day in enumerate(dates):
+        day_rows = priced[priced['date'] == day]
+        members = day_rows[[_is_member(history, code, day) for code in day_rows['code']]]
+        if weighting == "equal":
+            weights = np.ones(len(members))
+        else:
+            trailing = value.iloc[max(0, i - weight_window):i].mean()
+            weights = trailing.reindex(members['code']).fillna(0).to_numpy()
+        returns.append((weights * members['ret']).sum() / weights.sum() if weights.sum() > 0 else 0.0)
+        counts.append(len(members))
+    returns[0] = 0.0
+    return INDEX_BASE * np.cumprod(1 + np.array(returns)), np.array(returns) * 100, counts
+
+
+@pytest.mark.parametrize("weighting", ["equal", "value"])
+def test_matches_naive_loop(market_frame, constituent_history, weighting):
+    levels = reconstruct_index.uncached(market_frame, constituent_history, "DS30", weighting, weight_window=5)
+    level, index_return, counts = _naive_index(market_frame, constituent_history, weighting, weight_window=5)
+
+    # The panel holds prices as float32, the loop works in float64
+    np.testing.assert_allclose(levels['level'], level, rtol=1e-7)
+    np.testing.assert_allclose(levels['index_return'], index_return, rtol=1e-5, atol=1e-6)
+    assert levels['constituents'].tolist() == counts
+
+
+def test_rebalance_only_changes_later_returns(market_frame, constituent_history):
+    history = reconstruct_index.uncached(market_frame, constituent_history, "DS30")
+    registry = reconstruct_index.uncached(market_frame, None, "DS30")
+    before = (history['date'] < constituent_history['effective_to'].dropna().min()).to_numpy()
+
+    np.testing.assert_array_equal(history['index_return'][before], registry['index_return'][before])
+    assert not np.allclose(history['index_return'][~before], registry['index_return'][~before])
+
+
+def test_broad_index_follows_market_return(market_frame, constituent_history):
+    levels = reconstruct_index.uncached(market_frame, constituent_history, "DSEX")
+    market = compute_daily_market_metrics.uncached(market_frame)
+    np.testing.assert_allclose(levels['index_return'].iloc[1:], market['market_return'].iloc[1:], rtol=1e-4, atol=1e-6)
+
+
+def test_rejects_unknown_weighting(market_frame):
+    with pytest.raises(ValueError):
+        reconstruct_index.uncached(market_frame, None, "DS30", "cap")
+
+
+def test_empty_frame_gives_empty_index(market_frame):
+    assert reconstruct_index.uncached(market_frame.iloc[:0], None).empty
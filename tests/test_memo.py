@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_market_frame
+from data.cache import MemoCache, frame_fingerprint, memoize
+
+
+@pytest.fixture(scope="module")
+def large_frame():
+    """Big enough that a strided row sample would skip most rows."""
+    return generate_market_frame(200, 60)
+
+
+@pytest.mark.parametrize("column", ['ycp', 'volume', 'trade', 'ltp'])
+def test_fingerprint_sees_every_numeric_column(large_frame, column):
+    changed = large_frame.copy()
+    changed.loc[changed.index[1], column] += 1
+    assert frame_fingerprint(changed) != frame_fingerprint(large_frame)
+
+
+@pytest.mark.parametrize("column", ['sector', 'category'])
+def test_fingerprint_sees_label_changes(large_frame, column):
+    changed = large_frame.copy()
+    labels = changed[column].cat.categories
+    row = changed.index[1]
+    changed.loc[row, column] = labels[(list(labels).index(changed.loc[row, column]) + 1) % len(labels)]
+    assert frame_fingerprint(changed) != frame_fingerprint(large_frame)
+
+
+def test_fingerprint_is_stable_across_copies(market_frame):
+    assert frame_fingerprint(market_frame.copy()) == frame_fingerprint(market_frame)
+    assert frame_fingerprint(market_frame.iloc[::3]) == frame_fingerprint(market_frame.iloc[::3].copy())
+
+
+def test_memoize_recomputes_when_the_frame_changes(market_frame):
+    calls = []
+
+    @memoize(cache=MemoCache())
+    def total_ycp(df, scale=1):
+        calls.append(scale)
+        return float(df['ycp'].sum()) * scale
+
+    first = total_ycp(market_frame)
+    assert total_ycp(market_frame.copy()) == first
+    changed = market_frame.copy()
+    changed.loc[changed.index[-2], 'ycp'] += 10
+    assert total_ycp(changed) == pytest.approx(first + 10)
+    total_ycp(market_frame, scale=2)
+    assert calls == [1, 1, 2]
+
+
+def test_memo_cache_evicts_least_recent_entries_by_bytes():
+    cache = MemoCache(max_bytes=3 * 8000)
+    for i in range(4):
+        cache.put(("fn", i), np.zeros(1000))
+    assert cache.get("fn", ("fn", 0)) == (False, None)
+    assert cache.get("fn", ("fn", 3))[0]
+    assert cache.summary()["functions"]["fn"]["evictions"] == 1
+    # A result larger than the whole budget is never stored
+    cache.put(("fn", "big"), pd.DataFrame({"x": np.zeros(10_000)}))
+    assert not cache.get("fn", ("fn", "big"))[0]
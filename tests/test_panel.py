@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data.history as history
+from data.base_queries import MARKET_COLUMNS, _fetch_market_data_remote, fetch_market_data, fetch_market_window
+from data.cache import memo_stats
+from data.fetcher import ChunkedFetcher
+from domains.stock.panel import PANEL_FIELDS, StockPanel, as_stock_panel, build_window_panel
+
+
+def test_duplicate_rows_keep_the_last(market_frame):
+    repeated = market_frame.iloc[[5]].copy()
+    repeated['ltp'] = repeated['ltp'] + 1
+    panel = StockPanel(pd.concat([market_frame, repeated], ignore_index=True))
+    clean = StockPanel(market_frame)
+
+    row = repeated.iloc[0]
+    d = panel.dates.get_loc(row['date'])
+    s = panel.symbols.get_loc(str(row['trading_code']))
+    assert panel.fields['ltp'][d, s] == np.float32(row['ltp'])
+    assert int(panel.has_row.sum()) == int(clean.has_row.sum())
+
+
+def test_group_grids_are_memoized_per_panel(market_frame):
+    panel = StockPanel(market_frame)
+    first = panel.group_daily("Bank", "sector")
+    assert panel.group_daily("Bank", "sector") is first
+    assert panel.peer_returns("sector") is panel.peer_returns("sector")
+    # The grids live in the byte-bounded memo cache, not on the panel
+    assert memo_stats()["functions"]["domains.stock.panel._group_daily"]["hits"] >= 1
+    assert StockPanel(market_frame).group_daily("Bank", "sector") is not first
+
+
+@pytest.fixture
+def dimension(market_frame):
+    return (market_frame[['symbol_id', 'trading_code', 'category', 'sector']]
+            .drop_duplicates('symbol_id').rename(columns={'symbol_id': 'id'})
+            .astype({'trading_code': str, 'category': str, 'sector': str}))
+
+
+@pytest.fixture
+def window_store(tmp_path, monkeypatch, market_frame):
+    monkeypatch.setattr(history, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(history, "CURRENT_PATH", str(tmp_path / "CURRENT"))
+    history._open_stores.clear()
+    prices = market_frame.drop(columns=['trading_code', 'sector', 'category'])
+    yield history.sync_history(
+        lambda start, end: prices[prices['date'].between(pd.Timestamp(start), pd.Timestamp(end))],
+        market_frame['date'].min().date().isoformat(), market_frame['date'].max().date().isoformat(),
+        log=lambda _: None)
+    history._open_stores.clear()
+
+
+def _assert_same_panel(panel, expected):
+    pd.testing.assert_index_equal(panel.dates, expected.dates)
+    pd.testing.assert_index_equal(panel.symbols, expected.symbols)
+    pd.testing.assert_index_equal(panel.sector, expected.sector)
+    pd.testing.assert_index_equal(panel.category, expected.category)
+    np.testing.assert_array_equal(panel.has_row, expected.has_row)
+    for col in PANEL_FIELDS:
+        np.testing.assert_array_equal(panel.fields[col], expected.fields[col], err_msg=col)
+    np.testing.assert_array_equal(panel.ret, expected.ret)
+    np.testing.assert_array_equal(panel.market_value, expected.market_value)
+
+
+def test_window_panel_matches_the_frame_panel(window_store, market_frame, dimension):
+    dates = market_frame['date'].sort_values().unique()
+    columns = [c for c in MARKET_COLUMNS if c not in ('date', 'symbol_id')]
+    market = market_frame[MARKET_COLUMNS + ['trading_code', 'sector', 'category']]
+    # Settled history up to dates[20], then a tail frame like the Parquet cache serves
+    window = window_store.window(dates[0], dates[20], columns)
+    tail = market[market['date'] > dates[20]]
+    _assert_same_panel(StockPanel.from_window((window,), tail, dimension), StockPanel(market))
+
+
+def test_window_panel_adds_the_targets_ohlc(window_store, market_frame, dimension):
+    dates = market_frame['date'].sort_values().unique()
+    target = sorted(market_frame['trading_code'].astype(str).unique())[3]
+    target_id = int(dimension.loc[dimension['trading_code'] == target, 'id'].iloc[0])
+    market_columns = [c for c in MARKET_COLUMNS if c not in ('date', 'symbol_id')]
+    windows = (window_store.window(dates[0], dates[-1], market_columns),
+               window_store.window(dates[0], dates[-1], ['openp', 'high', 'low', 'closep'], [target_id]))
+    panel = StockPanel.from_window(windows, market_frame.iloc[:0], dimension)
+
+    expected = market_frame.copy()
+    expected.loc[expected['trading_code'] != target, ['openp', 'high', 'low', 'closep']] = np.nan
+    _assert_same_panel(panel, StockPanel(expected))
+
+
+def test_window_panel_is_memoized_per_window(window_store, market_frame, dimension):
+    dates = market_frame['date'].sort_values().unique()
+    window = window_store.window(dates[0], dates[-1], ['ltp', 'ycp', 'value_mn'])
+    tail = market_frame.iloc[:0]
+    panel = build_window_panel((window,), tail, dimension)
+    assert build_window_panel((window_store.window(dates[0], dates[-1], ['ltp', 'ycp', 'value_mn']),),
+                              tail, dimension) is panel
+    assert as_stock_panel(panel) is panel
+    assert not panel.empty and build_window_panel((), tail, dimension).empty
+
+
+def test_fetch_market_window_splits_at_the_store(stub, date_range, tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(history, "CURRENT_PATH", str(tmp_path / "CURRENT"))
+    history._open_stores.clear()
+    fetcher = ChunkedFetcher(stub.url, "anon")
+    start_date, end_date = date_range
+    days = pd.bdate_range(start_date, end_date, freq='C', weekmask='Sun Mon Tue Wed Thu')
+    history.sync_history(lambda start, end: _fetch_market_data_remote(start, end, fetcher),
+                         start_date, days[20].date().isoformat(), log=lambda _: None)
+
+    window, tail, dimension = fetch_market_window(start_date, end_date, MARKET_COLUMNS, fetcher=fetcher)
+    assert window.dates[-1] == days[20]
+    assert tail['date'].min() == days[21]
+    panel = build_window_panel((window,), tail, dimension)
+    _assert_same_panel(panel, StockPanel(fetch_market_data(start_date, end_date, MARKET_COLUMNS, fetcher=fetcher)))
+    history._open_stores.clear()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import gmean
+
+from utils.math import period_stats
+
+
+def _reference(returns):
+    """The per-group pandas/scipy path period_stats() replaced."""
+    growth = 1 + returns / 100
+    return {
+        "days": len(returns),
+        "mean": returns.mean(),
+        "std": returns.std(),
+        "geo_mean": (gmean(growth) - 1) * 100 if (growth > 0).all() else np.nan,
+        "pos_pct": (returns > 0).mean() * 100,
+    }
+
+
+@pytest.fixture
+def grouped_returns():
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({"code": rng.integers(0, 6, 400), "ret": rng.normal(0.1, 2.5, 400)})
+    frame.loc[rng.choice(400, 30, replace=False), 'ret'] = np.nan
+    # One group with a wiped-out day, one with a single day
+    frame.loc[frame.index[frame['code'] == 4][0], 'ret'] = -100.0
+    frame.loc[frame['code'] == 5, 'ret'] = np.nan
+    frame.loc[frame.index[frame['code'] == 5][0], 'ret'] = 1.5
+    return frame
+
+
+def test_matches_the_per_group_reference(grouped_returns):
+    stats = period_stats(grouped_returns['ret'], grouped_returns['code'], n_groups=6)
+    for code, group in grouped_returns.dropna(subset=['ret']).groupby('code'):
+        expected = _reference(group['ret'])
+        for name, value in expected.items():
+            assert stats[name][code] == pytest.approx(value, rel=1e-9, nan_ok=True), (code, name)
+
+
+def test_single_day_group_has_no_volatility(grouped_returns):
+    stats = period_stats(grouped_returns['ret'], grouped_returns['code'], n_groups=6)
+    assert stats['days'][5] == 1
+    assert np.isnan(stats['std'][5])
+
+
+def test_non_positive_policies(grouped_returns):
+    ret, codes = grouped_returns['ret'], grouped_returns['code']
+    kept = grouped_returns[(codes == 4) & (ret > -100)]['ret']
+
+    assert np.isnan(period_stats(ret, codes, 6, non_positive='nan')['geo_mean'][4])
+    assert period_stats(ret, codes, 6, non_positive='zero')['geo_mean'][4] == 0.0
+    assert period_stats(ret, codes, 6, non_positive='skip')['geo_mean'][4] == pytest.approx(
+        (gmean(1 + kept / 100) - 1) * 100, rel=1e-9)
+    with pytest.raises(ValueError):
+        period_stats(ret, codes, 6, non_positive='drop')
+
+
+def test_extra_columns_and_ignored_codes():
+    ret = np.array([1.0, 2.0, np.nan, 4.0])
+    value = np.array([10.0, np.nan, 30.0, 40.0])
+    stats = period_stats(ret, np.array([0, 0, 0, -1]), n_groups=1, extra={"value": value})
+    assert stats['days'][0] == 2
+    assert stats['mean'][0] == pytest.approx(1.5)
+    assert stats['value'][0] == pytest.approx(20.0)
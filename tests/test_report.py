@@ -0,0 +1,51 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from reports.batch import read_report, run_report
+
+VIEWS = ["daily_grouping_sets", "market_period", "group_period"]
+
+
+def _batches(df, days=7):
+    dates = sorted(df['date'].unique())
+    for i in range(0, len(dates), days):
+        yield df[df['date'].isin(dates[i:i + days])]
+
+
+def test_writes_every_view_and_manifest(market_frame, constituent_history, date_range, tmp_path):
+    start_date, end_date = date_range
+    path = run_report(market_frame, start_date, end_date, tmp_path, workers=1, log=lambda _: None,
+                      constituents=constituent_history)
+
+    for name in VIEWS + ["period_comparison"]:
+        assert not read_report(start_date, end_date, name, tmp_path).empty, name
+    comparison = read_report(start_date, end_date, "period_comparison", tmp_path)
+    assert {"DSEX", "DS30"} <= set(comparison['Entity'])
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    assert manifest["rows"] == len(market_frame)
+    assert manifest["trading_days"] == market_frame['date'].nunique()
+
+
+def test_batches_give_the_same_views(market_frame, constituent_history, date_range, tmp_path):
+    start_date, end_date = date_range
+    whole, streamed = tmp_path / "whole", tmp_path / "streamed"
+    run_report(market_frame, start_date, end_date, whole, workers=1, log=lambda _: None,
+               constituents=constituent_history)
+    run_report(None, start_date, end_date, streamed, workers=1, log=lambda _: None,
+               constituents=constituent_history, batches=_batches(market_frame))
+
+    for name in VIEWS:
+        pd.testing.assert_frame_equal(read_report(start_date, end_date, name, streamed),
+                                      read_report(start_date, end_date, name, whole))
+    assert read_report(start_date, end_date, "period_comparison", streamed) is None
+
+
+@pytest.mark.parametrize("with_df, with_batches", [(False, False), (True, True)])
+def test_needs_exactly_one_source(market_frame, date_range, tmp_path, with_df, with_batches):
+    with pytest.raises(ValueError):
+        run_report(market_frame if with_df else None, *date_range, tmp_path, workers=1,
+                   batches=_batches(market_frame) if with_batches else None)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from domains.stock.compute import ROLLING_COLUMNS, calculate_rolling_analytics
+
+WINDOW, MIN_PERIODS = 10, 8
+
+
+@pytest.fixture(scope="module")
+def returns(market_frame):
+    """Decimal daily returns as a (date x symbol) frame, NaN where a row isn't valid."""
+    df = market_frame.assign(code=market_frame['trading_code'].astype(str))
+    ltp, ycp = df['ltp'].astype('float64'), df['ycp'].astype('float64')
+    df['ret'] = ((ltp - ycp) / ycp).where((ycp > 0) & ltp.notna())
+    return df.pivot(index='date', columns='code', values='ret')
+
+
+@pytest.fixture(scope="module")
+def rolling(market_frame):
+    out = calculate_rolling_analytics.uncached(market_frame, WINDOW, MIN_PERIODS)
+    return out.set_index(['date', 'trading_code'])
+
+
+def _roll(series):
+    return series.rolling(WINDOW, min_periods=MIN_PERIODS)
+
+
+def _pair_stats(x, y):
+    """Rolling beta and correlation on the days both series have a return."""
+    y = y.where(x.notna())
+    return _roll(x).cov(y) / _roll(y).var(), _roll(x).corr(y)
+
+
+def _check(rolling, code, column, expected):
+    got = rolling.xs(code, level='trading_code')[column]
+    expected = expected.reindex(got.index)
+    assert expected.notna().sum() > len(expected) // 2
+    np.testing.assert_allclose(got.to_numpy(dtype='float64'), expected.to_numpy(), rtol=1e-7, atol=1e-9,
+                               err_msg=f"{code} {column}")
+
+
+def test_return_and_volatility_match_pandas_rolling(rolling, returns):
+    for code in returns.columns[::9]:
+        ret = returns[code]
+        _check(rolling, code, 'Rolling Return', np.expm1(_roll(np.log1p(ret)).sum()) * 100)
+        _check(rolling, code, 'Rolling Volatility', _roll(ret * 100).std())
+
+
+def test_beta_and_correlation_match_pandas_rolling(rolling, returns, market_frame):
+    symbols = market_frame.drop_duplicates('trading_code')
+    sectors = pd.Series(symbols['sector'].astype(str).to_numpy(), index=symbols['trading_code'].astype(str))
+    market = returns.mean(axis=1)
+    for code in returns.columns[::9]:
+        peers = returns.loc[:, sectors.reindex(returns.columns) == sectors[code]].mean(axis=1)
+        for bench, bench_ret in [('DSEX', market), ('Sector', peers)]:
+            beta, corr = _pair_stats(returns[code], bench_ret)
+            _check(rolling, code, f'Beta vs {bench}', beta)
+            _check(rolling, code, f'Correlation vs {bench}', corr)
+
+
+def test_one_row_per_traded_stock_day(rolling, market_frame):
+    assert list(rolling.reset_index().columns) == ROLLING_COLUMNS
+    assert len(rolling) == len(market_frame)
+    # The first window - 1 rows can't have enough days yet
+    first_dates = sorted(market_frame['date'].unique())[:MIN_PERIODS - 1]
+    assert rolling.loc[rolling.index.get_level_values('date').isin(first_dates), 'Rolling Return'].isna().all()
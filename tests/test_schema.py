@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from config.metrics import INTEGER_FILL_VALUE, MARKET_FRAME_SCHEMA, PRICE_COLUMN_DTYPES
+from data.schema import enforce_schema
+
+
+def _raw_rows():
+    """Price rows as PostgREST returns them: strings, None and float64 everywhere."""
+    return pd.DataFrame({
+        'date': ['2024-03-10', '2024-03-10', 'not a date', '2024-03-11'],
+        'symbol_id': [1.0, 2.0, 3.0, None],
+        'ltp': ['10.5', 'n/a', '7', None],
+        'ycp': [10.0, 11.0, 7.0, 8.0],
+        'volume': [100.0, None, 5.0, 7.0],
+        'trading_code': ['GP', 'BATBC', 'GP', 'ROBI'],
+        'note': ['x', 'y', 'z', 'w'],
+    })
+
+
+def test_coerces_to_the_canonical_dtypes():
+    df, _ = enforce_schema(_raw_rows())
+    for col in ['date', 'symbol_id', 'ltp', 'ycp', 'volume', 'trading_code']:
+        assert str(df[col].dtype) == MARKET_FRAME_SCHEMA[col], col
+    # Columns outside the schema are kept untouched
+    assert df['note'].tolist() == ['x', 'y', 'w']
+
+
+def test_reports_every_fix():
+    df, report = enforce_schema(_raw_rows())
+    assert report['rows_in'] == 4 and report['rows_out'] == 3
+    assert report['dropped_bad_date'] == 1
+    # Only the unparseable 'n/a' counts for a float column; missing ints are filled
+    assert report['coerced_nulls'] == {'ltp': 1, 'symbol_id': 1, 'volume': 1}
+    assert 'openp' in report['missing_columns'] and report['extra_columns'] == ['note']
+    assert df['volume'].tolist() == [100, INTEGER_FILL_VALUE, 7]
+    assert np.isnan(df['ltp'].iloc[1])
+
+
+def test_timestamps_keep_only_their_calendar_day():
+    raw = pd.DataFrame({'date': ['2024-03-10T10:30:00+06:00', '2024-03-11T14:00:00+06:00']})
+    df, _ = enforce_schema(raw)
+    assert df['date'].tolist() == [pd.Timestamp('2024-03-10'), pd.Timestamp('2024-03-11')]
+
+
+def test_typed_frame_is_compact_and_a_no_op(market_frame):
+    df, report = enforce_schema(market_frame)
+    pd.testing.assert_frame_equal(df, market_frame)
+    assert report['coerced_nulls'] == {} and report['dropped_bad_date'] == 0
+
+    wide = market_frame.astype({col: 'float64' for col in PRICE_COLUMN_DTYPES if col != 'date'})
+    wide = wide.astype({col: object for col in ['trading_code', 'sector', 'category']})
+    assert enforce_schema(wide)[1]['memory_mb_after'] < enforce_schema(wide)[1]['memory_mb_before'] / 2
@@ -0,0 +1,47 @@
+import pytest
+
+from domains.stock.compute import calculate_period_comparison
+from domains.stock.screener import SCREENER_COLUMNS, screen_stocks
+
+STATS = ['Avg Return', 'Volatility', 'Pos. Days', 'ADTV']
+
+
+@pytest.fixture(scope="module")
+def table(market_frame, constituent_history):
+    return screen_stocks.uncached(market_frame, constituents=constituent_history)
+
+
+def _comparison(df, name, entity_type, constituents):
+    return calculate_period_comparison.uncached(df, name, entity_type, constituents)
+
+
+def test_matches_the_per_entity_comparison(table, market_frame, constituent_history):
+    for _, row in table.iloc[::7].iterrows():
+        stock = _comparison(market_frame, row['Symbol'], "stock", constituent_history)
+        for stat in STATS:
+            assert row[stat] == pytest.approx(stock[stat], rel=1e-6), (row['Symbol'], stat)
+        assert row['Total Volume'] == stock['Total Volume']
+
+        benchmarks = {
+            'Excess vs DSEX': ("DSEX", "index"),
+            'Excess vs DS30': ("DS30", "index"),
+            'Excess vs Sector': (row['Sector'], "sector"),
+            'Excess vs Category': (row['Category'], "category"),
+        }
+        for column, (name, entity_type) in benchmarks.items():
+            bench = _comparison(market_frame, name, entity_type, constituent_history)
+            assert row[column] == pytest.approx(row['Avg Return'] - bench['Avg Return'], rel=1e-6, abs=1e-9), \
+                (row['Symbol'], column)
+
+
+def test_ranks_every_traded_symbol(table, market_frame):
+    assert list(table.columns) == SCREENER_COLUMNS
+    assert set(table['Symbol']) == set(market_frame['trading_code'].astype(str))
+    assert table['Rank'].tolist() == list(range(1, len(table) + 1))
+    assert table['Avg Return'].is_monotonic_decreasing
+
+
+def test_sort_order_and_empty_frame(market_frame):
+    ascending = screen_stocks.uncached(market_frame, sort_by='Volatility', ascending=True)
+    assert ascending['Volatility'].dropna().is_monotonic_increasing
+    assert screen_stocks.uncached(market_frame.iloc[:0]).empty
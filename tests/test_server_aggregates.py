@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from config.metrics import DS30_SYMBOLS
+from data.constituents import index_constituents
+from data.fetcher import ChunkedFetcher
+from domains.sector.compute import compute_daily_grouping_sets
+from domains.sector.queries import fetch_daily_grouping_sets
+from tests.conftest import N_DAYS
+
+
+def _assert_same_cube(server, local):
+    pd.testing.assert_frame_equal(server, local, check_dtype=False, check_categorical=False, rtol=1e-4, atol=1e-5)
+
+
+def test_server_cube_matches_local_cube(stub, market_frame, date_range):
+    universes = {"DSEX": None, "DS30": DS30_SYMBOLS}
+    server = fetch_daily_grouping_sets(*date_range, universes, fetcher=ChunkedFetcher(stub.url, "anon"))
+    _assert_same_cube(server, compute_daily_grouping_sets.uncached(market_frame, universes))
+
+
+def test_server_cube_applies_date_effective_membership(stub, market_frame, date_range, constituent_history):
+    universes = {"DSEX": None, "DS30": index_constituents(constituent_history, "DS30")}
+    server = fetch_daily_grouping_sets(*date_range, universes, fetcher=ChunkedFetcher(stub.url, "anon"))
+    local = compute_daily_grouping_sets.uncached(market_frame, universes)
+    _assert_same_cube(server, local)
+
+    # The rebalance really changes the DS30 rows, so the check above is not vacuous
+    static = compute_daily_grouping_sets.uncached(market_frame, {"DS30": DS30_SYMBOLS})
+    spells = local[(local['universe'] == "DS30") & (local['grouping'] == 'market')]['total_value'].to_numpy()
+    listed = static[static['grouping'] == 'market']['total_value'].to_numpy()
+    assert not np.allclose(spells, listed)
+
+
+def test_server_groupings_subset(stub, date_range):
+    server = fetch_daily_grouping_sets(*date_range, groupings=['market'], fetcher=ChunkedFetcher(stub.url, "anon"))
+    assert set(server['grouping']) == {'market'}
+    assert server['date'].nunique() == N_DAYS
+
+
+def test_unreachable_server_falls_back_to_none(date_range):
+    fetcher = ChunkedFetcher("http://127.0.0.1:9", "anon", max_retries=1)
+    assert fetch_daily_grouping_sets(*date_range, fetcher=fetcher) is None
+
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.constituents import index_constituents
+from domains.structure.compute import cluster_correlation_matrix, compute_return_correlation
+
+MIN_OVERLAP = 15
+
+
+@pytest.fixture(scope="module")
+def returns(market_frame):
+    """Decimal daily returns as a (date x symbol) frame, NaN where a row isn't valid."""
+    df = market_frame.assign(code=market_frame['trading_code'].astype(str))
+    ltp, ycp = df['ltp'].astype('float64'), df['ycp'].astype('float64')
+    df['ret'] = ((ltp - ycp) / ycp).where((ycp > 0) & ltp.notna())
+    return df.pivot(index='date', columns='code', values='ret')
+
+
+def _reference(returns):
+    """pandas' pairwise-complete Pearson matrix over the stocks with enough days."""
+    kept = returns.loc[:, returns.notna().sum() >= MIN_OVERLAP]
+    return kept.corr(min_periods=MIN_OVERLAP)
+
+
+def _assert_same_matrix(corr, expected):
+    assert list(corr.index) == list(expected.index) == list(corr.columns)
+    np.testing.assert_allclose(corr.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_matches_pandas_pairwise_corr(market_frame, returns):
+    corr = compute_return_correlation.uncached(market_frame, min_overlap=MIN_OVERLAP)
+    _assert_same_matrix(corr, _reference(returns))
+
+
+def test_universe_counts_only_member_days(market_frame, returns, constituent_history):
+    spells = index_constituents(constituent_history, "DS30")
+    member = pd.DataFrame(False, index=returns.index, columns=returns.columns)
+    for _, spell in spells.iterrows():
+        if spell['trading_code'] in member.columns:
+            days = (returns.index >= spell['effective_from'])
+            if pd.notna(spell['effective_to']):
+                days &= returns.index < spell['effective_to']
+            member.loc[days, spell['trading_code']] = True
+
+    corr = compute_return_correlation.uncached(market_frame, spells, min_overlap=MIN_OVERLAP)
+    _assert_same_matrix(corr, _reference(returns.where(member)))
+    assert len(corr) < returns.shape[1]
+
+
+def test_clusters_reorder_the_matrix(market_frame):
+    corr = compute_return_correlation.uncached(market_frame, min_overlap=MIN_OVERLAP)
+    ordered, clusters = cluster_correlation_matrix.uncached(corr, n_clusters=5)
+
+    assert sorted(ordered.index) == sorted(corr.index)
+    assert list(ordered.index) == list(ordered.columns) == list(clusters['trading_code'])
+    pd.testing.assert_frame_equal(ordered, corr.loc[ordered.index, ordered.index])
+    assert 1 < clusters['cluster'].nunique() <= 5
+    # Leaves of one cluster are contiguous in the dendrogram order
+    runs = (clusters['cluster'] != clusters['cluster'].shift()).sum()
+    assert runs == clusters['cluster'].nunique()
+
+
+def test_single_stock_is_one_cluster():
+    corr = pd.DataFrame([[1.0]], index=['GP'], columns=['GP'])
+    ordered, clusters = cluster_correlation_matrix.uncached(corr)
+    assert ordered is corr and clusters['cluster'].tolist() == [1]
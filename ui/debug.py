@@ -0,0 +1,58 @@
+# ui/debug.py
+
+import json
+
+import pandas as pd
+import streamlit as st
+
+from config.settings import TRACK_PEAK_MEMORY
+from data.cache import memo_stats
+from utils.charts import figure_cache_stats
+from utils.instrument import current_run, recent_records
+
+
+def render_timing_panel():
+    """Optional sidebar panel with the instrumented calls of the current rerun."""
+    # Runs of this session only: the record buffer is shared by every session
+    session_runs = st.session_state.setdefault("debug_runs", [])
+    if current_run() is not None and current_run() not in session_runs:
+        session_runs.append(current_run())
+
+    st.sidebar.divider()
+    if not st.sidebar.checkbox("Show timing panel", key="debug_timing"):
+        return
+
+    # tracemalloc is process-wide, so it is a deployment setting rather than a per-session toggle
+    st.sidebar.caption("Peak memory tracking is " + ("on" if TRACK_PEAK_MEMORY else
+                                                    "off (set DSEX_TRACK_PEAK_MEMORY=1 to enable)"))
+
+    records = recent_records(current_run())
+    if not records:
+        st.sidebar.caption("No instrumented calls in this run.")
+        return
+
+    table = pd.DataFrame(records)[["name", "wall_ms", "rows_in", "rows_out", "peak_mb", "parent"]]
+    # Module paths are long; the last two parts are enough to tell calls apart
+    table["name"] = table["name"].str.split(".").str[-2:].str.join(".")
+    total = sum(r["wall_ms"] for r in records if r["parent"] is None)
+
+    st.sidebar.caption(f"{len(records)} calls, {total:,.0f} ms at top level")
+    st.sidebar.dataframe(
+        table.sort_values("wall_ms", ascending=False),
+        hide_index=True,
+        column_config={
+            "wall_ms": st.column_config.NumberColumn("ms", format="%.1f"),
+            "peak_mb": st.column_config.NumberColumn("peak MB", format="%.1f"),
+        },
+    )
+
+    for label, stats in [("Memo cache", memo_stats()), ("Figure cache", figure_cache_stats())]:
+        st.sidebar.caption(f"{label}: {stats['entries']} entries, {stats['bytes'] / 1e6:,.1f} MB, "
+                           f"hit rate {stats['hit_rate']:.0%}")
+
+    st.sidebar.download_button(
+        "Download timings (JSONL)",
+        "\n".join(json.dumps(r, default=str) for r in recent_records() if r["run"] in session_runs),
+        file_name="dsex_timings.jsonl",
+        mime="application/json",
+    )
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from config.settings import CHART_POINT_BUDGET, FIGURE_CACHE_MAX_BYTES
+from data.cache import MemoCache, memoize
+
+
+def _figure_size(fig):
+    # What the figure costs once serialized for the browser
+    return len(pio.to_json(fig, validate=False))
+
+
+_figure_cache = MemoCache(FIGURE_CACHE_MAX_BYTES, sizer=_figure_size)
+
+
+def cached_figure(builder):
+    """
+    Memoizes a build_*_figure function in the figure cache: the key is the
+    builder, its view parameters and a fingerprint of every DataFrame argument,
+    and entries are evicted by serialized size. A rerun whose chart inputs did
+    not change gets the already-built figure back instead of going through
+    make_subplots / add_trace validation again. Cached figures are shared, so
+    callers must not modify them.
+    """
+    return memoize(builder, cache=_figure_cache)
+
+
+def figure_cache_stats():
+    return _figure_cache.summary()
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: positions of `n_out` points of (x, y) that
+    keep the visual shape of the line. The first and last points are always
+    kept; each bucket in between contributes the point forming the largest
+    triangle with the previous pick and the next bucket's mean.
+    x must be sorted; both are float arrays without NaN.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Mean of the next bucket (the last point for the final bucket)
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def downsample(x, y, budget=CHART_POINT_BUDGET):
+    """(x, y) reduced to at most `budget` points with LTTB; NaN points are dropped first."""
+    x, y = pd.Series(x).reset_index(drop=True), pd.Series(y).reset_index(drop=True)
+    if not budget or len(x) <= budget:
+        return x, y
+    keep = y.notna().to_numpy()
+    x, y = x[keep].reset_index(drop=True), y[keep].reset_index(drop=True)
+    x_num = x.to_numpy(dtype='int64') if pd.api.types.is_datetime64_any_dtype(x) else x.to_numpy(dtype='float64')
+    idx = lttb_indices(x_num.astype('float64'), y.to_numpy(dtype='float64'), budget)
+    return x.iloc[idx], y.iloc[idx]
+
+
+def line_trace(x, y, budget=CHART_POINT_BUDGET, **kwargs):
+    """
+    A line trace for a timeline. Within the point budget it is the usual SVG
+    go.Scatter; longer series are downsampled to `budget` points with LTTB
+    and drawn with go.Scattergl, so the figure payload stays bounded however
+    long the date range is.
+
+    The budget applies to the date range the figure is built for, once, at
+    build time: st.plotly_chart reports no relayout events back to Python, so
+    zooming into the figure in the browser shows the same decimated points.
+    Narrowing the app's date inputs rebuilds the figure at full detail.
+    """
+    if budget and len(x) > budget:
+        x, y = downsample(x, y, budget)
+        return go.Scattergl(x=x, y=y, **kwargs)
+    return go.Scatter(x=x, y=y, **kwargs)
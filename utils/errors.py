@@ -0,0 +1,19 @@
+import logging
+
+logger = logging.getLogger("dsex")
+
+# Where user-facing data-layer errors go; the Streamlit app points this at st.error
+_reporter = None
+
+
+def set_error_reporter(reporter):
+    """Routes report_error() messages to `reporter(message)` (None restores logging only)."""
+    global _reporter
+    _reporter = reporter
+
+
+def report_error(message):
+    """Logs `message` and hands it to the registered reporter, if any."""
+    logger.error(message)
+    if _reporter is not None:
+        _reporter(message)
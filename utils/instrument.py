@@ -0,0 +1,160 @@
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timezone
+
+from config.settings import TIMING_HISTORY, TIMING_LOG_PATH, TRACK_PEAK_MEMORY
+
+logger = logging.getLogger("dsex.timing")
+
+_records = deque(maxlen=TIMING_HISTORY)
+_records_lock = threading.Lock()
+# Per-thread state: Streamlit runs every session's script on its own thread
+_local = threading.local()
+_run_counter = 0
+
+
+def _ensure_log_file():
+    if TIMING_LOG_PATH and not any(getattr(h, "_dsex_timing", False) for h in logger.handlers):
+        handler = logging.FileHandler(TIMING_LOG_PATH)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler._dsex_timing = True
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+_ensure_log_file()
+
+
+def set_memory_tracking(enabled):
+    """Turns per-call peak memory (tracemalloc) on or off for the whole process."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+if TRACK_PEAK_MEMORY:
+    set_memory_tracking(True)
+
+
+def begin_run():
+    """Starts a new script run on this thread; records are tagged with its id."""
+    global _run_counter
+    with _records_lock:
+        _run_counter += 1
+        _local.run = _run_counter
+    return _local.run
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+def _count_rows(value):
+    if value is None:
+        return None
+    if hasattr(value, "shape") and len(value.shape) > 0:
+        return int(value.shape[0])
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    return None
+
+
+def _first_frame_rows(args, kwargs):
+    for value in list(args) + list(kwargs.values()):
+        if hasattr(value, "shape"):
+            return _count_rows(value)
+    return None
+
+
+class _Span:
+    """One timed call; nested spans report their own peak to the enclosing one."""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __enter__(self):
+        self.parent = getattr(_local, "span", None)
+        _local.span = self
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None and self.parent.tracing:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.base, self.peak = current, current
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        peak_mb = None
+        if self.tracing and tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak_mb = (self.peak - self.base) / 1e6
+            if self.parent is not None and self.parent.tracing:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        _local.span = self.parent
+
+        _record({
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "run": current_run(),
+            "name": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "wall_ms": elapsed * 1000,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "peak_mb": peak_mb,
+            "error": exc_type.__name__ if exc_type else None,
+        })
+        return False
+
+
+def _record(record):
+    with _records_lock:
+        _records.append(record)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record, default=str))
+
+
+def instrument(fn=None, *, name=None):
+    """
+    Records wall time, rows in (first DataFrame argument), rows out and, when
+    memory tracking is on, peak traced memory for every call of `fn`. Records
+    go to an in-memory ring buffer (see recent_records) and to the
+    "dsex.timing" logger as one JSON object per line.
+    """
+    if fn is None:
+        return functools.partial(instrument, name=name)
+
+    label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _Span(label, _first_frame_rows(args, kwargs)) as span:
+            result = fn(*args, **kwargs)
+            span.rows_out = _count_rows(result)
+            return result
+
+    return wrapper
+
+
+def recent_records(run=None):
+    """Buffered records, oldest first; `run` limits them to one script run."""
+    with _records_lock:
+        records = list(_records)
+    if run is not None:
+        records = [r for r in records if r["run"] == run]
+    return records
+
+
+def clear_records():
+    with _records_lock:
+        _records.clear()
@@ -0,0 +1,69 @@
+import numpy as np
+
+# What period_stats() does with days whose growth factor (1 + r/100) is <= 0,
+# i.e. a return of -100% or worse, which has no geometric mean
+NON_POSITIVE_POLICIES = ('nan', 'zero', 'skip')
+
+
+def period_stats(returns_pct, codes=None, n_groups=None, non_positive='nan', extra=None):
+    """
+    Period statistics of daily % returns for any number of groups in one pass.
+
+    returns_pct: 1-D daily % returns; NaN entries are treated as "no data".
+    codes: group number (0..n_groups-1) of every entry, or None for one group;
+    entries with a negative code are ignored.
+    non_positive: for groups with a day at -100% or worse, the geometric mean is
+    'nan', 'zero' or computed over the remaining days only ('skip').
+    extra: {name: values} aligned with returns_pct, averaged per group
+    (skipping NaN) and returned as `name`.
+
+    Returns a dict of per-group arrays: days, mean, std (ddof=1, NaN below two
+    days), geo_mean (%, via summed log1p growth), pos_pct (% of days > 0) and
+    the extra means. Every reduction is an np.bincount over the group codes.
+    """
+    if non_positive not in NON_POSITIVE_POLICIES:
+        raise ValueError(f"non_positive must be one of {NON_POSITIVE_POLICIES}")
+    ret = np.asarray(returns_pct, dtype='float64')
+    codes = np.zeros(len(ret), dtype=int) if codes is None else np.asarray(codes)
+    n_groups = (int(codes.max()) + 1 if len(codes) else 0) if n_groups is None else n_groups
+
+    def group_sum(values, where):
+        return np.bincount(codes[where], weights=values[where], minlength=n_groups)
+
+    in_group = codes >= 0
+    present = in_group & ~np.isnan(ret)
+    days = np.bincount(codes[present], minlength=n_groups)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1. Mean, then the squared deviations from each group's own mean (two-pass, like pandas)
+        mean = group_sum(ret, present) / days
+        deviation = ret - mean[np.where(in_group, codes, 0)]
+        std = np.sqrt(group_sum(deviation ** 2, present) / (days - 1))
+        std = np.where(days > 1, std, np.nan)
+
+        # 2. Geometric mean from the summed log growth of the positive-growth days
+        growth = ret / 100
+        positive = present & (growth > -1)
+        log_sum = group_sum(np.log1p(np.where(positive, growth, 0.0)), positive)
+        growth_days = np.bincount(codes[positive], minlength=n_groups)
+        geo_mean = np.expm1(log_sum / growth_days) * 100
+        wiped_out = growth_days < days
+        if non_positive == 'nan':
+            geo_mean = np.where(wiped_out, np.nan, geo_mean)
+        elif non_positive == 'zero':
+            geo_mean = np.where(wiped_out, 0.0, geo_mean)
+
+        stats = {
+            "days": days,
+            "mean": mean,
+            "std": std,
+            "geo_mean": geo_mean,
+            "pos_pct": np.bincount(codes[present & (ret > 0)], minlength=n_groups) / days * 100,
+        }
+
+        # 3. Plain per-group means of the other daily columns
+        for name, values in (extra or {}).items():
+            values = np.asarray(values, dtype='float64')
+            has_value = in_group & ~np.isnan(values)
+            stats[name] = group_sum(values, has_value) / np.bincount(codes[has_value], minlength=n_groups)
+    return stats